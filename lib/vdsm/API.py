@@ -1416,6 +1416,7 @@ class Global(APIBase):
         except:
             raise
         finally:
+            caps.invalidate(caps.NETWORK)
             self._cif._networkSemaphore.release()
 
     def setSafeNetworkConfig(self):
@@ -1428,6 +1429,7 @@ class Global(APIBase):
             supervdsm.getProxy().setSafeNetworkConfig()
             return {'status': doneCode}
         finally:
+            caps.invalidate(caps.NETWORK)
             self._cif._networkSemaphore.release()
 
     def getLldp(self, filter):
@@ -1532,8 +1534,9 @@ class SDM(APIBase):
     def create_volume(self, job_id, vol_info):
         return self._irs.sdm_create_volume(job_id, vol_info)
 
-    def copy_data(self, job_id, source, destination):
-        return self._irs.sdm_copy_data(job_id, source, destination)
+    def copy_data(self, job_id, source, destination, copy_mode=None):
+        return self._irs.sdm_copy_data(job_id, source, destination,
+                                       copy_mode)
 
     def sparsify_volume(self, job_id, vol_info):
         return self._irs.sdm_sparsify_volume(job_id, vol_info)
@@ -49,6 +49,7 @@ from vdsm.virt.utils import isVdsmImage
 import libvirt
 from vdsm import alignmentScan
 from vdsm import libvirtconnection
+from vdsm import metrics
 from vdsm import numa
 from vdsm import utils
 from vdsm import supervdsm
@@ -325,6 +326,7 @@ class clientIF(object):
             self._enabled = False
             secret.clear()
             self.channelListener.stop()
+            self._flush_vms_metadata()
             if self.irs:
                 return self.irs.prepareForShutdown()
             else:
@@ -332,6 +334,16 @@ class clientIF(object):
         finally:
             self._shutdownSemaphore.release()
 
+    def _flush_vms_metadata(self):
+        # Metadata changes may be pending in the VMs metadata writers; the
+        # next vdsm instance recovers the VMs from libvirt metadata.
+        for v in self.getVMs().values():
+            try:
+                v.flush_metadata()
+            except Exception:
+                self.log.exception("Error flushing metadata for VM %s",
+                                   v.id)
+
     def start(self):
         for binding in self.servers.values():
             binding.start()
@@ -500,7 +512,8 @@ class clientIF(object):
         utils.retry(self._recoverExistingVms, sleep=5)
 
     def _recoverExistingVms(self):
-        start_time = vdsm.common.time.monotonic_time()
+        clock = vdsm.common.time.Clock()
+        clock.start('total')
         try:
             self.log.debug('recovery: started')
 
@@ -511,10 +524,12 @@ class clientIF(object):
                       numa.cpu_topology().cores)
             migration.SourceThread.ongoingMigrations.bound = mog
 
-            recovery.all_domains(self)
+            with clock.run('domains'):
+                recovery.all_domains(self)
 
             # recover stage 3: waiting for domains to go up
-            self._waitForDomainsUp()
+            with clock.run('domains_up'):
+                self._waitForDomainsUp()
 
             self._recovery = False
 
@@ -522,12 +537,16 @@ class clientIF(object):
             # and then prepare all volumes.
             # Actually, we need it just to get the resources for future
             # volumes manipulations
-            self._waitForStoragePool()
+            with clock.run('storage_pool'):
+                self._waitForStoragePool()
 
-            self._preparePathsForRecoveredVMs()
+            with clock.run('prepare_paths'):
+                self._preparePathsForRecoveredVMs()
 
-            self.log.info('recovery: completed in %is',
-                          vdsm.common.time.monotonic_time() - start_time)
+            clock.stop('total')
+            self.log.info('recovery: completed in %is (%s)',
+                          clock.elapsed('total'), clock)
+            self._send_recovery_metrics(clock)
 
         except:
             self.log.exception("recovery: failed")
@@ -601,21 +620,15 @@ class clientIF(object):
             time.sleep(5)
 
     def _preparePathsForRecoveredVMs(self):
-        vm_objects = self.vmContainer.values()
-        num_vm_objects = len(vm_objects)
-        for idx, vm_obj in enumerate(vm_objects):
-            # Let's recover as much VMs as possible
-            try:
-                # Do not prepare volumes when system goes down
-                if self._enabled:
-                    self.log.info(
-                        'recovery [%d/%d]: preparing paths for'
-                        ' domain %s', idx + 1, num_vm_objects, vm_obj.id)
-                    vm_obj.preparePaths()
-            except:
-                self.log.exception(
-                    "recovery [%d/%d]: failed for vm %s",
-                    idx + 1, num_vm_objects, vm_obj.id)
+        recovery.prepare_paths(self, list(self.vmContainer.values()))
+
+    def _send_recovery_metrics(self, clock):
+        prefix = 'hosts.vdsm.recovery'
+        report = {prefix + '.vms': len(self.vmContainer)}
+        for name in ('total', 'domains', 'domains_up', 'storage_pool',
+                     'prepare_paths'):
+            report[prefix + '.' + name] = clock.elapsed(name)
+        metrics.send(report)
 
     def _prepare_network_drive(self, drive, res):
         """
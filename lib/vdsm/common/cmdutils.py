@@ -112,7 +112,7 @@ class Accounting(object):
     BlockIO = 'BlockIO'
 
 
-def exec_cmd(cmd, env=None):
+def exec_cmd(cmd, env=None, data=None):
     """
     Execute cmd in an external process, collect its output and returncode
 
@@ -120,6 +120,7 @@ def exec_cmd(cmd, env=None):
     :param env: an optional dictionary to be placed as environment variables
                 of the external process. If None, the environment of the
                 calling process is used.
+    :param data: optional bytes to write to the process's stdin.
     :returns: a 3-tuple of the process's
               (returncode, stdout content, stderr content.)
 
@@ -133,10 +134,11 @@ def exec_cmd(cmd, env=None):
     logging.debug(command_log_line(cmd))
 
     p = CPopen(
-        cmd, close_fds=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-        env=env)
+        cmd, close_fds=True,
+        stdin=subprocess.PIPE if data is not None else None,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
 
-    out, err = p.communicate()
+    out, err = p.communicate(data)
 
     logging.debug(retcode_log_line(p.returncode, err=err))
 
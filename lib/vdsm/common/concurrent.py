@@ -136,21 +136,54 @@ class Barrier(object):
 Result = namedtuple("Result", ["succeeded", "value"])
 
 
-def tmap(func, iterable):
+def tmap(func, iterable, max_workers=None):
+    """
+    Run func with each item of iterable in separate threads, returning a list
+    of Result in the same order as iterable.
+
+    If max_workers is set, at most max_workers threads are started, each
+    running func for the next unprocessed item, until all items are
+    processed.
+    """
     args = list(iterable)
     results = [None] * len(args)
 
-    def worker(i, f, arg):
-        try:
-            results[i] = Result(True, f(arg))
-        except Exception as e:
-            results[i] = Result(False, e)
-
-    threads = []
-    for i, arg in enumerate(args):
-        t = thread(worker, args=(i, func, arg), name="tmap/%d" % i)
-        t.start()
-        threads.append(t)
+    if max_workers is None or max_workers >= len(args):
+        def worker(i, f, arg):
+            try:
+                results[i] = Result(True, f(arg))
+            except Exception as e:
+                results[i] = Result(False, e)
+
+        threads = []
+        for i, arg in enumerate(args):
+            t = thread(worker, args=(i, func, arg), name="tmap/%d" % i)
+            t.start()
+            threads.append(t)
+    else:
+        if max_workers < 1:
+            raise ValueError("Invalid max_workers %d (expecting "
+                             "max_workers >= 1)" % max_workers)
+        items = iter(enumerate(args))
+        lock = threading.Lock()
+
+        def worker(f):
+            while True:
+                with lock:
+                    try:
+                        i, arg = next(items)
+                    except StopIteration:
+                        return
+                try:
+                    results[i] = Result(True, f(arg))
+                except Exception as e:
+                    results[i] = Result(False, e)
+
+        threads = []
+        for n in range(max_workers):
+            t = thread(worker, args=(func,), name="tmap/%d" % n)
+            t.start()
+            threads.append(t)
 
     for t in threads:
         t.join()
@@ -26,6 +26,9 @@ import logging
 import logging.handlers
 import os
 import pwd
+import threading
+import weakref
+from collections import deque
 from dateutil import tz
 from inspect import ismethod
 
@@ -119,6 +122,165 @@ class UserGroupEnforcingHandler(logging.handlers.WatchedFileHandler):
         return logging.handlers.WatchedFileHandler._open(self)
 
 
+_formatter = logging.Formatter()
+
+
+class ThreadedHandler(logging.handlers.MemoryHandler):
+    """
+    This log handler queues records and writes them to the target handler in
+    a background thread, so threads logging never block on the log file.
+
+    Messages and tracebacks are formatted before records are queued, since
+    the arguments may change later. The queue is bounded by capacity, the
+    total size in bytes of the queued messages and tracebacks. When the queue
+    is full, new records are dropped and counted; the writer logs the number
+    of dropped records. Records are kept in the queue until a target is set.
+
+    Configure in logger.conf using the target option:
+
+        [handler_logthread]
+        class=vdsm.common.logutils.ThreadedHandler
+        args=(4194304,)
+        level=DEBUG
+        target=logfile
+
+    The queue statistics of all threaded handlers are available using
+    threaded_handler_stats().
+    """
+
+    def __init__(self, capacity=4 * 1024**2, target=None):
+        logging.handlers.MemoryHandler.__init__(self, capacity, target=target)
+        self._cond = threading.Condition(threading.Lock())
+        self._queue = deque()
+        self._queue_bytes = 0
+        self._dropped = 0
+        self._reported = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="logfile")
+        self._thread.daemon = True
+        self._thread.start()
+        _threaded_handlers.add(self)
+
+    @property
+    def queue_depth(self):
+        """
+        Return the number of records waiting to be written.
+        """
+        return len(self._queue)
+
+    @property
+    def queue_bytes(self):
+        """
+        Return the size of the records waiting to be written.
+        """
+        return self._queue_bytes
+
+    @property
+    def dropped(self):
+        """
+        Return the number of records dropped because the queue was full.
+        """
+        return self._dropped
+
+    def setTarget(self, target):
+        with self._cond:
+            self.target = target
+            self._cond.notify()
+
+    def emit(self, record):
+        try:
+            self._prepare(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        size = _record_size(record)
+        with self._cond:
+            # A record larger than capacity is accepted when the queue is
+            # empty, so it is never dropped because of its size alone.
+            if self._queue and self._queue_bytes + size > self.capacity:
+                self._dropped += 1
+                return
+            self._queue.append(record)
+            self._queue_bytes += size
+            self._cond.notify()
+
+    def _prepare(self, record):
+        # The target formatter uses exc_text when exc_info is not set, so the
+        # record is written as if it was not queued.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _formatter.formatException(record.exc_info)
+            record.exc_info = None
+
+    def flush(self):
+        # Records are written by the writer thread.
+        pass
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        _threaded_handlers.discard(self)
+        logging.handlers.MemoryHandler.close(self)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and (not self._queue or
+                                         self.target is None):
+                    self._cond.wait()
+                target = self.target
+                if not self._queue or target is None:
+                    return
+                # Take all queued records in one batch.
+                records = self._queue
+                self._queue = deque()
+                self._queue_bytes = 0
+                dropped = self._dropped - self._reported
+                self._reported = self._dropped
+
+            self._write(target, records, dropped)
+
+    def _write(self, target, records, dropped):
+        if dropped:
+            record = logging.LogRecord(
+                "root", logging.WARNING, __file__, 0,
+                "Log queue full, dropped %d records", (dropped,), None)
+            target.handle(record)
+
+        for record in records:
+            target.handle(record)
+
+
+_threaded_handlers = weakref.WeakSet()
+
+
+def threaded_handler_stats():
+    """
+    Return the number of queued records (queue_depth), their size in bytes
+    (queue_bytes), and the number of dropped records (dropped) of all the
+    threaded handlers.
+    """
+    stats = {"queue_depth": 0, "queue_bytes": 0, "dropped": 0}
+    for handler in list(_threaded_handlers):
+        stats["queue_depth"] += handler.queue_depth
+        stats["queue_bytes"] += handler.queue_bytes
+        stats["dropped"] += handler.dropped
+    return stats
+
+
+def _record_size(record):
+    size = len(record.msg)
+    if record.exc_text:
+        size += len(record.exc_text)
+    return size
+
+
 class TimezoneFormatter(logging.Formatter):
     def converter(self, timestamp):
         return datetime.datetime.fromtimestamp(timestamp,
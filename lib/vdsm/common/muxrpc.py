@@ -0,0 +1,508 @@
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+Multiplexed RPC channel over a unix socket.
+
+Unlike multiprocessing.managers proxies, which perform one synchronous
+request/response per connection, this channel allows many requests to be in
+flight on the same connection. Each request carries an id, and the server may
+send the replies in any order.
+
+Wire format: every message is a 4 bytes big endian length followed by a pickle
+of the message tuple:
+
+    request:    (id, name, args, kwargs)
+    response:   (id, succeeded, value)
+
+When a call fails, value is the exception raised by the server, or a
+RemoteError if the exception could not be pickled.
+
+Example usage::
+
+    server = muxrpc.Server("/run/example.sock", Service(), workers=4)
+    server.start()
+
+    client = muxrpc.Client("/run/example.sock")
+    client.connect()
+    client.call("ping")
+    results = client.batch([("getScsiSerial", (dev,), {}) for dev in devs])
+"""
+
+from __future__ import absolute_import
+
+import errno
+import logging
+import os
+import socket
+import struct
+import threading
+
+from six.moves import queue
+
+from vdsm.common import concurrent
+from vdsm.common import time
+from vdsm.common.compat import pickle
+
+_HEADER = struct.Struct("!I")
+
+# Protect the receiver from allocating crazy amounts of memory because of
+# corrupted or malicious stream.
+MAX_MESSAGE_SIZE = 64 * 1024**2
+
+_STOP = object()
+
+
+class Error(Exception):
+    """ Base class for channel errors """
+
+
+class ConnectionClosed(Error):
+    """ Raised when the peer closed the connection """
+
+
+class Timeout(Error):
+    """ Raised when a call did not complete in time """
+
+
+class RemoteError(Error):
+    """ Raised when the server failed with an exception we cannot pickle """
+
+
+class ProtocolError(Error):
+    """ Raised when receiving an invalid message """
+
+
+def send_message(sock, msg):
+    data = pickle.dumps(msg, pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock):
+    """
+    Receive one message from sock.
+
+    Raises ConnectionClosed if the peer closed the connection.
+    """
+    header = _recv_exactly(sock, _HEADER.size)
+    size, = _HEADER.unpack(header)
+    if size > MAX_MESSAGE_SIZE:
+        raise ProtocolError("Message too large: %d bytes" % size)
+    return pickle.loads(_recv_exactly(sock, size))
+
+
+def _recv_exactly(sock, size):
+    buf = bytearray(size)
+    view = memoryview(buf)
+    pos = 0
+    while pos < size:
+        try:
+            n = sock.recv_into(view[pos:], size - pos)
+        except socket.error as e:
+            if e.args[0] == errno.EINTR:
+                continue
+            raise
+        if n == 0:
+            raise ConnectionClosed("Connection closed by peer")
+        pos += n
+    return bytes(buf)
+
+
+class MethodStats(object):
+    """
+    Latency statistics for one remote method.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed, succeeded):
+        self.count += 1
+        if not succeeded:
+            self.errors += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+    def info(self):
+        avg = self.total / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg": avg,
+            "max": self.max,
+        }
+
+
+class _Call(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.start = time.monotonic_time()
+        self.result = None
+        self._done = threading.Event()
+
+    def set_result(self, succeeded, value):
+        self.result = concurrent.Result(succeeded, value)
+        self._done.set()
+
+    def wait(self, timeout):
+        return self._done.wait(timeout)
+
+
+class Client(object):
+    """
+    Client side of the channel.
+
+    Calls may be issued concurrently from any thread; all of them share a
+    single connection, and replies are routed back to the caller by a reader
+    thread.
+    """
+
+    log = logging.getLogger("MuxRPC.Client")
+
+    def __init__(self, address, timeout=None):
+        self._address = address
+        self._timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._pending = {}
+        self._next_id = 0
+        self._stats = {}
+
+    @property
+    def connected(self):
+        return self._sock is not None
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self._address)
+        except:
+            sock.close()
+            raise
+        with self._lock:
+            self._sock = sock
+        self._reader = concurrent.thread(self._read_loop, args=(sock,),
+                                         name="mux/reader", log=self.log)
+        self._reader.start()
+
+    def close(self):
+        with self._lock:
+            sock = self._sock
+            self._sock = None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+            sock.close()
+        if self._reader is not None:
+            if self._reader is not threading.current_thread():
+                self._reader.join()
+            self._reader = None
+
+    def call(self, name, *args, **kwargs):
+        """
+        Call remote method name with args and kwargs, returning the result or
+        raising the remote exception.
+        """
+        call = self._send(name, args, kwargs)
+        result = self._wait(call, self._deadline())
+        if not result.succeeded:
+            raise result.value
+        return result.value
+
+    def batch(self, calls):
+        """
+        Send all calls before waiting for any reply, so the server can run
+        them concurrently.
+
+        Arguments:
+            calls (iterable): (name, args, kwargs) tuples
+
+        Returns:
+            list of concurrent.Result, in the order of calls.
+        """
+        pending = []
+        for name, args, kwargs in calls:
+            try:
+                pending.append(self._send(name, args, kwargs))
+            except Error as e:
+                pending.append(e)
+
+        deadline = self._deadline()
+        results = []
+        for call in pending:
+            if isinstance(call, Error):
+                results.append(concurrent.Result(False, call))
+                continue
+            try:
+                results.append(self._wait(call, deadline))
+            except Timeout as e:
+                results.append(concurrent.Result(False, e))
+        return results
+
+    def stats(self):
+        """
+        Return per-method latency statistics, measured from sending the
+        request until receiving the response.
+        """
+        with self._lock:
+            return {name: s.info() for name, s in self._stats.items()}
+
+    # Private
+
+    def _deadline(self):
+        if self._timeout is None:
+            return None
+        return time.monotonic_time() + self._timeout
+
+    def _send(self, name, args, kwargs):
+        call = _Call(name)
+        with self._lock:
+            if self._sock is None:
+                raise ConnectionClosed("Not connected")
+            sock = self._sock
+            call_id = self._next_id
+            self._next_id += 1
+            self._pending[call_id] = call
+        try:
+            with self._send_lock:
+                send_message(sock, (call_id, name, args, kwargs))
+        except socket.error as e:
+            with self._lock:
+                self._pending.pop(call_id, None)
+            raise ConnectionClosed("Error sending %s: %s" % (name, e))
+        return call
+
+    def _wait(self, call, deadline):
+        if deadline is None:
+            timeout = None
+        else:
+            timeout = max(0, deadline - time.monotonic_time())
+        if not call.wait(timeout):
+            raise Timeout("Timeout waiting for %s" % call.name)
+        return call.result
+
+    def _read_loop(self, sock):
+        try:
+            while True:
+                call_id, succeeded, value = recv_message(sock)
+                with self._lock:
+                    call = self._pending.pop(call_id, None)
+                    if call is not None:
+                        self._record(call, succeeded)
+                if call is None:
+                    self.log.warning("Ignoring response for unknown call %s",
+                                     call_id)
+                    continue
+                call.set_result(succeeded, value)
+        except (ConnectionClosed, socket.error) as e:
+            self.log.debug("Connection closed: %s", e)
+        except Exception:
+            self.log.exception("Error reading from %s", self._address)
+        finally:
+            self._abort_pending()
+
+    def _record(self, call, succeeded):
+        # Must be called with self._lock held.
+        elapsed = time.monotonic_time() - call.start
+        if call.name not in self._stats:
+            self._stats[call.name] = MethodStats()
+        self._stats[call.name].add(elapsed, succeeded)
+
+    def _abort_pending(self):
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+        error = ConnectionClosed("Connection to %s closed" % self._address)
+        for call in pending.values():
+            call.set_result(False, error)
+
+
+class Server(object):
+    """
+    Server side of the channel.
+
+    Requests from all connections are dispatched to a fixed pool of worker
+    threads calling methods of instance. Replies are sent as soon as a call
+    completes, so slow calls do not block fast ones.
+    """
+
+    log = logging.getLogger("MuxRPC.Server")
+
+    def __init__(self, address, instance, workers=8, max_tasks=None):
+        self._address = address
+        self._instance = instance
+        self._workers_count = workers
+        if max_tasks is None:
+            max_tasks = workers * 100
+        self._tasks = queue.Queue(max_tasks)
+        self._sock = None
+        self._threads = []
+        self._running = False
+        self._lock = threading.Lock()
+        self._connections = set()
+
+    def start(self):
+        if os.path.exists(self._address):
+            os.unlink(self._address)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.bind(self._address)
+            sock.listen(16)
+        except:
+            sock.close()
+            raise
+        self._sock = sock
+        self._running = True
+        for i in range(self._workers_count):
+            t = concurrent.thread(self._work, name="mux/%d" % i, log=self.log)
+            t.start()
+            self._threads.append(t)
+        t = concurrent.thread(self._accept_loop, name="mux/accept",
+                              log=self.log)
+        t.start()
+        self._threads.append(t)
+
+    def stop(self):
+        self._running = False
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+            self._sock.close()
+        with self._lock:
+            connections = tuple(self._connections)
+        for conn in connections:
+            conn.shutdown()
+        for _ in range(self._workers_count):
+            self._tasks.put(_STOP)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn, _ = self._sock.accept()
+            except socket.error as e:
+                if not self._running:
+                    break
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+            t = concurrent.thread(self._serve, args=(conn,),
+                                  name="mux/conn", log=self.log)
+            t.start()
+
+    def _serve(self, sock):
+        conn = _Connection(sock)
+        with self._lock:
+            self._connections.add(conn)
+        try:
+            while self._running:
+                msg = recv_message(sock)
+                conn.acquire()
+                self._tasks.put((conn, msg))
+        except (ConnectionClosed, socket.error) as e:
+            self.log.debug("Client disconnected: %s", e)
+        finally:
+            with self._lock:
+                self._connections.discard(conn)
+            conn.release()
+
+    def _work(self):
+        while True:
+            task = self._tasks.get()
+            if task is _STOP:
+                return
+            conn, msg = task
+            try:
+                self._handle(conn, msg)
+            finally:
+                conn.release()
+
+    def _handle(self, conn, msg):
+        call_id, name, args, kwargs = msg
+        try:
+            if name.startswith("_"):
+                raise AttributeError("No such method: %r" % name)
+            method = getattr(self._instance, name)
+            reply = (call_id, True, method(*args, **kwargs))
+        except Exception as e:
+            reply = (call_id, False, e)
+        try:
+            conn.send(reply)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            if reply[1]:
+                error = RemoteError("Cannot pickle result of %s" % name)
+            else:
+                error = RemoteError("%s failed: %r" % (name, reply[2]))
+            try:
+                conn.send((call_id, False, error))
+            except socket.error as e:
+                self.log.debug("Cannot reply to %s: %s", name, e)
+        except socket.error as e:
+            self.log.debug("Cannot reply to %s: %s", name, e)
+
+
+class _Connection(object):
+    """
+    Server side connection, closed when the client disconnected and all
+    requests received on this connection were handled.
+    """
+
+    def __init__(self, sock):
+        self._sock = sock
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        # The reader holds one reference until the client disconnects.
+        self._refs = 1
+
+    def acquire(self):
+        with self._lock:
+            self._refs += 1
+
+    def release(self):
+        with self._lock:
+            self._refs -= 1
+            if self._refs > 0:
+                return
+        self._sock.close()
+
+    def send(self, msg):
+        with self._send_lock:
+            send_message(self._sock, msg)
+
+    def shutdown(self):
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
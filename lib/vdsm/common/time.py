@@ -84,6 +84,18 @@ class Clock(object):
             raise RuntimeError("Timer %r already stopped" % name)
         self._timers[name] = (started, monotonic_time())
 
+    def elapsed(self, name):
+        """
+        Return the time measured by timer name. If the timer is running,
+        return the time since it was started.
+        """
+        if name not in self._timers:
+            raise RuntimeError("Timer %r was not started" % name)
+        started, stopped = self._timers[name]
+        if stopped is None:
+            stopped = monotonic_time()
+        return stopped - started
+
     @contextmanager
     def run(self, name):
         self.start(name)
@@ -118,6 +118,23 @@ class Executor(object):
     def name(self):
         return self._name
 
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    @max_workers.setter
+    def max_workers(self, value):
+        """
+        Change the maximum number of workers. If the limit is raised while
+        some workers are discarded, new workers are added.
+        """
+        with self._lock:
+            self._max_workers = value
+            if not self._running:
+                return
+            while self._may_add_workers():
+                self._add_worker()
+
     def start(self):
         self._log.debug('Starting executor')
         with self._lock:
@@ -20,13 +20,18 @@
 from __future__ import absolute_import
 
 import calendar
+import copy
+import functools
 import logging
 import os
 import socket
+import threading
 import time
 import xml.etree.cElementTree as etree
 
 from vdsm.common import cmdutils
+from vdsm.common.time import monotonic_time
+from vdsm.config import config
 from vdsm import commands
 from vdsm.gluster import exception as ge
 from vdsm.network.netinfo import addresses
@@ -124,6 +129,60 @@ def _execGlusterXml(cmd):
         raise ge.GlusterCmdFailedException(rc=rv, err=[msg])
 
 
+class _State(object):
+    """
+    Gluster state loaded by a bulk command, served from memory until it is
+    older than [gluster] state_cache_timeout seconds or invalidated by a
+    command modifying it.
+
+    Concurrent readers of expired state wait for a single load.
+    """
+
+    _log = logging.getLogger("gluster.State")
+
+    def __init__(self, name, load):
+        self._name = name
+        self._load = load
+        self._lock = threading.Lock()
+        self._value = None
+        self._time = None
+
+    def get(self):
+        timeout = config.getint('gluster', 'state_cache_timeout')
+        with self._lock:
+            now = monotonic_time()
+            if self._time is None or now - self._time >= timeout:
+                self._value = self._load()
+                self._time = now
+            else:
+                self._log.debug("Using %s state from %.1f seconds ago",
+                                self._name, now - self._time)
+            # Callers may modify the returned value.
+            return copy.deepcopy(self._value)
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._time = None
+
+
+def _invalidates(*states):
+    """
+    Invalidate states after running a command which may modify them, even if
+    the command failed.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                for state in states:
+                    state.invalidate()
+        return wrapper
+    return decorator
+
+
 def _getLocalIpAddress():
     for ip in addresses.getIpAddresses():
         if not ip.startswith('127.'):
@@ -341,6 +400,13 @@ def volumeStatus(volumeName, brick=None, option=None):
                                    'padddedSizeOf': int,
                                    'poolMisses': int},...]}, ...]}
     """
+    if brick is None and option in _volumesStatus:
+        status = _volumesStatus[option].get()
+        if volumeName in status:
+            return status[volumeName]
+        # Not started volumes are not reported in the bulk status; the
+        # volume command reports the error.
+
     command = _getGlusterVolCmd() + ["status", volumeName]
     if brick:
         command.append(brick)
@@ -351,18 +417,59 @@ def volumeStatus(volumeName, brick=None, option=None):
     except ge.GlusterCmdFailedException as e:
         raise ge.GlusterVolumeStatusFailedException(rc=e.rc, err=e.err)
     try:
-        if option == 'detail':
-            return _parseVolumeStatusDetail(xmltree)
-        elif option == 'clients':
-            return _parseVolumeStatusClients(xmltree)
-        elif option == 'mem':
-            return _parseVolumeStatusMem(xmltree)
-        else:
-            return _parseVolumeStatus(xmltree)
+        return _parseVolumeStatusOption(xmltree, option)
     except _etreeExceptions:
         raise ge.GlusterXmlErrorException(err=[etree.tostring(xmltree)])
 
 
+def _parseVolumeStatusOption(tree, option):
+    if option == 'detail':
+        return _parseVolumeStatusDetail(tree)
+    elif option == 'clients':
+        return _parseVolumeStatusClients(tree)
+    elif option == 'mem':
+        return _parseVolumeStatusMem(tree)
+    else:
+        return _parseVolumeStatus(tree)
+
+
+def _parseVolumesStatus(tree, option):
+    """
+    Parse status of all volumes, returning {VOLUMENAME: STATUS, ...}
+    """
+    volumes = {}
+    for el in tree.findall('volStatus/volumes/volume'):
+        # The volume status parsers expect the output for single volume.
+        root = etree.Element('cliOutput')
+        etree.SubElement(etree.SubElement(root, 'volStatus'),
+                         'volumes').append(el)
+        status = _parseVolumeStatusOption(root, option)
+        volumes[status['name']] = status
+    return volumes
+
+
+def _loadVolumesStatus(option):
+    command = _getGlusterVolCmd() + ["status", "all"]
+    if option:
+        command.append(option)
+    try:
+        xmltree = _execGlusterXml(command)
+    except ge.GlusterCmdFailedException as e:
+        raise ge.GlusterVolumeStatusFailedException(rc=e.rc, err=e.err)
+    try:
+        return _parseVolumesStatus(xmltree, option)
+    except _etreeExceptions:
+        raise ge.GlusterXmlErrorException(err=[etree.tostring(xmltree)])
+
+
+_volumesStatus = {
+    None: _State("volume status",
+                 functools.partial(_loadVolumesStatus, None)),
+    'detail': _State("volume status detail",
+                     functools.partial(_loadVolumesStatus, 'detail')),
+}
+
+
 def _parseVolumeInfo(tree):
     """
         {VOLUMENAME: {'brickCount': BRICKCOUNT,
@@ -493,6 +600,18 @@ def volumeInfo(volumeName=None, remoteServer=None):
                       'volumeStatus': STATUS,
                       'volumeType': TYPE}, ...}
     """
+    if not remoteServer:
+        volumes = _volumesInfo.get()
+        if not volumeName:
+            return volumes
+        if volumeName in volumes:
+            return {volumeName: volumes[volumeName]}
+        # The volume command reports the error.
+
+    return _loadVolumeInfo(volumeName, remoteServer)
+
+
+def _loadVolumeInfo(volumeName=None, remoteServer=None):
     command = _getGlusterVolCmd() + ["info"]
     if remoteServer:
         command += ['--remote-host=%s' % remoteServer]
@@ -508,7 +627,14 @@ def volumeInfo(volumeName=None, remoteServer=None):
         raise ge.GlusterXmlErrorException(err=[etree.tostring(xmltree)])
 
 
+_volumesInfo = _State("volume info", _loadVolumeInfo)
+
+# Commands modifying volumes invalidate this state.
+_VOLUMES = (_volumesInfo,) + tuple(_volumesStatus.values())
+
+
 @gluster_mgmt_api
+@_invalidates(*_VOLUMES)
 def volumeCreate(volumeName, brickList, replicaCount=0, stripeCount=0,
                  transportList=[], force=False, arbiter=False):
     command = _getGlusterVolCmd() + ["create", volumeName]
@@ -536,6 +662,7 @@ def volumeCreate(volumeName, brickList, replicaCount=0, stripeCount=0,
 
 
 @gluster_mgmt_api
+@_invalidates(*_VOLUMES)
 def volumeStart(volumeName, force=False):
     command = _getGlusterVolCmd() + ["start", volumeName]
     if force:
@@ -548,6 +675,7 @@ def volumeStart(volumeName, force=False):
 
 
 @gluster_mgmt_api
+@_invalidates(*_VOLUMES)
 def volumeStop(volumeName, force=False):
     command = _getGlusterVolCmd() + ["stop", volumeName]
     if force:
@@ -560,6 +688,7 @@ def volumeStop(volumeName, force=False):
 
 
 @gluster_mgmt_api
+@_invalidates(*_VOLUMES)
 def volumeDelete(volumeName):
     command = _getGlusterVolCmd() + ["delete", volumeName]
     try:
@@ -570,6 +699,7 @@ def volumeDelete(volumeName):
 
 
 @gluster_mgmt_api
+@_invalidates(*_VOLUMES)
 def volumeSet(volumeName, option, value):
     command = _getGlusterVolCmd() + ["set", volumeName, option, value]
     try:
@@ -600,6 +730,7 @@ def volumeSetHelpXml():
 
 
 @gluster_mgmt_api
+@_invalidates(*_VOLUMES)
 def volumeReset(volumeName, option='', force=False):
     command = _getGlusterVolCmd() + ['reset', volumeName]
     if option:
@@ -614,6 +745,7 @@ def volumeReset(volumeName, option='', force=False):
 
 
 @gluster_mgmt_api
+@_invalidates(*_VOLUMES)
 def volumeAddBrick(volumeName, brickList,
                    replicaCount=0, stripeCount=0, force=False):
     command = _getGlusterVolCmd() + ["add-brick", volumeName]
@@ -738,6 +870,7 @@ def volumeRebalanceStatus(volumeName):
 
 
 @gluster_mgmt_api
+@_invalidates(*_VOLUMES)
 def volumeReplaceBrickCommitForce(volumeName, existingBrick, newBrick):
     command = _getGlusterVolCmd() + ["replace-brick", volumeName,
                                      existingBrick, newBrick, "commit",
@@ -803,6 +936,7 @@ def volumeRemoveBrickStatus(volumeName, brickList, replicaCount=0):
 
 
 @gluster_mgmt_api
+@_invalidates(*_VOLUMES)
 def volumeRemoveBrickCommit(volumeName, brickList, replicaCount=0):
     command = _getGlusterVolCmd() + ["remove-brick", volumeName]
     if replicaCount:
@@ -817,6 +951,7 @@ def volumeRemoveBrickCommit(volumeName, brickList, replicaCount=0):
 
 
 @gluster_mgmt_api
+@_invalidates(*_VOLUMES)
 def volumeRemoveBrickForce(volumeName, brickList, replicaCount=0):
     command = _getGlusterVolCmd() + ["remove-brick", volumeName]
     if replicaCount:
@@ -830,31 +965,6 @@ def volumeRemoveBrickForce(volumeName, brickList, replicaCount=0):
                                                               err=e.err)
 
 
-@gluster_mgmt_api
-def peerProbe(hostName):
-    command = _getGlusterPeerCmd() + ["probe", hostName]
-    try:
-        _execGlusterXml(command)
-        return True
-    except ge.GlusterCmdFailedException as e:
-        raise ge.GlusterHostAddFailedException(rc=e.rc, err=e.err)
-
-
-@gluster_mgmt_api
-def peerDetach(hostName, force=False):
-    command = _getGlusterPeerCmd() + ["detach", hostName]
-    if force:
-        command.append('force')
-    try:
-        _execGlusterXml(command)
-        return True
-    except ge.GlusterCmdFailedException as e:
-        if e.rc == 2:
-            raise ge.GlusterHostNotFoundException(rc=e.rc, err=e.err)
-        else:
-            raise ge.GlusterHostRemoveFailedException(rc=e.rc, err=e.err)
-
-
 def _parsePeerStatus(tree, gHostName, gUuid, gStatus):
     hostList = [{'hostname': gHostName,
                  'uuid': gUuid,
@@ -880,6 +990,10 @@ def peerStatus():
     Returns:
         [{'hostname': HOSTNAME, 'uuid': UUID, 'status': STATE}, ...]
     """
+    return _peers.get()
+
+
+def _loadPeerStatus():
     command = _getGlusterPeerCmd() + ["status"]
     try:
         xmltree = _execGlusterXml(command)
@@ -893,7 +1007,38 @@ def peerStatus():
         raise ge.GlusterXmlErrorException(err=[etree.tostring(xmltree)])
 
 
+_peers = _State("peer status", _loadPeerStatus)
+
+
+@gluster_mgmt_api
+@_invalidates(_peers)
+def peerProbe(hostName):
+    command = _getGlusterPeerCmd() + ["probe", hostName]
+    try:
+        _execGlusterXml(command)
+        return True
+    except ge.GlusterCmdFailedException as e:
+        raise ge.GlusterHostAddFailedException(rc=e.rc, err=e.err)
+
+
+@gluster_mgmt_api
+@_invalidates(_peers)
+def peerDetach(hostName, force=False):
+    command = _getGlusterPeerCmd() + ["detach", hostName]
+    if force:
+        command.append('force')
+    try:
+        _execGlusterXml(command)
+        return True
+    except ge.GlusterCmdFailedException as e:
+        if e.rc == 2:
+            raise ge.GlusterHostNotFoundException(rc=e.rc, err=e.err)
+        else:
+            raise ge.GlusterHostRemoveFailedException(rc=e.rc, err=e.err)
+
+
 @gluster_mgmt_api
+@_invalidates(*_VOLUMES)
 def volumeProfileStart(volumeName):
     command = _getGlusterVolCmd() + ["profile", volumeName, "start"]
     try:
@@ -904,6 +1049,7 @@ def volumeProfileStart(volumeName):
 
 
 @gluster_mgmt_api
+@_invalidates(*_VOLUMES)
 def volumeProfileStop(volumeName):
     command = _getGlusterVolCmd() + ["profile", volumeName, "stop"]
     try:
@@ -1033,6 +1179,7 @@ def volumeTasks(volumeName="all"):
 
 
 @gluster_mgmt_api
+@_invalidates(*_VOLUMES)
 def volumeGeoRepSessionStart(volumeName, remoteHost, remoteVolumeName,
                              remoteUserName=None, force=False):
     if remoteUserName:
@@ -1052,6 +1199,7 @@ def volumeGeoRepSessionStart(volumeName, remoteHost, remoteVolumeName,
 
 
 @gluster_mgmt_api
+@_invalidates(*_VOLUMES)
 def volumeGeoRepSessionStop(volumeName, remoteHost, remoteVolumeName,
                             remoteUserName=None, force=False):
     if remoteUserName:
@@ -1336,6 +1484,7 @@ def _parseRestoredSnapshot(tree):
 
 
 @gluster_mgmt_api
+@_invalidates(*_VOLUMES)
 def snapshotRestore(snapName):
     command = _getGlusterSnapshotCmd() + ["restore", snapName]
 
@@ -1554,6 +1703,7 @@ def executeMountBrokerOpt(optionName, optionValue):
 
 
 @gluster_mgmt_api
+@_invalidates(*_VOLUMES)
 def volumeGeoRepSessionCreate(volumeName, remoteHost,
                               remoteVolumeName,
                               remoteUserName=None, force=False):
@@ -1574,6 +1724,7 @@ def volumeGeoRepSessionCreate(volumeName, remoteHost,
 
 
 @gluster_mgmt_api
+@_invalidates(*_VOLUMES)
 def volumeGeoRepSessionDelete(volumeName, remoteHost, remoteVolumeName,
                               remoteUserName=None):
     if remoteUserName:
@@ -25,10 +25,13 @@ import os
 import threading
 
 from vdsm.common import concurrent
+from vdsm.common import logutils
+from vdsm.storage import qemuimg
 
 from . config import config
 from . import cpuarch
 from . import metrics
+from . import supervdsm
 
 _monitor = None
 
@@ -130,6 +133,16 @@ class Monitor(object):
         report[prefix + '.cpu.sys_pct'] = self._stats['stime_pct']
         report[prefix + '.memory.rss'] = self._stats['rss']
         report[prefix + '.threads_count'] = self._stats['threads']
+        for name, info in supervdsm.stats().items():
+            method_prefix = prefix + '.supervdsm.' + name
+            report[method_prefix + '.count'] = info['count']
+            report[method_prefix + '.errors'] = info['errors']
+            report[method_prefix + '.avg'] = info['avg']
+            report[method_prefix + '.max'] = info['max']
+        for name, value in qemuimg.info_cache_stats().items():
+            report[prefix + '.qemuimg.info_cache.' + name] = value
+        for name, value in logutils.threaded_handler_stats().items():
+            report[prefix + '.log.' + name] = value
         metrics.send(report)
 
 
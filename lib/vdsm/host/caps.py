@@ -20,16 +20,22 @@
 """Collect host capabilities"""
 from __future__ import absolute_import
 
+import copy
 import os
 import logging
+import threading
 import xml.etree.ElementTree as ET
 
 import libvirt
 
 from vdsm.common import cache
+from vdsm.common import concurrent
 from vdsm.common import dsaversion
+from vdsm.common.constants import P_VDSM_HOOKS
+from vdsm.common.time import monotonic_time
 from vdsm.config import config
 from vdsm.host import rngsources
+from vdsm.network.netlink import monitor
 from vdsm.storage import hba
 from vdsm import containersconnection
 from vdsm import cpuarch
@@ -144,79 +150,365 @@ def _getIscsiIniName():
     return ''
 
 
-def get():
-    caps = {}
-    cpu_topology = numa.cpu_topology()
-
-    caps['kvmEnabled'] = str(os.path.exists('/dev/kvm')).lower()
-
-    if config.getboolean('vars', 'report_host_threads_as_cores'):
-        caps['cpuCores'] = str(cpu_topology.threads)
-    else:
-        caps['cpuCores'] = str(cpu_topology.cores)
+# Sources invalidating capabilities sections.
+BOOT = "boot"            # Static until reboot
+PACKAGES = "packages"    # Changes when packages or hooks are installed
+NETWORK = "network"      # Changes on network events
+DEVICES = "devices"      # Changes on device hotplug
+ALWAYS = "always"        # Collected on every call
 
-    caps['cpuThreads'] = str(cpu_topology.threads)
-    caps['cpuSockets'] = str(cpu_topology.sockets)
-    caps['onlineCpus'] = ','.join(cpu_topology.online_cpus)
-    caps['cpuSpeed'] = cpuinfo.frequency()
-    caps['cpuModel'] = cpuinfo.model()
-    caps['cpuFlags'] = ','.join(cpuinfo.flags() +
-                                machinetype.compatible_cpu_models())
+SOURCES = (BOOT, PACKAGES, NETWORK, DEVICES)
 
-    caps.update(_getVersionInfo())
+_RPM_DB = '/var/lib/rpm/Packages'
+_DPKG_DB = '/var/lib/dpkg/status'
+_DEVICES_DIRS = ('/dev', '/sys/class/fc_host', '/sys/devices/system/node')
+_CPU_ONLINE = '/sys/devices/system/cpu/online'
+_NETLINK_GROUPS = ('link', 'ipv4-ifaddr', 'ipv6-ifaddr', 'ipv4-route',
+                   'ipv6-route')
+_RESOLV_CONF = '/etc/resolv.conf'
+# Network capabilities read from files are not reported by network events.
+# Cached network capabilities are collected again after this interval.
+_NETWORK_CACHE_TTL = 60
 
-    net_caps = supervdsm.getProxy().network_caps()
-    caps.update(net_caps)
 
-    try:
-        caps['hooks'] = hooks.installed()
-    except:
-        logging.debug('not reporting hooks', exc_info=True)
-
-    caps['operatingSystem'] = osinfo.version()
+def _boot_caps():
+    caps = {}
     caps['uuid'] = host.uuid()
-    caps['packages2'] = osinfo.package_versions()
+    caps['vmTypes'] = ['kvm']
     caps['realtimeKernel'] = osinfo.runtime_kernel_flags().realtime
     caps['kernelArgs'] = osinfo.kernel_args()
-    caps['nestedVirtualization'] = osinfo.nested_virtualization().enabled
-    caps['emulatedMachines'] = machinetype.emulated_machines(
-        cpuarch.effective())
-    caps['ISCSIInitiatorName'] = _getIscsiIniName()
-    caps['HBAInventory'] = hba.HBAInventory()
-    caps['vmTypes'] = ['kvm']
-
-    caps['memSize'] = str(utils.readMemInfo()['MemTotal'] / 1024)
     caps['reservedMem'] = str(config.getint('vars', 'host_mem_reserve') +
                               config.getint('vars', 'extra_mem_reserve'))
     caps['guestOverhead'] = config.get('vars', 'guest_ram_overhead')
+    caps['hostdevPassthrough'] = str(hostdev.is_supported()).lower()
+    caps['hugepages'] = hugepages.supported()
+    return caps
 
-    caps['rngSources'] = rngsources.list_available()
 
-    caps['numaNodes'] = dict(numa.topology())
-    caps['numaNodeDistance'] = dict(numa.distances())
-    caps['autoNumaBalancing'] = numa.autonuma_status()
-
-    caps['selinux'] = osinfo.selinux_status()
+def _package_caps():
+    caps = {}
+    caps['cpuFlags'] = ','.join(cpuinfo.flags() +
+                                machinetype.compatible_cpu_models())
+    caps.update(_getVersionInfo())
+    caps['operatingSystem'] = osinfo.version()
+    caps['packages2'] = osinfo.package_versions()
+    caps['emulatedMachines'] = machinetype.emulated_machines(
+        cpuarch.effective())
 
     liveSnapSupported = _getLiveSnapshotSupport(cpuarch.effective())
     if liveSnapSupported is not None:
         caps['liveSnapshot'] = str(liveSnapSupported).lower()
     caps['liveMerge'] = str(getLiveMergeSupport()).lower()
-    caps['kdumpStatus'] = osinfo.kdump_status()
 
-    caps['hostdevPassthrough'] = str(hostdev.is_supported()).lower()
     # TODO This needs to be removed after adding engine side support
     # and adding gdeploy support to enable libgfapi on RHHI by default
     caps['additionalFeatures'] = ['libgfapi_supported']
     if osinfo.glusterEnabled:
         from vdsm.gluster.api import glusterAdditionalFeatures
         caps['additionalFeatures'].extend(glusterAdditionalFeatures())
+    return caps
+
+
+def _hooks_caps():
+    caps = {}
+    try:
+        caps['hooks'] = hooks.installed()
+    except:
+        logging.debug('not reporting hooks', exc_info=True)
+    return caps
+
+
+def _network_caps():
+    return supervdsm.getProxy().network_caps()
+
+
+def _cpu_caps():
+    caps = {}
+    cpu_topology = numa.cpu_topology()
+
+    if config.getboolean('vars', 'report_host_threads_as_cores'):
+        caps['cpuCores'] = str(cpu_topology.threads)
+    else:
+        caps['cpuCores'] = str(cpu_topology.cores)
+
+    caps['cpuThreads'] = str(cpu_topology.threads)
+    caps['cpuSockets'] = str(cpu_topology.sockets)
+    caps['onlineCpus'] = ','.join(cpu_topology.online_cpus)
+    caps['cpuSpeed'] = cpuinfo.frequency()
+    caps['cpuModel'] = cpuinfo.model()
+    return caps
+
+
+def _device_caps():
+    caps = {}
+    caps['kvmEnabled'] = str(os.path.exists('/dev/kvm')).lower()
+    caps['memSize'] = str(utils.readMemInfo()['MemTotal'] / 1024)
+    caps['rngSources'] = rngsources.list_available()
+    caps['numaNodes'] = dict(numa.topology())
+    caps['numaNodeDistance'] = dict(numa.distances())
+    return caps
+
+
+def _hba_caps():
+    return {'HBAInventory': hba.HBAInventory()}
+
+
+def _host_caps():
+    caps = {}
+    caps['ISCSIInitiatorName'] = _getIscsiIniName()
+    caps['selinux'] = osinfo.selinux_status()
+    caps['kdumpStatus'] = osinfo.kdump_status()
     caps['containers'] = containersconnection.is_supported()
-    caps['hostedEngineDeployed'] = _isHostedEngineDeployed()
-    caps['hugepages'] = hugepages.supported()
+    # Kernel tunables, may be modified at runtime.
+    caps['autoNumaBalancing'] = numa.autonuma_status()
+    caps['nestedVirtualization'] = osinfo.nested_virtualization().enabled
     return caps
 
 
+def _hosted_engine_caps():
+    return {'hostedEngineDeployed': _isHostedEngineDeployed()}
+
+
+class Section(object):
+    """
+    A part of the host capabilities, collected by func, and invalidated by
+    source.
+    """
+
+    def __init__(self, name, source, func):
+        self.name = name
+        self.source = source
+        self.func = func
+
+    def collect(self):
+        return self.func()
+
+    def __repr__(self):
+        return "<Section name=%s source=%s>" % (self.name, self.source)
+
+
+_SECTIONS = (
+    Section('boot', BOOT, _boot_caps),
+    Section('packages', PACKAGES, _package_caps),
+    Section('hooks', PACKAGES, _hooks_caps),
+    Section('network', NETWORK, _network_caps),
+    Section('cpu', DEVICES, _cpu_caps),
+    Section('devices', DEVICES, _device_caps),
+    Section('hba', DEVICES, _hba_caps),
+    Section('host', ALWAYS, _host_caps),
+    Section('hostedEngine', ALWAYS, _hosted_engine_caps),
+)
+
+
+def _mtimes(paths):
+    stamp = []
+    for path in paths:
+        try:
+            stamp.append(os.stat(path).st_mtime)
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def _packages_stamp():
+    """
+    Installing packages modifies the package database, and installing hooks
+    modifies the hook directories.
+    """
+    paths = [_RPM_DB, _DPKG_DB, P_VDSM_HOOKS]
+    try:
+        paths.extend(os.path.join(P_VDSM_HOOKS, name)
+                     for name in sorted(os.listdir(P_VDSM_HOOKS)))
+    except OSError:
+        pass
+    return _mtimes(paths)
+
+
+def _devices_stamp():
+    """
+    Device hotplug modifies /dev, HBA hotplug modifies fc_host, cpu hotplug
+    modifies the online cpus, and onlining or offlining memory blocks
+    modifies the total memory.
+    """
+    try:
+        with open(_CPU_ONLINE) as f:
+            online = f.read()
+    except IOError:
+        online = None
+    mem_total = utils.readMemInfo()['MemTotal']
+    return _mtimes(_DEVICES_DIRS) + (online, mem_total)
+
+
+def _network_stamp():
+    """
+    Network capabilities can be cached only while the network watcher is
+    running, invalidating them on network events. DHCP clients and
+    NetworkManager may replace resolv.conf without any network event, and
+    other values are read from files, so cached capabilities also expire
+    after _NETWORK_CACHE_TTL seconds.
+    """
+    if _network_watcher is None:
+        return None
+    try:
+        st = os.stat(_RESOLV_CONF)
+        resolv_conf = (st.st_ino, st.st_mtime)
+    except OSError:
+        resolv_conf = None
+    return int(monotonic_time() // _NETWORK_CACHE_TTL), resolv_conf
+
+
+class _SectionsCache(object):
+    """
+    Cache capabilities sections until their invalidation source changes,
+    collecting the stale sections concurrently.
+
+    A source is changed when invalidate() is called, or when its stamp
+    changes. A source with no stamp function is valid until invalidated. If
+    a stamp function returns None, the source cannot be cached.
+    """
+
+    def __init__(self, sections, stamps, enabled=True):
+        self._sections = sections
+        self._stamps = stamps
+        self._enabled = enabled
+        self._lock = threading.Lock()
+        self._generations = {source: 0 for source in SOURCES}
+        self._entries = {}
+
+    def invalidate(self, *sources):
+        with self._lock:
+            for source in sources or SOURCES:
+                self._generations[source] += 1
+                logging.debug("Invalidated %s capabilities", source)
+
+    def get(self):
+        caps = {}
+        stale = []
+
+        for section in self._sections:
+            key = self._key(section.source)
+            if key is not None:
+                with self._lock:
+                    entry = self._entries.get(section.name)
+                if entry is not None and entry[0] == key:
+                    caps.update(copy.deepcopy(entry[1]))
+                    continue
+            stale.append((section, key))
+
+        results = concurrent.tmap(lambda item: item[0].collect(), stale)
+
+        for (section, key), res in zip(stale, results):
+            if not res.succeeded:
+                raise res.value
+            if key is not None:
+                with self._lock:
+                    self._entries[section.name] = (
+                        key, copy.deepcopy(res.value))
+            caps.update(res.value)
+
+        return caps
+
+    def _key(self, source):
+        if not self._enabled or source == ALWAYS:
+            return None
+        # Take the generation before collecting, so invalidating a source
+        # during collection drops the result on the next call.
+        with self._lock:
+            generation = self._generations[source]
+        stamp_func = self._stamps.get(source)
+        if stamp_func is None:
+            return generation,
+        stamp = stamp_func()
+        if stamp is None:
+            return None
+        return generation, stamp
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_network_watcher = None
+
+
+def _get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = _SectionsCache(
+                _SECTIONS,
+                {
+                    PACKAGES: _packages_stamp,
+                    NETWORK: _network_stamp,
+                    DEVICES: _devices_stamp,
+                },
+                enabled=config.getboolean('vars', 'cache_host_capabilities'))
+        return _cache
+
+
+def get():
+    return _get_cache().get()
+
+
+def invalidate(*sources):
+    """
+    Invalidate cached capabilities of sources, or all sources if none
+    specified.
+    """
+    _get_cache().invalidate(*sources)
+
+
+class _NetworkWatcher(object):
+    """
+    Invalidate network capabilities on link, address and route events.
+    """
+
+    def __init__(self):
+        self._monitor = monitor.Monitor(groups=_NETLINK_GROUPS)
+        self._thread = concurrent.thread(self._run, name="caps/network",
+                                         log=logging.getLogger("caps"))
+
+    def start(self):
+        self._monitor.start()
+        self._thread.start()
+
+    def stop(self):
+        self._monitor.stop()
+        self._thread.join()
+        self._monitor.wait()
+
+    def _run(self):
+        global _network_watcher
+        try:
+            for event in self._monitor:
+                invalidate(NETWORK)
+        finally:
+            # Do not cache network capabilities without events.
+            if _network_watcher is self:
+                _network_watcher = None
+            invalidate(NETWORK)
+
+
+def start():
+    """
+    Start watching network events, enabling caching of network capabilities.
+    """
+    global _network_watcher
+    _network_watcher = _NetworkWatcher()
+    try:
+        _network_watcher.start()
+    except:
+        _network_watcher = None
+        raise
+    invalidate(NETWORK)
+
+
+def stop():
+    global _network_watcher
+    watcher = _network_watcher
+    if watcher is not None:
+        _network_watcher = None
+        watcher.stop()
+
+
 def _dropVersion(vstring, logMessage):
     logging.error(logMessage)
 
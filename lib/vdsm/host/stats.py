@@ -108,43 +108,57 @@ def produce(first_sample, last_sample):
 
 def _get_cpu_core_stats(first_sample, last_sample):
     interval = last_sample.timestamp - first_sample.timestamp
-
-    def compute_cpu_usage(cpu_core, mode):
-        first_core_sample = first_sample.cpuCores.getCoreSample(cpu_core)
-        last_core_sample = last_sample.cpuCores.getCoreSample(cpu_core)
-        if not first_core_sample or not last_core_sample:
-            raise MissingSample()
-        jiffies = (
-            last_core_sample[mode] - first_core_sample[mode]
-        ) % JIFFIES_BOUND
-        return ("%.2f" % (jiffies / interval))
+    first = first_sample.cpuCores
+    last = last_sample.cpuCores
+
+    if first.cpus == last.cpus:
+        cpus = last.cpus
+        first_user, first_sys = first.user, first.sys
+        last_user, last_sys = last.user, last.sys
+    else:
+        # Cores went online or offline between the samples; only collect
+        # data when both samples of a core are present.
+        first_index = {cpu: i for i, cpu in enumerate(first.cpus)}
+        last_index = [i for i, cpu in enumerate(last.cpus)
+                      if cpu in first_index]
+        cpus = [last.cpus[i] for i in last_index]
+        first_index = [first_index[cpu] for cpu in cpus]
+        first_user = [first.user[i] for i in first_index]
+        first_sys = [first.sys[i] for i in first_index]
+        last_user = [last.user[i] for i in last_index]
+        last_sys = [last.sys[i] for i in last_index]
+
+    user_usage = _cpu_usage(first_user, last_user, interval)
+    sys_usage = _cpu_usage(first_sys, last_sys, interval)
+    cpu_nodes = _cpu_nodes()
 
     cpu_core_stats = {}
-    for node_index, numa_node in six.iteritems(numa.topology()):
-        cpu_cores = numa_node['cpus']
-        for cpu_core in cpu_cores:
-            try:
-                user_cpu_usage = compute_cpu_usage(cpu_core, 'user')
-                system_cpu_usage = compute_cpu_usage(cpu_core, 'sys')
-            except MissingSample:
-                # Only collect data when all required samples already present
-                continue
-            core_stat = {
-                'nodeIndex': int(node_index),
-                'cpuUser': user_cpu_usage,
-                'cpuSys': system_cpu_usage,
-            }
-            core_stat['cpuIdle'] = (
-                "%.2f" % max(0.0,
-                             100.0 -
-                             float(core_stat['cpuUser']) -
-                             float(core_stat['cpuSys'])))
-            cpu_core_stats[str(cpu_core)] = core_stat
+    for cpu_core, user_cpu_usage, system_cpu_usage in zip(
+            cpus, user_usage, sys_usage):
+        node_index = cpu_nodes.get(cpu_core)
+        if node_index is None:
+            continue
+        cpu_core_stats[str(cpu_core)] = {
+            'nodeIndex': node_index,
+            'cpuUser': user_cpu_usage,
+            'cpuSys': system_cpu_usage,
+            'cpuIdle': "%.2f" % max(0.0,
+                                    100.0 -
+                                    float(user_cpu_usage) -
+                                    float(system_cpu_usage)),
+        }
     return cpu_core_stats
 
 
-class MissingSample(Exception):
-    pass
+def _cpu_usage(first_jiffies, last_jiffies, interval):
+    return ["%.2f" % (((last - first) % JIFFIES_BOUND) / interval)
+            for first, last in zip(first_jiffies, last_jiffies)]
+
+
+def _cpu_nodes():
+    return {cpu_core: int(node_index)
+            for node_index, numa_node in six.iteritems(numa.topology())
+            for cpu_core in numa_node['cpus']}
 
 
 def _get_interfaces_stats(first_sample, last_sample):
@@ -25,7 +25,7 @@ from vdsm.common.cmdutils import exec_cmd as exec_sync_bytes
 from vdsm.network import py2to3
 
 
-def exec_sync(cmds):
+def exec_sync(cmds, data=None):
     """Execute a command and convert returned values to native string.
 
     Native string format is bytes for Python 2 and unicode for Python 3. It is
@@ -34,8 +34,12 @@ def exec_sync(cmds):
 
     Note that this function should not be used if output data could be
     undecodable bytes.
+
+    data, if given, is written to the command's stdin.
     """
-    retcode, out, err = exec_sync_bytes(cmds)
+    if data is not None:
+        data = py2to3.to_binary(data)
+    retcode, out, err = exec_sync_bytes(cmds, data=data)
     return retcode, py2to3.to_str(out), py2to3.to_str(err)
 
 
@@ -18,6 +18,7 @@
 #
 
 from __future__ import absolute_import
+from contextlib import contextmanager
 import logging
 
 import six
@@ -28,6 +29,7 @@ from vdsm.network.netconfpersistence import RunningConfig
 from vdsm.network.link import iface as link_iface
 
 from ..errors import RollbackIncomplete
+from . import bringup
 from . import qos
 from ..models import Bond, hierarchy_vlan_tag, hierarchy_backing_device
 
@@ -40,6 +42,7 @@ class Configurator(object):
         self._inRollback = inRollback
         self.runningConfig = None
         self.unifiedPersistence = is_unipersistence
+        self._bringup = None
 
     def __enter__(self):
         return self
@@ -58,6 +61,20 @@ class Configurator(object):
             if leftover:
                 raise RollbackIncomplete(leftover, type, value)
 
+    @contextmanager
+    def deferred_bringup(self):
+        """
+        Collect the devices which configurators may bring up later, as they
+        are not needed by the devices configured after them in this context.
+        Yields a bringup.Plan; the caller runs it, bringing the collected
+        devices up concurrently.
+        """
+        self._bringup = bringup.Plan()
+        try:
+            yield self._bringup
+        finally:
+            self._bringup = None
+
     def rollback(self):
         """
         returns None when all the nets were successfully rolled back, a
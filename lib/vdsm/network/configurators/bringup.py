@@ -0,0 +1,118 @@
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+"""
+Run actions on network devices (ifup, ifdown) following the device hierarchy.
+
+Each device in a plan may require other devices to be handled first; when
+bringing devices up, a vlan requires its base device and a bridge requires its
+port. Devices which do not depend on each other are handled concurrently.
+"""
+from __future__ import absolute_import
+
+import logging
+
+import six
+
+from vdsm.common import concurrent
+
+MAX_WORKERS = 8
+
+
+class Plan(object):
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self._max_workers = max_workers
+        self._actions = {}
+        self._requires = {}
+        self.failed = []
+
+    def add(self, device, action, requires=()):
+        """
+        Run action (a callable without arguments) for device, after the
+        actions of the required devices succeeded. Required devices which are
+        not part of the plan are ignored. Adding a device again replaces its
+        action.
+        """
+        self._actions[device] = action
+        self._requires.setdefault(device, set()).update(requires)
+
+    def run(self):
+        """
+        Run the actions of all the devices, level by level. The devices of a
+        level require only devices of previous levels, and their actions run
+        concurrently.
+
+        A device requiring a failed device is skipped. Failed and skipped
+        devices are reported in the failed list; once all the other actions
+        are done, the error of the first failed action is raised.
+        """
+        error = None
+        failed = set()
+        for level in self._levels():
+            devices = []
+            for device in level:
+                if self._requires[device] & failed:
+                    logging.warning('Skipping %s, a device it requires '
+                                    'failed', device)
+                    failed.add(device)
+                else:
+                    devices.append(device)
+
+            results = concurrent.tmap(self._run_action, devices,
+                                      max_workers=self._max_workers)
+            for device, result in zip(devices, results):
+                if not result.succeeded:
+                    failed.add(device)
+                    if error is None:
+                        error = result.value
+
+        self.failed = sorted(failed)
+        if error is not None:
+            raise error
+
+    def _run_action(self, device):
+        try:
+            self._actions[device]()
+        except Exception:
+            logging.debug('Action on device %s failed', device, exc_info=True)
+            raise
+
+    def _levels(self):
+        depths = {}
+        for device in self._actions:
+            self._depth(device, depths, set())
+        levels = []
+        for device, depth in sorted(six.iteritems(depths)):
+            while len(levels) <= depth:
+                levels.append([])
+            levels[depth].append(device)
+        return levels
+
+    def _depth(self, device, depths, visiting):
+        if device in depths:
+            return depths[device]
+        if device in visiting:
+            raise ValueError('Cyclic device dependency: %s' % device)
+        visiting.add(device)
+        requires = self._requires[device].intersection(self._actions)
+        depth = max([self._depth(required, depths, visiting) + 1
+                     for required in requires] or [0])
+        visiting.discard(device)
+        depths[device] = depth
+        return depth
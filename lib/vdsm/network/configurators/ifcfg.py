@@ -21,6 +21,7 @@ from __future__ import absolute_import
 from contextlib import contextmanager
 import copy
 import errno
+import functools
 import glob
 import logging
 import os
@@ -58,6 +59,7 @@ from vdsm.network.netinfo import nics, vlans, misc, NET_PATH
 from vdsm.network.netlink import waitfor
 
 from . import Configurator, getEthtoolOpts
+from . import bringup
 from .ifcfg_acquire import IfcfgAcquire
 from ..errors import ConfigNetworkError, ERR_BAD_BONDING, ERR_FAILED_IFUP
 from ..models import Nic, Bridge, Bond as bond_model
@@ -109,7 +111,10 @@ class Ifcfg(Configurator):
         if bridge.port:
             bridge.port.configure(**opts)
         self._addSourceRoute(bridge)
-        _ifup(bridge)
+        if self._bringup is None:
+            _ifup(bridge)
+        else:
+            self._bringup.add(bridge.name, functools.partial(_ifup, bridge))
 
     def configureVlan(self, vlan, **opts):
         if not self.owned_device(vlan.name):
@@ -779,30 +784,49 @@ class ConfigWriter(object):
 
 
 def stop_devices(device_ifcfgs):
-    for dev in reversed(_sort_device_ifcfgs(device_ifcfgs)):
-        ifdown(dev)
-        if os.path.exists('/sys/class/net/%s/bridge' % dev):
-            # ifdown is not enough to remove nicless bridges
-            cmd.exec_sync([EXT_BRCTL, 'delbr', dev])
-        if _is_bond_name(dev):
-            if _is_running_bond(dev):
-                with open(BONDING_MASTERS, 'w') as f:
-                    f.write("-%s\n" % dev)
+    hierarchy = _device_hierarchy(device_ifcfgs)
+    uppers = {dev: set() for dev in hierarchy}
+    for dev, lowers in six.iteritems(hierarchy):
+        for lower in lowers.intersection(uppers):
+            uppers[lower].add(dev)
+
+    plan = bringup.Plan()
+    for dev in hierarchy:
+        plan.add(dev, functools.partial(_stop_device, dev),
+                 requires=uppers[dev])
+    plan.run()
+
+
+def _stop_device(dev):
+    ifdown(dev)
+    if os.path.exists('/sys/class/net/%s/bridge' % dev):
+        # ifdown is not enough to remove nicless bridges
+        cmd.exec_sync([EXT_BRCTL, 'delbr', dev])
+    if _is_bond_name(dev):
+        if _is_running_bond(dev):
+            with open(BONDING_MASTERS, 'w') as f:
+                f.write("-%s\n" % dev)
 
 
 def start_devices(device_ifcfgs):
-    for dev in _sort_device_ifcfgs(device_ifcfgs):
-        try:
-            # this is an ugly way to check if this is a bond but picking into
-            # the ifcfg files is even worse.
-            if _is_bond_name(dev):
-                if not _is_running_bond(dev):
-                    with open(BONDING_MASTERS, 'w') as masters:
-                        masters.write('+%s\n' % dev)
-            _exec_ifup_by_name(dev)
-        except ConfigNetworkError:
-            logging.error('Failed to ifup device %s during rollback.', dev,
-                          exc_info=True)
+    plan = bringup.Plan()
+    for dev, lowers in six.iteritems(_device_hierarchy(device_ifcfgs)):
+        plan.add(dev, functools.partial(_start_device, dev), requires=lowers)
+    plan.run()
+
+
+def _start_device(dev):
+    try:
+        # this is an ugly way to check if this is a bond but picking into
+        # the ifcfg files is even worse.
+        if _is_bond_name(dev):
+            if not _is_running_bond(dev):
+                with open(BONDING_MASTERS, 'w') as masters:
+                    masters.write('+%s\n' % dev)
+        _exec_ifup_by_name(dev)
+    except ConfigNetworkError:
+        logging.error('Failed to ifup device %s during rollback.', dev,
+                      exc_info=True)
 
 
 def _is_bond_name(dev):
@@ -815,11 +839,13 @@ def _is_running_bond(bond):
     return bond in names
 
 
-def _sort_device_ifcfgs(device_ifcfgs):
-    devices = {'Bridge': [],
-               'Vlan': [],
-               'Slave': [],
-               'Other': []}
+def _device_hierarchy(device_ifcfgs):
+    """
+    Return a dict mapping the devices of the ifcfg files to the devices they
+    are built on: a vlan to its base device and a bridge to its ports. Bond
+    slaves are not included, as they are handled with their bond.
+    """
+    contents = {}
     for conf_file in device_ifcfgs:
         if not conf_file.startswith(NET_CONF_PREF):
             continue
@@ -832,10 +858,22 @@ def _sort_device_ifcfgs(device_ifcfgs):
             else:
                 raise
         dev = conf_file[len(NET_CONF_PREF):]
+        contents[dev] = content
 
-        devices[_dev_type(content)].append(dev)
+    hierarchy = {}
+    for dev, content in six.iteritems(contents):
+        dev_type = _dev_type(content)
+        if dev_type == 'Slave':
+            continue
+        lowers = hierarchy.setdefault(dev, set())
+        if dev_type == 'Vlan':
+            lowers.add(dev.rsplit('.', 1)[0])
 
-    return devices['Other'] + devices['Vlan'] + devices['Bridge']
+    for dev, content in six.iteritems(contents):
+        bridge = _dev_bridge(content)
+        if bridge in hierarchy:
+            hierarchy[bridge].add(dev)
+    return hierarchy
 
 
 def _dev_type(content):
@@ -849,6 +887,11 @@ def _dev_type(content):
         return "Other"
 
 
+def _dev_bridge(content):
+    match = re.search('^BRIDGE=[\'"]?([^\'"\n]+)', content, re.MULTILINE)
+    return match.group(1) if match else None
+
+
 def ifup(iface):
     """Bring up an interface"""
     _exec_ifup_by_name(iface, cgroup=None)
@@ -55,31 +55,26 @@ def remove_outbound(device, vlan_tag, net_info):
     class_id = '%x' % (_NON_VLANNED_ID if vlan_tag is None else vlan_tag)
     MISSING_OBJ_ERR_CODES = (errno.EINVAL, errno.ENOENT, errno.EOPNOTSUPP)
 
-    try:
-        tc.filter.delete(
-            device, pref=_NON_VLANNED_ID if vlan_tag is None else vlan_tag)
-    except tc.TrafficControlException as tce:
-        if tce.errCode not in MISSING_OBJ_ERR_CODES:  # No filter exists
-            raise
-
     device_qdiscs = list(tc.qdiscs(device))
+    with tc.Batch() as batch:
+        with batch.ignore(*MISSING_OBJ_ERR_CODES):  # No filter/class exists
+            tc.filter.delete(
+                device, pref=_NON_VLANNED_ID if vlan_tag is None else vlan_tag,
+                batch=batch)
+            if device_qdiscs:
+                root_qdisc_handle = netinfo_qos.get_root_qdisc(
+                    device_qdiscs)['handle']
+                tc.cls.delete(device, classid=root_qdisc_handle + class_id,
+                              batch=batch)
     if not device_qdiscs:
         return
-    root_qdisc_handle = netinfo_qos.get_root_qdisc(device_qdiscs)['handle']
-    try:
-        tc.cls.delete(device, classid=root_qdisc_handle + class_id)
-    except tc.TrafficControlException as tce:
-        if tce.errCode not in MISSING_OBJ_ERR_CODES:  # No class exists
-            raise
 
     if not _uses_classes(device, net_info,
                          root_qdisc_handle=root_qdisc_handle):
-        try:
-            tc._qdisc_del(device)
-            tc._qdisc_del(device, kind='ingress')
-        except tc.TrafficControlException as tce:
-            if tce.errCode not in MISSING_OBJ_ERR_CODES:  # No qdisc
-                raise
+        with tc.Batch() as batch:
+            with batch.ignore(*MISSING_OBJ_ERR_CODES):  # No qdisc
+                tc._qdisc_del(device, batch=batch)
+                tc._qdisc_del(device, kind='ingress', batch=batch)
 
 
 def _uses_classes(device, net_info, root_qdisc_handle=None):
@@ -97,37 +92,35 @@ def _uses_classes(device, net_info, root_qdisc_handle=None):
 
 def _fresh_qdisc_conf_out(dev, vlan_tag, class_id, qos):
     """Replaces the dev qdisc with hfsc and sets up the shaping"""
-    # Use deletion + addition to flush children classes and filters
-    try:
-        tc.qdisc.delete(dev)  # Deletes the root qdisc by default
-    except tc.TrafficControlException as tce:
-        if tce.errCode != errno.ENOENT:
-            raise
-    try:
-        tc.qdisc.delete(dev, kind='ingress')  # Deletes the ingress qdisc
-    except tc.TrafficControlException as tce:
-        if tce.errCode not in (errno.EINVAL,
-                               errno.ENOENT):  # No ingress exists
-            raise
-
-    tc.qdisc.add(dev, _SHAPING_QDISC_KIND, handle='0x' + _ROOT_QDISC_HANDLE,
-                 default='%#x' % _NON_VLANNED_ID)
-    tc.qdisc.add(dev, 'ingress')
-
-    # Add traffic classes
-    _add_hfsc_cls(dev, _ROOT_QDISC_HANDLE, class_id, **qos)
-    if class_id != _DEFAULT_CLASSID:  # We need to add a default class
-        _add_hfsc_cls(dev, _ROOT_QDISC_HANDLE, _DEFAULT_CLASSID, ls=qos['ls'])
-
-    # Add filters to move the traffic into the classes we just created
-    _add_non_vlanned_filter(dev, _ROOT_QDISC_HANDLE)
-    if class_id != _DEFAULT_CLASSID:
-        _add_vlan_filter(dev, vlan_tag, _ROOT_QDISC_HANDLE, class_id)
-
-    # Add inside intra-class fairness qdisc (fq_codel/sfq)
-    _add_fair_qdisc(dev, _ROOT_QDISC_HANDLE, class_id)
-    if class_id != _DEFAULT_CLASSID:
-        _add_fair_qdisc(dev, _ROOT_QDISC_HANDLE, _DEFAULT_CLASSID)
+    with tc.Batch() as batch:
+        # Use deletion + addition to flush children classes and filters
+        with batch.ignore(errno.ENOENT):
+            # Deletes the root qdisc by default
+            tc.qdisc.delete(dev, batch=batch)
+        with batch.ignore(errno.EINVAL, errno.ENOENT):  # No ingress exists
+            tc.qdisc.delete(dev, kind='ingress', batch=batch)
+
+        tc.qdisc.add(dev, _SHAPING_QDISC_KIND,
+                     handle='0x' + _ROOT_QDISC_HANDLE,
+                     default='%#x' % _NON_VLANNED_ID, batch=batch)
+        tc.qdisc.add(dev, 'ingress', batch=batch)
+
+        # Add traffic classes
+        _add_hfsc_cls(dev, _ROOT_QDISC_HANDLE, class_id, batch=batch, **qos)
+        if class_id != _DEFAULT_CLASSID:  # We need to add a default class
+            _add_hfsc_cls(dev, _ROOT_QDISC_HANDLE, _DEFAULT_CLASSID,
+                          batch=batch, ls=qos['ls'])
+
+        # Add filters to move the traffic into the classes we just created
+        _add_non_vlanned_filter(dev, _ROOT_QDISC_HANDLE, batch)
+        if class_id != _DEFAULT_CLASSID:
+            _add_vlan_filter(dev, vlan_tag, _ROOT_QDISC_HANDLE, class_id,
+                             batch)
+
+        # Add inside intra-class fairness qdisc (fq_codel/sfq)
+        _add_fair_qdisc(dev, _ROOT_QDISC_HANDLE, class_id, batch)
+        if class_id != _DEFAULT_CLASSID:
+            _add_fair_qdisc(dev, _ROOT_QDISC_HANDLE, _DEFAULT_CLASSID, batch)
 
 
 def _qdisc_conf_out(dev, root_qdisc_handle, vlan_tag, class_id, qos):
@@ -141,63 +134,69 @@ def _qdisc_conf_out(dev, root_qdisc_handle, vlan_tag, class_id, qos):
                flow_id in
                (filt_flow_id(filt, 'basic'), filt_flow_id(filt, 'u32'))]
 
-    # Clear up any previous filters to the class
-    for filt in filters:
-        try:
-            tc.filter.delete(dev, filt['pref'], parent=root_qdisc_handle)
-        except tc.TrafficControlException as tce:
-            if tce.errCode != errno.EINVAL:  # no filters exist -> EINVAL
-                raise
-
-    # Clear the class in case it exists
-    try:
-        tc.cls.delete(dev, classid=root_qdisc_handle + class_id)
-    except tc.TrafficControlException as tce:
-        if tce.errCode != errno.ENOENT:
-            raise
-
-    _add_hfsc_cls(dev, root_qdisc_handle, class_id, **qos)
-    if class_id == _DEFAULT_CLASSID:
-        _add_non_vlanned_filter(dev, root_qdisc_handle)
-    else:
-        if not _is_explicit_defined_default_class(dev):
-            default_class, = [c['hfsc'] for c in tc.classes(
-                dev) if c['handle'] == _ROOT_QDISC_HANDLE + _DEFAULT_CLASSID]
-            ls_max_rate = _max_hfsc_ls_rate(dev)
-            default_class['ls']['m2'] = ls_max_rate
-
-            tc.cls.delete(dev, classid=_ROOT_QDISC_HANDLE + _DEFAULT_CLASSID)
-            _add_hfsc_cls(dev, _ROOT_QDISC_HANDLE, _DEFAULT_CLASSID,
-                          ls=default_class['ls'])
-            _add_fair_qdisc(dev, _ROOT_QDISC_HANDLE, _DEFAULT_CLASSID)
-
-        _add_vlan_filter(dev, vlan_tag, root_qdisc_handle, class_id)
-    _add_fair_qdisc(dev, root_qdisc_handle, class_id)
-
-
-def _add_vlan_filter(dev, vlan_tag, root_qdisc_handle, class_id):
+    with tc.Batch() as batch:
+        # Clear up any previous filters to the class
+        for filt in filters:
+            with batch.ignore(errno.EINVAL):  # no filters exist -> EINVAL
+                tc.filter.delete(dev, filt['pref'], parent=root_qdisc_handle,
+                                 batch=batch)
+
+        # Clear the class in case it exists
+        with batch.ignore(errno.ENOENT):
+            tc.cls.delete(dev, classid=root_qdisc_handle + class_id,
+                          batch=batch)
+
+        _add_hfsc_cls(dev, root_qdisc_handle, class_id, batch=batch, **qos)
+        if class_id == _DEFAULT_CLASSID:
+            _add_non_vlanned_filter(dev, root_qdisc_handle, batch)
+
+    with tc.Batch() as batch:
+        if class_id != _DEFAULT_CLASSID:
+            if not _is_explicit_defined_default_class(dev):
+                # Reads the classes, including the one added above.
+                default_class, = [
+                    c['hfsc'] for c in tc.classes(dev)
+                    if c['handle'] == _ROOT_QDISC_HANDLE + _DEFAULT_CLASSID]
+                ls_max_rate = _max_hfsc_ls_rate(dev)
+                default_class['ls']['m2'] = ls_max_rate
+
+                tc.cls.delete(dev,
+                              classid=_ROOT_QDISC_HANDLE + _DEFAULT_CLASSID,
+                              batch=batch)
+                _add_hfsc_cls(dev, _ROOT_QDISC_HANDLE, _DEFAULT_CLASSID,
+                              batch=batch, ls=default_class['ls'])
+                _add_fair_qdisc(dev, _ROOT_QDISC_HANDLE, _DEFAULT_CLASSID,
+                                batch)
+
+            _add_vlan_filter(dev, vlan_tag, root_qdisc_handle, class_id,
+                             batch)
+        _add_fair_qdisc(dev, root_qdisc_handle, class_id, batch)
+
+
+def _add_vlan_filter(dev, vlan_tag, root_qdisc_handle, class_id, batch=None):
     tc.filter.replace(dev, parent=root_qdisc_handle, protocol='all',
                       pref=vlan_tag,
                       basic=['match', 'meta(vlan eq %s)' % vlan_tag,
-                             'flowid', root_qdisc_handle + class_id]
-                      )
+                             'flowid', root_qdisc_handle + class_id],
+                      batch=batch)
 
 
-def _add_non_vlanned_filter(dev, root_qdisc_handle):
+def _add_non_vlanned_filter(dev, root_qdisc_handle, batch=None):
     tc.filter.replace(dev, parent=root_qdisc_handle, protocol='all',
                       pref=_NON_VLANNED_ID,
                       u32=['match', 'u8', '0', '0', 'flowid',
-                           '%#x' % _NON_VLANNED_ID])
+                           '%#x' % _NON_VLANNED_ID],
+                      batch=batch)
 
 
-def _add_fair_qdisc(dev, root_qdisc_handle, class_id):
+def _add_fair_qdisc(dev, root_qdisc_handle, class_id, batch=None):
     tc.qdisc.add(dev, _FAIR_QDISC_KIND, parent=root_qdisc_handle + class_id,
-                 handle=class_id + ':')
+                 handle=class_id + ':', batch=batch)
 
 
-def _add_hfsc_cls(dev, root_qdisc_handle, class_id, **qos_opts):
+def _add_hfsc_cls(dev, root_qdisc_handle, class_id, batch=None, **qos_opts):
     tc.cls.add(dev, _SHAPING_QDISC_KIND, parent=root_qdisc_handle,
-               classid=root_qdisc_handle + class_id, **qos_opts)
+               classid=root_qdisc_handle + class_id, batch=batch, **qos_opts)
 
 
 def _is_explicit_defined_default_class(dev):
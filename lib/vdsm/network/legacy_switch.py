@@ -408,26 +408,41 @@ def add_missing_networks(configurator, networks, bondings, _netinfo):
     # We need to use the newest host info
     _netinfo.updateDevices()
 
-    for network, attrs in six.iteritems(networks):
-        if 'remove' in attrs:
-            continue
-
-        bond = attrs.get('bonding')
-        if bond:
-            _check_bonding_availability(bond, bondings, _netinfo)
-
-        logging.debug('Adding network %r', network)
-        try:
-            _add_network(network, configurator, _netinfo, **attrs)
-        except ConfigNetworkError as cne:
-            if cne.errCode == ne.ERR_FAILED_IFUP:
-                logging.debug('Adding network %r failed. Running '
+    # Bridges are brought up once all the networks are configured, since the
+    # devices of the following networks are never built on them.
+    with configurator.deferred_bringup() as bringup:
+        for network, attrs in six.iteritems(networks):
+            if 'remove' in attrs:
+                continue
+
+            bond = attrs.get('bonding')
+            if bond:
+                _check_bonding_availability(bond, bondings, _netinfo)
+
+            logging.debug('Adding network %r', network)
+            try:
+                _add_network(network, configurator, _netinfo, **attrs)
+            except ConfigNetworkError as cne:
+                if cne.errCode == ne.ERR_FAILED_IFUP:
+                    logging.debug('Adding network %r failed. Running '
+                                  'orphan-devices cleanup', network)
+                    _emergency_network_cleanup(network, attrs,
+                                               configurator)
+                raise
+
+            _netinfo.updateDevices()  # Things like a bond mtu can change
+
+    try:
+        bringup.run()
+    except ConfigNetworkError as cne:
+        if cne.errCode == ne.ERR_FAILED_IFUP:
+            # The deferred devices are the bridges of bridged networks.
+            for network in bringup.failed:
+                logging.debug('Bringing up network %r failed. Running '
                               'orphan-devices cleanup', network)
-                _emergency_network_cleanup(network, attrs,
+                _emergency_network_cleanup(network, networks[network],
                                            configurator)
-            raise
-
-        _netinfo.updateDevices()  # Things like a bond mtu can change
+        raise
 
 
 def _emergency_network_cleanup(network, networkAttrs, configurator):
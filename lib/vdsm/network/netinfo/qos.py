@@ -63,6 +63,11 @@ def report_network_qos(nets_info, devs_info):
             class_id = (get_root_qdisc(iface_qdiscs)['handle'] +
                         DEFAULT_CLASSID)
 
+        # Only hfsc root qdiscs have classes to report. Checking the qdisc
+        # dump first saves a class dump for every network without QoS.
+        if get_root_qdisc(iface_qdiscs)['kind'] != 'hfsc':
+            continue
+
         # Now that iface is either a bond or a nic, let's get the QoS info
         classes = [cls for cls in tc.classes(iface, classid=class_id) if
                    cls['kind'] == 'hfsc']
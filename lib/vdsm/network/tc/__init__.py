@@ -29,22 +29,23 @@ from . import filter as tc_filter
 from . import _parser
 from . import cls
 from . import qdisc
+from ._wrapper import Batch
 from ._wrapper import TrafficControlException
 
 QDISC_INGRESS = 'ffff:'
 
 
-def _addTarget(network, parent, target):
+def _addTarget(network, parent, target, batch=None):
     fs = list(filters(network, parent))
     if fs:
         filt = fs[0]
     else:
         filt = Filter(prio=None, handle=None, actions=[])
     filt.actions.append(MirredAction(target))
-    _filter_replace(network, parent, filt)
+    _filter_replace(network, parent, filt, batch)
 
 
-def _delTarget(network, parent, target):
+def _delTarget(network, parent, target, batch=None):
     fs = list(filters(network, parent))
     if fs:
         filt = fs[0]
@@ -57,9 +58,9 @@ def _delTarget(network, parent, target):
 
     if acts:
         filt = Filter(prio=filt.prio, handle=filt.handle, actions=acts)
-        _filter_replace(network, parent, filt)
+        _filter_replace(network, parent, filt, batch)
     else:
-        tc_filter.delete(network, filt.prio, parent=parent)
+        tc_filter.delete(network, filt.prio, parent=parent, batch=batch)
     return acts
 
 
@@ -75,12 +76,15 @@ def setPortMirroring(network, target):
 
     this commands mirror all 'networkName' traffic to 'ifaceName'
     '''
-    _qdisc_replace_ingress(network)
-    _addTarget(network, QDISC_INGRESS, target)
+    with Batch() as batch:
+        qdisc.replace(network, 'prio', parent=None, batch=batch)
+        # Last, so an existing ingress qdisc does not split the batch.
+        _qdisc_replace_ingress(network, batch)
 
-    qdisc.replace(network, 'prio', parent=None)
     qdisc_id = next(_qdiscs_of_device(network))
-    _addTarget(network, qdisc_id, target)
+    with Batch() as batch:
+        _addTarget(network, QDISC_INGRESS, target, batch)
+        _addTarget(network, qdisc_id, target, batch)
     ipwrapper.getLink(network).promisc = True
 
 
@@ -96,20 +100,27 @@ def unsetPortMirroring(network, target):
     # TODO handle the case where we have partial definitions on device due to
     # vdsm crash
     '''
-    acts = _delTarget(network, QDISC_INGRESS, target)
-    try:
-        qdisc_id = next(_qdiscs_of_device(network))
-        acts += _delTarget(network, qdisc_id, target)
-    except StopIteration:
-        pass
+    with Batch() as batch:
+        acts = _delTarget(network, QDISC_INGRESS, target, batch)
+        try:
+            qdisc_id = next(_qdiscs_of_device(network))
+            acts += _delTarget(network, qdisc_id, target, batch)
+        except StopIteration:
+            pass
+
+        if not acts:
+            _qdisc_del(network, batch=batch)
+            _qdisc_del(network, kind='ingress', batch=batch)
 
     if not acts:
-        _qdisc_del(network)
-        _qdisc_del(network, kind='ingress')
         ipwrapper.getLink(network).promisc = False
 
 
-def _qdisc_replace_ingress(dev):
+def _qdisc_replace_ingress(dev, batch=None):
+    if batch is not None:
+        with batch.ignore(errno.EEXIST):
+            qdisc.add(dev, 'ingress', batch=batch)
+        return
     try:
         qdisc.add(dev, 'ingress')
     except TrafficControlException as e:
@@ -119,7 +130,7 @@ def _qdisc_replace_ingress(dev):
             raise
 
 
-def _filter_replace(dev, parent, filt):
+def _filter_replace(dev, parent, filt, batch=None):
     if filt.prio:
         kwargs = {'pref': filt.prio, 'handle': filt.handle}
     else:
@@ -129,7 +140,8 @@ def _filter_replace(dev, parent, filt):
         actions.append(['action', 'mirred', 'egress', 'mirror',
                         'dev', a.target])
     tc_filter.replace(dev, parent=parent, protocol='all',
-                      u32=['match', 'u8', '0', '0'], actions=actions, **kwargs)
+                      u32=['match', 'u8', '0', '0'], actions=actions,
+                      batch=batch, **kwargs)
 
 
 def _qdiscs_of_device(dev):
@@ -139,6 +151,11 @@ def _qdiscs_of_device(dev):
 
 
 def _qdisc_del(*args, **kwargs):
+    batch = kwargs.get('batch')
+    if batch is not None:
+        with batch.ignore(errno.ENOENT):
+            qdisc.delete(*args, **kwargs)
+        return
     try:
         qdisc.delete(*args, **kwargs)
     except TrafficControlException as e:
@@ -17,31 +17,126 @@
 # Refer to the README and COPYING files for full details of the license
 #
 from __future__ import absolute_import
+from contextlib import contextmanager
 import errno
 import os
+import re
 
 from vdsm.network import cmd
 
 EXT_TC = '/sbin/tc'
 _TC_ERR_PREFIX = 'RTNETLINK answers: '
+_TC_BATCH_FAILED = re.compile(r'^Command failed -:(\d+)$', re.MULTILINE)
 _errno_trans = dict(((os.strerror(code), code) for code in errno.errorcode))
 
 
-def process_request(command):
+def process_request(command, batch=None):
+    """
+    Run a tc command and return its output. If batch is given, the command is
+    added to it and run when the batch is committed.
+    """
+    if batch is not None:
+        batch.add(command)
+        return None
     command.insert(0, EXT_TC)
     retcode, out, err = cmd.exec_sync(command)
     if retcode != 0:
         if retcode == 2 and err:
-            for err_line in err.splitlines():
-                if err_line.startswith(_TC_ERR_PREFIX):
-                    err = err_line
-                    retcode = _errno_trans.get(
-                        err[len(_TC_ERR_PREFIX):].strip())
-                    break
+            retcode, err = _translate_error(retcode, err)
         raise TrafficControlException(retcode, err, command)
     return out
 
 
+class Batch(object):
+    """
+    Collects tc commands and runs them using a single "tc -batch" process.
+
+    Commands run in the order they were added. Like running the commands one
+    by one, the first failing command stops the batch and its error is raised.
+    Errors expected by the caller can be ignored using ignore(); the batch
+    then continues with the next command.
+
+    Usage:
+
+        with Batch() as batch:
+            with batch.ignore(errno.ENOENT):
+                qdisc.delete(dev, batch=batch)
+            qdisc.add(dev, 'ingress', batch=batch)
+    """
+
+    def __init__(self):
+        self._commands = []
+        self._ignored = ()
+
+    def add(self, command):
+        self._commands.append((command, self._ignored))
+
+    @contextmanager
+    def ignore(self, *codes):
+        """
+        Ignore errors with codes when running commands added in this context.
+        """
+        ignored = self._ignored
+        self._ignored = ignored + codes
+        try:
+            yield
+        finally:
+            self._ignored = ignored
+
+    def commit(self):
+        commands, self._commands = self._commands, []
+        while commands:
+            failed = _run_batch([command for command, _ in commands])
+            if failed is None:
+                return
+            index, retcode, err = failed
+            command, ignored = commands[index]
+            if retcode not in ignored:
+                raise TrafficControlException(retcode, err, [EXT_TC] + command)
+            commands = commands[index + 1:]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, t, v, tb):
+        if t is None:
+            self.commit()
+
+
+def _run_batch(commands):
+    """
+    Run commands using tc -batch, stopping at the first failing command.
+    Returns None if all commands succeeded, or a tuple (index, retcode, err)
+    describing the failed command.
+    """
+    batch_command = [EXT_TC, '-batch', '-']
+    data = ''.join(' '.join(_quote(arg) for arg in command) + '\n'
+                   for command in commands)
+    retcode, _, err = cmd.exec_sync(batch_command, data=data)
+    if retcode == 0:
+        return None
+    match = _TC_BATCH_FAILED.search(err)
+    if match is None:
+        raise TrafficControlException(retcode, err, batch_command)
+    err = err[:match.start()]
+    return (int(match.group(1)) - 1,) + _translate_error(retcode, err)
+
+
+def _translate_error(retcode, err):
+    for err_line in err.splitlines():
+        if err_line.startswith(_TC_ERR_PREFIX):
+            return (_errno_trans.get(err_line[len(_TC_ERR_PREFIX):].strip()),
+                    err_line)
+    return retcode, err
+
+
+def _quote(arg):
+    # tc -batch splits lines on whitespace, unless quoted.
+    if any(c.isspace() for c in arg):
+        return '"%s"' % arg
+    return arg
+
+
 class TrafficControlException(Exception):
     def __init__(self, errCode, message, command):
         self.errCode = errCode
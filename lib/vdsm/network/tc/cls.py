@@ -27,7 +27,7 @@ from . import _wrapper
 _TC_PRIO_MAX = 15
 
 
-def add(dev, kind, parent, classid, **opts):
+def add(dev, kind, parent, classid, batch=None, **opts):
     """Adds a class to a device. Opts should be used with list values for
     complex inputs, e.g. {'ls': ['rate', '400kbps']}"""
     command = ['class', 'add', 'dev', dev, 'parent', parent,
@@ -40,14 +40,14 @@ def add(dev, kind, parent, classid, **opts):
         else:
             command.append(key)
             command += value
-    _wrapper.process_request(command)
+    _wrapper.process_request(command, batch)
 
 
-def delete(dev, classid, parent=None):
+def delete(dev, classid, parent=None, batch=None):
     command = ['class', 'del', 'dev', dev, 'classid', classid]
     if parent is not None:
         command += ['parent', parent]
-    _wrapper.process_request(command)
+    _wrapper.process_request(command, batch)
 
 
 def show(dev, parent=None, classid=None):
@@ -23,17 +23,17 @@ from . import _parser
 from . import _wrapper
 
 
-def delete(dev, pref, parent=None, protocol=None):
+def delete(dev, pref, parent=None, protocol=None, batch=None):
     command = ['filter', 'del', 'dev', dev, 'pref', str(pref)]
     if parent is not None:
         command += ['parent', parent]
     if protocol is not None:
         command += ['protocol', protocol]
-    _wrapper.process_request(command)
+    _wrapper.process_request(command, batch)
 
 
 def replace(dev, root=False, parent=None, handle=None, pref=None,
-            protocol=None, estimator=None, actions=(), **opts):
+            protocol=None, estimator=None, actions=(), batch=None, **opts):
     """Replaces a filter. actions should be an iterable of lists of action
     definition tokens. opts should be used for the matches (such as u32)"""
     command = ['filter', 'replace', 'dev', dev]
@@ -57,7 +57,7 @@ def replace(dev, root=False, parent=None, handle=None, pref=None,
             command += value
     for action in actions:
         command += action
-    _wrapper.process_request(command)
+    _wrapper.process_request(command, batch)
 
 
 def show(dev, parent=None, pref=None):
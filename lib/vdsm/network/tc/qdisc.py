@@ -26,7 +26,7 @@ from . import _wrapper
 _TC_PRIO_MAX = 15
 
 
-def add(dev, kind, parent=None, handle=None, **opts):
+def add(dev, kind, parent=None, handle=None, batch=None, **opts):
     command = ['qdisc', 'add', 'dev', dev]
     if kind != 'ingress':
         if parent is None:
@@ -38,10 +38,10 @@ def add(dev, kind, parent=None, handle=None, **opts):
     command.append(kind)
     for key, value in opts.items():
         command += [key, value]
-    _wrapper.process_request(command)
+    _wrapper.process_request(command, batch)
 
 
-def delete(dev, kind=None, parent=None, handle=None, **opts):
+def delete(dev, kind=None, parent=None, handle=None, batch=None, **opts):
     command = ['qdisc', 'del', 'dev', dev]
     if kind != 'ingress':
         if parent is None:
@@ -54,10 +54,10 @@ def delete(dev, kind=None, parent=None, handle=None, **opts):
         command.append(kind)
     for key, value in opts.items():
         command += [key, value]
-    _wrapper.process_request(command)
+    _wrapper.process_request(command, batch)
 
 
-def replace(dev, kind, parent=None, handle=None, **opts):
+def replace(dev, kind, parent=None, handle=None, batch=None, **opts):
     command = ['qdisc', 'replace', 'dev', dev]
     if kind != 'ingress':
         if parent is None:
@@ -69,7 +69,7 @@ def replace(dev, kind, parent=None, handle=None, **opts):
     command.append(kind)
     for key, value in opts.items():
         command += [key, value]
-    _wrapper.process_request(command)
+    _wrapper.process_request(command, batch)
 
 
 def show(dev=None):
@@ -21,6 +21,7 @@
 from __future__ import absolute_import
 
 from collections import defaultdict, namedtuple
+import errno
 import xml.etree.cElementTree as ET
 
 from vdsm import cmdutils
@@ -36,6 +37,8 @@ CpuTopology = namedtuple('CpuTopology', 'sockets, cores, threads, online_cpus')
 
 _SYSCTL = CommandPath("sysctl", "/sbin/sysctl", "/usr/sbin/sysctl")
 
+_NODE_MEMINFO_PATH = '/sys/devices/system/node/node%d/meminfo'
+
 
 AUTONUMA_STATUS_DISABLE = 0
 AUTONUMA_STATUS_ENABLE = 1
@@ -112,13 +115,36 @@ def memory_by_cell(index):
     :type cell: int
     :return: dict like {'total': '49141', 'free': '46783'}
     '''
-    conn = libvirtconnection.get()
-    meminfo = conn.getMemoryStats(index, 0)
+    try:
+        meminfo = _node_meminfo(index)
+    except IOError as e:
+        if e.errno != errno.ENOENT:
+            raise
+        conn = libvirtconnection.get()
+        meminfo = conn.getMemoryStats(index, 0)
     meminfo['total'] = str(meminfo['total'] / 1024)
     meminfo['free'] = str(meminfo['free'] / 1024)
     return meminfo
 
 
+def _node_meminfo(index):
+    """
+    Read the total and free memory of a numa node in KiB, the same values
+    libvirt reports, without a round trip to libvirt.
+    """
+    meminfo = {}
+    with open(_NODE_MEMINFO_PATH % index) as f:
+        for line in f:
+            # Node 0 MemTotal:       32657196 kB
+            fields = line.split()
+            if fields[2] == 'MemTotal:':
+                meminfo['total'] = int(fields[3])
+            elif fields[2] == 'MemFree:':
+                meminfo['free'] = int(fields[3])
+                break
+    return meminfo
+
+
 @cache.memoized
 def _numa(capabilities=None):
     if capabilities is None:
@@ -31,7 +31,6 @@ import functools
 import sys
 from collections import namedtuple
 from contextlib import contextmanager
-from operator import itemgetter
 
 import six
 
@@ -216,6 +215,9 @@ def getAllVolumes(sdUUID):
 
 def deleteVolumes(sdUUID, vols):
     lvm.removeLVs(sdUUID, vols)
+    if isinstance(vols, six.string_types):
+        vols = [vols]
+    _releaseMetadataSlots(sdUUID, vols)
 
 
 def zeroImgVolumes(sdUUID, imgUUID, volUUIDs, discard):
@@ -374,6 +376,101 @@ def metadataValidity(vg):
     return {'mdathreshold': mda_free_ok, 'mdavalid': mda_size_ok}
 
 
+class MetadataSlots(object):
+    """
+    Volume metadata slots used by a block domain, built once from the LVs
+    MD_ and MS_ tags and updated when volumes are created or deleted.
+
+    Slots are kept in a bytearray holding the number of volumes using each
+    slot, so finding a free slot does not need to look at the LVs.
+    """
+
+    def __init__(self, first):
+        # Slots before first are never allocated.
+        self._first = first
+        self._map = bytearray()
+        # All slots between first and hint are used.
+        self._hint = first
+        self._volumes = {}
+
+    def occupy(self, name, offset, size):
+        """
+        Mark the slot of volume name as used, releasing the previous slot of
+        the volume if any.
+        """
+        self.release(name)
+        end = offset + size
+        if end > len(self._map):
+            self._map.extend(b"\0" * (end - len(self._map)))
+        for i in range(offset, end):
+            if self._map[i] < 255:
+                self._map[i] += 1
+        self._volumes[name] = (offset, size)
+
+    def release(self, name):
+        try:
+            offset, size = self._volumes.pop(name)
+        except KeyError:
+            return
+        for i in range(offset, offset + size):
+            if self._map[i] > 0:
+                self._map[i] -= 1
+        self._hint = max(min(self._hint, offset), self._first)
+
+    def find(self, size):
+        """
+        Return the first free slot large enough for size blocks.
+        """
+        free = self._map.find(b"\0", self._hint)
+        self._hint = free if free != -1 else max(len(self._map), self._first)
+
+        zeros = b"\0" * size
+        slot = self._map.find(zeros, self._hint)
+        if slot == -1:
+            # Use the free space after the last used slot.
+            if len(self._map) < self._hint:
+                self._map.extend(b"\0" * (self._hint - len(self._map)))
+            self._map.extend(zeros)
+            slot = self._map.find(zeros, self._hint)
+        return slot
+
+    def __len__(self):
+        return len(self._volumes)
+
+
+# Volume metadata slots of domains keeping the slots in LV tags, keyed by
+# domain UUID, and the number of times slots were invalidated. Protected by
+# BlockStorageDomainManifest._lvTagMetaSlotLock.
+_metadataSlots = {}
+_metadataSlotsGeneration = 0
+
+
+def invalidateMetadataSlots(sdUUID=None):
+    """
+    Drop the metadata slots of domain sdUUID, or of all the domains if
+    sdUUID is None. The slots will be loaded again from LVM on the next
+    allocation.
+
+    Must be called when becoming the SPM, since the previous SPM may have
+    created volumes using slots we consider free.
+    """
+    global _metadataSlotsGeneration
+    with BlockStorageDomainManifest._lvTagMetaSlotLock:
+        if sdUUID is None:
+            _metadataSlots.clear()
+        else:
+            _metadataSlots.pop(sdUUID, None)
+        _metadataSlotsGeneration += 1
+
+
+def _releaseMetadataSlots(sdUUID, lvNames):
+    with BlockStorageDomainManifest._lvTagMetaSlotLock:
+        slots = _metadataSlots.get(sdUUID)
+        if slots is not None:
+            for lvName in lvNames:
+                slots.release(lvName)
+
+
 class BlockStorageDomainManifest(sd.StorageDomainManifest):
     mountpoint = os.path.join(sd.StorageDomain.storage_repository,
                               sd.DOMAIN_MNT_POINT, sd.BLOCKSD_DIR)
@@ -400,6 +497,10 @@ class BlockStorageDomainManifest(sd.StorageDomainManifest):
             self.logBlkSize = 512
             self.phyBlkSize = 512
 
+        # A new manifest is created when the domain cache is refreshed; the
+        # slots will be loaded again from LVM.
+        invalidateMetadataSlots(sdUUID)
+
     @classmethod
     def special_volumes(cls, version):
         if cls.supports_external_leases(version):
@@ -789,19 +890,34 @@ class BlockStorageDomainManifest(sd.StorageDomainManifest):
     def refresh(self):
         self.refreshDirTree()
         lvm.invalidateVG(self.sdUUID)
+        invalidateMetadataSlots(self.sdUUID)
         self.replaceMetadata(selectMetadata(self.sdUUID))
 
     _lvTagMetaSlotLock = threading.Lock()
 
     @contextmanager
     def acquireVolumeMetadataSlot(self, vol_name, slotSize):
-        # TODO: Check if the lock is needed when using
-        # getVolumeMetadataOffsetFromPvMapping()
-        with self._lvTagMetaSlotLock:
-            if self.getVersion() in VERS_METADATA_LV:
+        if self.getVersion() in VERS_METADATA_LV:
+            # TODO: Check if the lock is needed when using
+            # getVolumeMetadataOffsetFromPvMapping()
+            with self._lvTagMetaSlotLock:
                 yield self._getVolumeMetadataOffsetFromPvMapping(vol_name)
-            else:
-                yield self._getFreeMetadataSlot(slotSize)
+        else:
+            with self._lockedMetadataSlots() as slots:
+                slot = self._getFreeMetadataSlot(slots, slotSize)
+                try:
+                    yield slot
+                finally:
+                    # The caller may have tagged the volume with the slot
+                    # before failing.
+                    if vol_name is not None:
+                        self._updateMetadataSlot(slots, vol_name)
+
+    def releaseVolumeMetadataSlots(self, vol_names):
+        """
+        Release the metadata slots of removed volumes.
+        """
+        _releaseMetadataSlots(self.sdUUID, vol_names)
 
     def _getVolumeMetadataOffsetFromPvMapping(self, vol_name):
         dev, ext = lvm.getFirstExt(self.sdUUID, vol_name)
@@ -823,56 +939,105 @@ class BlockStorageDomainManifest(sd.StorageDomainManifest):
         raise se.MetaDataMappingError("domain %s: can't map PV %s ext %s" %
                                       (self.sdUUID, dev, ext))
 
-    def _getFreeMetadataSlot(self, slotSize):
-        occupiedSlots = self._getOccupiedMetadataSlots()
+    def _getFreeMetadataSlot(self, slots, slotSize):
+        freeSlot = slots.find(slotSize)
+        self.log.debug("Found freeSlot %s in VG %s", freeSlot, self.sdUUID)
+        return freeSlot
+
+    @contextmanager
+    def _lockedMetadataSlots(self):
+        """
+        Yield the metadata slots of the domain while holding the slot lock.
+
+        Loading the slots scans all the LVs of the domain, so it is done
+        without the lock. The loaded slots are installed only if the slots
+        were not invalidated or loaded by another thread meanwhile.
+        """
+        while True:
+            with self._lvTagMetaSlotLock:
+                slots = _metadataSlots.get(self.sdUUID)
+                if slots is not None:
+                    yield slots
+                    return
+                generation = _metadataSlotsGeneration
+
+            slots = self._loadMetadataSlots()
+
+            with self._lvTagMetaSlotLock:
+                if (self.sdUUID not in _metadataSlots and
+                        _metadataSlotsGeneration == generation):
+                    _metadataSlots[self.sdUUID] = slots
 
+    def _loadMetadataSlots(self):
         # It might look weird skipping the sd metadata when it has been moved
         # to tags. But this is here because domain metadata and volume metadata
         # look the same. The domain might get confused and think it has lv
         # metadata if it finds something is written in that area.
-        freeSlot = (SD_METADATA_SIZE + self.logBlkSize - 1) / self.logBlkSize
-
-        for offset, size in occupiedSlots:
-            if offset >= freeSlot + slotSize:
-                break
+        first = (SD_METADATA_SIZE + self.logBlkSize - 1) / self.logBlkSize
+        slots = MetadataSlots(first)
 
-            freeSlot = offset + size
-
-        self.log.debug("Found freeSlot %s in VG %s", freeSlot, self.sdUUID)
-        return freeSlot
-
-    def _getOccupiedMetadataSlots(self):
-        stripPrefix = lambda s, pfx: s[len(pfx):]
-        occupiedSlots = []
+        # Volumes may have been created by another host since the LVs were
+        # cached.
+        lvm.invalidateVG(self.sdUUID)
         special_lvs = self.special_volumes(self.getVersion())
         for lv in lvm.getLV(self.sdUUID):
             if lv.name in special_lvs:
                 # Special LVs have no mapping
                 continue
 
-            offset = None
-            size = sc.VOLUME_MDNUMBLKS
-            for tag in lv.tags:
-                if tag.startswith(sc.TAG_PREFIX_MD):
-                    offset = int(stripPrefix(tag, sc.TAG_PREFIX_MD))
-
-                if tag.startswith(sc.TAG_PREFIX_MDNUMBLKS):
-                    size = int(stripPrefix(tag,
-                                           sc.TAG_PREFIX_MDNUMBLKS))
-
-                if offset is not None and size != sc.VOLUME_MDNUMBLKS:
-                    # I've found everything I need
-                    break
-
-            if offset is None:
+            mapping = self._getMetadataSlotMapping(lv)
+            if mapping is None:
                 self.log.warn("Could not find mapping for lv %s/%s",
                               self.sdUUID, lv.name)
                 continue
 
-            occupiedSlots.append((offset, size))
+            slots.occupy(lv.name, *mapping)
+
+        self.log.debug("Loaded %d metadata slots in VG %s",
+                       len(slots), self.sdUUID)
+        return slots
+
+    def _updateMetadataSlot(self, slots, vol_name):
+        """
+        Update the slots from the tags of the volume, which the caller may
+        have tagged with the new slot.
+        """
+        try:
+            lv = lvm.getLV(self.sdUUID, vol_name)
+        except se.LogicalVolumeDoesNotExistError:
+            mapping = None
+        else:
+            mapping = self._getMetadataSlotMapping(lv)
+
+        if mapping is None:
+            slots.release(vol_name)
+        else:
+            slots.occupy(vol_name, *mapping)
+
+    def _getMetadataSlotMapping(self, lv):
+        """
+        Return the metadata slot offset and size from the LV tags, or None if
+        the LV has no mapping.
+        """
+        stripPrefix = lambda s, pfx: s[len(pfx):]
+        offset = None
+        size = sc.VOLUME_MDNUMBLKS
+        for tag in lv.tags:
+            if tag.startswith(sc.TAG_PREFIX_MD):
+                offset = int(stripPrefix(tag, sc.TAG_PREFIX_MD))
+
+            if tag.startswith(sc.TAG_PREFIX_MDNUMBLKS):
+                size = int(stripPrefix(tag,
+                                       sc.TAG_PREFIX_MDNUMBLKS))
+
+            if offset is not None and size != sc.VOLUME_MDNUMBLKS:
+                # I've found everything I need
+                break
+
+        if offset is None:
+            return None
 
-        occupiedSlots.sort(key=itemgetter(0))
-        return occupiedSlots
+        return offset, size
 
     def validateCreateVolumeParams(self, volFormat, srcVolUUID,
                                    preallocate=None):
@@ -617,14 +617,19 @@ class BlockVolume(volume.Volume):
                              exc_info=True)
 
         try:
+            removed = False
             try:
                 lvm.removeLVs(self.sdUUID, self.volUUID)
+                removed = True
             except se.CannotRemoveLogicalVolume:
                 # At this point LV is already marked as illegal, we will
                 # try to cleanup whatever we can...
                 pass
 
             self.removeMetadata([self.sdUUID, offs])
+            if removed:
+                manifest = sdCache.produce_manifest(self.sdUUID)
+                manifest.releaseVolumeMetadataSlots([self.volUUID])
         except Exception as e:
             eFound = e
             self.log.error("cannot remove volume %s/%s", self.sdUUID,
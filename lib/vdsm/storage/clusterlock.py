@@ -34,6 +34,7 @@ from vdsm import utils
 from vdsm.common import concurrent
 from vdsm.common import errors
 from vdsm.common import osutils
+from vdsm.common.time import monotonic_time
 from vdsm.config import config
 from vdsm.storage import exception as se
 from vdsm.storage import misc
@@ -237,6 +238,94 @@ def initSANLock(sdUUID, idsPath, lease):
         raise se.ClusterLockInitError()
 
 
+class LockspaceStatus(object):
+    """
+    Status of sanlock lockspaces, shared by all SANLock instances.
+
+    Every domain monitor checks if the host id was acquired on each cycle,
+    and getHostLeaseStatus requests the status of host leases in all domains.
+    Instead of asking sanlock about every domain, get the status of all
+    lockspaces in one call, and the status of all hosts in a lockspace in one
+    call, and reuse them for [irs] lockspace_status_timeout seconds.
+
+    Lockspaces being added or removed are expected to change soon, so their
+    status is not reused. Callers adding or removing a lockspace must call
+    invalidate().
+    """
+
+    log = logging.getLogger("storage.LockspaceStatus")
+
+    def __init__(self, clock=monotonic_time):
+        self._clock = clock
+        self._lock = threading.Lock()
+        # {lockspace: {"host_id": int, "flags": int, ...}}
+        self._lockspaces = None
+        self._lockspaces_time = None
+        # {lockspace: (time, {host_id: flags})}
+        self._hosts = {}
+
+    def has_host_id(self, lockspace, host_id):
+        """
+        Return True if host_id was acquired in lockspace, None if host_id is
+        being acquired or released, and False otherwise.
+
+        Raises sanlock.SanlockException if sanlock failed.
+        """
+        ls = self._get_lockspaces().get(lockspace)
+        if ls is None or ls["host_id"] != host_id:
+            return False
+        if ls["flags"] & (sanlock.LSFLAG_ADD | sanlock.LSFLAG_REM):
+            return None
+        return True
+
+    def host_flags(self, lockspace, host_id):
+        """
+        Return the sanlock status flags (sanlock.HOST_*) of host_id in
+        lockspace.
+
+        Raises sanlock.SanlockException if sanlock failed, for example if
+        this host did not join the lockspace.
+        """
+        timeout = config.getfloat('irs', 'lockspace_status_timeout')
+        with self._lock:
+            now = self._clock()
+            entry = self._hosts.get(lockspace)
+            if entry is None or now - entry[0] >= timeout:
+                hosts = {h["host_id"]: h["flags"]
+                         for h in sanlock.get_hosts(lockspace, 0)}
+                entry = self._hosts[lockspace] = (now, hosts)
+        # Hosts which never had a lease in the lockspace are not reported.
+        return entry[1].get(host_id, sanlock.HOST_FREE)
+
+    def invalidate(self, lockspace):
+        with self._lock:
+            self._lockspaces = None
+            self._hosts.pop(lockspace, None)
+
+    def _get_lockspaces(self):
+        timeout = config.getfloat('irs', 'lockspace_status_timeout')
+        with self._lock:
+            now = self._clock()
+            if (self._lockspaces is not None and
+                    now - self._lockspaces_time < timeout):
+                return self._lockspaces
+
+            lockspaces = {ls["lockspace"]: ls
+                          for ls in sanlock.get_lockspaces()}
+
+            if any(ls["flags"] & (sanlock.LSFLAG_ADD | sanlock.LSFLAG_REM)
+                   for ls in lockspaces.values()):
+                self._lockspaces = None
+            else:
+                self._lockspaces = lockspaces
+                self._lockspaces_time = now
+
+            return lockspaces
+
+
+_lockspace_status = LockspaceStatus()
+
+
 class SANLock(object):
 
     STATUS_NAME = {
@@ -319,6 +408,8 @@ class SANLock(object):
                                   "acquired (id=%s, async=%s)",
                                   self._sdUUID, hostId, async)
                     self._ready.set()
+            finally:
+                _lockspace_status.invalidate(self._sdUUID)
 
     def releaseHostId(self, hostId, async, unused):
         self.log.info("Releasing host id for domain %s (id: %s)",
@@ -334,6 +425,8 @@ class SANLock(object):
             except sanlock.SanlockException as e:
                 if e.errno != errno.ENOENT:
                     raise se.ReleaseHostIdFailure(self._sdUUID, e)
+            finally:
+                _lockspace_status.invalidate(self._sdUUID)
 
         self.log.info("Host id for domain %s released successfully "
                       "(id: %s)", self._sdUUID, hostId)
@@ -341,8 +434,8 @@ class SANLock(object):
     def hasHostId(self, hostId):
         with self._lock:
             try:
-                has_host_id = sanlock.inq_lockspace(self._sdUUID, hostId,
-                                                    self._idsPath)
+                has_host_id = _lockspace_status.has_host_id(self._sdUUID,
+                                                            hostId)
             except sanlock.SanlockException:
                 self.log.debug("Unable to inquire sanlock lockspace "
                                "status, returning False", exc_info=True)
@@ -361,13 +454,12 @@ class SANLock(object):
 
     def getHostStatus(self, hostId):
         try:
-            hosts = sanlock.get_hosts(self._sdUUID, hostId)
+            status = _lockspace_status.host_flags(self._sdUUID, hostId)
         except sanlock.SanlockException as e:
             self.log.debug("Unable to get host %d status in lockspace %s: %s",
                            hostId, self._sdUUID, e)
             return HOST_STATUS_UNAVAILABLE
         else:
-            status = hosts[0]['flags']
             return self.STATUS_NAME[status]
 
     # The hostId parameter is maintained here only for compatibility with
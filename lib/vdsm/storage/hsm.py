@@ -2345,24 +2345,47 @@ class HSM(object):
                 "domType=%s, spUUID=%s, conList=%s" %
                 (domType, spUUID, conList)))
 
-        res = []
+        connections = []
         for conDef in conList:
             conInfo = _connectionDict2ConnectionInfo(domType, conDef)
             conObj = storageServer.ConnectionFactory.createConnection(conInfo)
+            connections.append((conDef, conObj))
+
+        def connect(connection):
+            conDef, conObj = connection
             try:
                 self._connectStorageOverIser(conDef, conObj, domType)
                 conObj.connect()
-            except Exception as err:
+            except Exception:
                 self.log.error(
                     "Could not connect to storageServer", exc_info=True)
-                status, _ = self._translateConnectionError(err)
-            else:
+                raise
+
+        # Connections are independent, and connecting may take long time when
+        # a server is not reachable, so we connect concurrently.
+        workers = config.getint('irs', 'connect_storage_workers')
+        results = concurrent.tmap(connect, connections, max_workers=workers)
+
+        res = []
+        connected = []
+        for (conDef, conObj), result in zip(connections, results):
+            if result.succeeded:
                 status = 0
-                # In case there were changes in devices size
-                # while the VDSM was not connected, we need to
-                # call refreshStorage.
-                if domType in (sd.FCP_DOMAIN, sd.ISCSI_DOMAIN):
-                    sdCache.refreshStorage()
+                connected.append(conObj)
+            else:
+                status, _ = self._translateConnectionError(result.value)
+            res.append({'id': conDef["id"], 'status': status})
+
+        if connected:
+            if domType in (sd.FCP_DOMAIN, sd.ISCSI_DOMAIN):
+                # In case there were changes in devices size while the VDSM
+                # was not connected, we need to call refreshStorage. Block
+                # domains are found by scanning all devices, so one refresh
+                # and one prefetch cover all the connections.
+                sdCache.refreshStorage()
+                connected = connected[:1]
+
+            for conObj in connected:
                 try:
                     doms = self.__prefetchDomains(domType, conObj)
                 except:
@@ -2370,17 +2393,15 @@ class HSM(object):
                                    sdCache.knownSDs, exc_info=True)
                 else:
                     # Any pre-existing domains in sdCache stand the chance of
-                    # being invalid, since there is no way to know what happens
-                    # to them while the storage is disconnected.
+                    # being invalid, since there is no way to know what
+                    # happens to them while the storage is disconnected.
                     for sdUUID in doms.iterkeys():
                         sdCache.manuallyRemoveDomain(sdUUID)
                     sdCache.knownSDs.update(doms)
 
-            self.log.debug("knownSDs: {%s}", ", ".join("%s: %s.%s" %
-                           (k, v.__module__, v.__name__)
-                           for k, v in sdCache.knownSDs.iteritems()))
-
-            res.append({'id': conDef["id"], 'status': status})
+        self.log.debug("knownSDs: {%s}", ", ".join("%s: %s.%s" %
+                       (k, v.__module__, v.__name__)
+                       for k, v in sdCache.knownSDs.iteritems()))
 
         # Connecting new device may change the visible storage domain list
         # so invalidate caches
@@ -3535,8 +3556,9 @@ class HSM(object):
         self.sdm_schedule(job)
 
     @public
-    def sdm_copy_data(self, job_id, source, destination):
-        job = copy_data.Job(job_id, self._pool.id, source, destination)
+    def sdm_copy_data(self, job_id, source, destination, copy_mode=None):
+        job = copy_data.Job(job_id, self._pool.id, source, destination,
+                            copy_mode=copy_mode)
         self.sdm_schedule(job)
 
     @public
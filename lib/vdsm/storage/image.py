@@ -799,12 +799,19 @@ class Image:
                 dstVol.prepare(rw=True, setrw=True)
 
                 try:
+                    dstFormat = sc.fmt2str(dstVolFormat)
+                    options = qemuimg.convert_options(
+                        config.get('irs', 'copy_mode'),
+                        dstFormat,
+                        dstVol.is_block(),
+                        volParams['prealloc'] == sc.PREALLOCATED_VOL)
                     operation = qemuimg.convert(
                         volParams['path'],
                         dstPath,
                         srcFormat=sc.fmt2str(volParams['volFormat']),
-                        dstFormat=sc.fmt2str(dstVolFormat),
-                        dstQcow2Compat=destDom.qcow2_compat())
+                        dstFormat=dstFormat,
+                        dstQcow2Compat=destDom.qcow2_compat(),
+                        **options)
                     with utils.stopwatch("Copy volume %s"
                                          % srcVol.volUUID):
                         self._run_qemuimg_operation(operation)
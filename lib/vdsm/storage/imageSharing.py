@@ -19,11 +19,29 @@
 
 from __future__ import absolute_import
 
+import _socket
+import errno
+import fcntl
+import io
 import logging
+import mmap
+import os
+import select
 import signal
+import socket
+import ssl
+import stat
+
+import six
 
 from vdsm import commands
 from vdsm import constants
+from vdsm import utils
+from vdsm.common import exception
+from vdsm.common.osutils import uninterruptible
+from vdsm.common.osutils import uninterruptible_poll
+from vdsm.common.time import monotonic_time
+from vdsm.config import config
 from vdsm.storage import curlImgWrap
 from vdsm.storage import exception as se
 
@@ -38,6 +56,17 @@ WAIT_TIMEOUT = 30
 # minimize system call overhead without consuming too much
 # memory.
 BUFFER_SIZE = 65536
+# Size of the preallocated buffer used by the direct transfer method.
+# Matches the block size used by dd in the legacy method.
+DIRECT_BUFFER_SIZE = constants.MEGAB
+# Direct I/O requires lengths aligned to the storage logical block size;
+# 4096 is correct for both 512 bytes and 4k sector storage.
+DIRECT_ALIGNMENT = 4096
+# Time to wait until the peer socket can accept more data when sending
+# image data using sendfile(). Same as the http request socket timeout.
+SEND_TIMEOUT = 60
+# Not available in python 2 os module.
+SEEK_DATA = getattr(os, "SEEK_DATA", 3)
 
 
 def httpGetSize(methodArgs):
@@ -76,6 +105,41 @@ def httpUploadImage(srcImgPath, methodArgs):
 
 
 def copyToImage(dstImgPath, methodArgs):
+    if _transferMethod() == "dd":
+        _ddCopyToImage(dstImgPath, methodArgs)
+        return
+
+    transfer = Transfer(dstImgPath, methodArgs['fileObj'],
+                        getLengthFromArgs(methodArgs))
+    with utils.stopwatch("Receive image %s" % dstImgPath,
+                         level=logging.INFO, log=log):
+        transfer.receive()
+    log.info("Received %d bytes to %s (%d zero bytes skipped)",
+             transfer.done, dstImgPath, transfer.skipped)
+
+
+def copyFromImage(dstImgPath, methodArgs):
+    if _transferMethod() == "dd":
+        _ddCopyFromImage(dstImgPath, methodArgs)
+        return
+
+    transfer = Transfer(dstImgPath, methodArgs['fileObj'],
+                        methodArgs['length'])
+    with utils.stopwatch("Send image %s" % dstImgPath,
+                         level=logging.INFO, log=log):
+        transfer.send()
+
+
+def _transferMethod():
+    method = config.get('irs', 'image_transfer_method')
+    if method not in ("direct", "dd"):
+        raise exception.InvalidConfiguration(
+            reason="Unsupported value for irs:image_transfer_method",
+            image_transfer_method=method)
+    return method
+
+
+def _ddCopyToImage(dstImgPath, methodArgs):
     totalSize = getLengthFromArgs(methodArgs)
     fileObj = methodArgs['fileObj']
     cmd = [constants.EXT_DD, "of=%s" % dstImgPath, "bs=%s" % constants.MEGAB]
@@ -98,7 +162,7 @@ def copyToImage(dstImgPath, methodArgs):
         raise
 
 
-def copyFromImage(dstImgPath, methodArgs):
+def _ddCopyFromImage(dstImgPath, methodArgs):
     fileObj = methodArgs['fileObj']
     bytes_left = total_size = methodArgs['length']
     cmd = [constants.EXT_DD, "if=%s" % dstImgPath, "bs=%s" % constants.MEGAB,
@@ -141,6 +205,287 @@ def _copyData(inFile, outFile, totalSize):
         totalSize = totalSize - len(data)
 
 
+class Transfer(object):
+    """
+    Transfer image data between a stream and a volume inside vdsm.
+
+    Data received from the stream is collected in a preallocated page aligned
+    buffer and written to the volume using direct I/O. Zero blocks landing on
+    unallocated areas of the volume are skipped, so sparse volumes stay
+    sparse. When sending to a socket, data is copied by the kernel using
+    sendfile().
+
+    The progress property is compatible with qemuimg.QemuImgOperation, so a
+    job running the transfer can report it.
+    """
+
+    def __init__(self, path, fileObj, size, bufsize=DIRECT_BUFFER_SIZE):
+        if bufsize % DIRECT_ALIGNMENT:
+            raise ValueError("Buffer size %d not aligned to %d"
+                             % (bufsize, DIRECT_ALIGNMENT))
+        self._path = path
+        self._file = fileObj
+        self._size = size
+        self._bufsize = bufsize
+        self._done = 0
+        self._skipped = 0
+        # Offset of the first byte after the last known hole in the volume.
+        self._hole_end = 0
+        self._interval = config.getint('irs', 'progress_interval')
+        self._next_report = monotonic_time() + self._interval
+
+    @property
+    def done(self):
+        """
+        Returns the number of bytes transferred.
+        """
+        return self._done
+
+    @property
+    def skipped(self):
+        """
+        Returns the number of zero bytes that were not written to the volume.
+        """
+        return self._skipped
+
+    @property
+    def progress(self):
+        """
+        Returns transfer progress as float between 0 and 100.
+        """
+        if self._size == 0:
+            return 100.0
+        return 100.0 * self._done / self._size
+
+    def receive(self):
+        """
+        Copy size bytes from the stream to the volume.
+        """
+        fd = _openDirect(self._path, os.O_WRONLY)
+        try:
+            st = os.fstat(fd)
+            # Only regular files have holes; we never skip writes to block
+            # devices, since a new logical volume may contain stale data.
+            sparseSize = st.st_size if stat.S_ISREG(st.st_mode) else 0
+            zeros = b"\0" * self._bufsize
+            buf = mmap.mmap(-1, self._bufsize, mmap.MAP_SHARED)
+            with utils.closing(buf, log=log.name):
+                while self._done < self._size:
+                    count = min(self._bufsize, self._size - self._done)
+                    self._fill(buf, count)
+                    if (buf[:count] == zeros[:count] and
+                            self._isHole(fd, count, sparseSize)):
+                        self._skipped += count
+                    else:
+                        os.lseek(fd, self._done, os.SEEK_SET)
+                        _writeAligned(fd, buf, count)
+                    self._done += count
+                    self._report()
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def send(self):
+        """
+        Copy size bytes from the volume to the stream.
+        """
+        sock = _socketFileno(self._file)
+        if sock is not None:
+            self._sendfile(sock)
+        else:
+            self._copyOut()
+
+    def _fill(self, buf, count):
+        pos = 0
+        while pos < count:
+            try:
+                if six.PY2:
+                    # mmap does not support memoryview in python 2, so we
+                    # must copy the data into the buffer.
+                    data = self._file.read(count - pos)
+                    nread = len(data)
+                    buf[pos:pos + nread] = data
+                else:
+                    nread = self._file.readinto(memoryview(buf)[pos:count])
+            except IOError as e:
+                error = "error reading file: %s" % e
+                log.error(error)
+                raise se.MiscFileReadException(error)
+
+            if not nread:
+                self._partialData(pos)
+
+            pos += nread
+
+    def _isHole(self, fd, count, sparseSize):
+        end = self._done + count
+        # Skipping the last blocks of the image would leave a short file.
+        if end > sparseSize:
+            return False
+
+        if end <= self._hole_end:
+            return True
+
+        try:
+            self._hole_end = os.lseek(fd, self._done, SEEK_DATA)
+        except OSError as e:
+            if e.errno != errno.ENXIO:
+                raise
+            # No data after this offset.
+            self._hole_end = sparseSize
+
+        return end <= self._hole_end
+
+    def _sendfile(self, sock):
+        # fileObj may buffer data written before us, like the http headers.
+        self._file.flush()
+        fd = os.open(self._path, os.O_RDONLY)
+        poller = select.epoll()
+        try:
+            poller.register(sock, select.EPOLLOUT)
+            while self._done < self._size:
+                count = min(self._bufsize, self._size - self._done)
+                try:
+                    n = uninterruptible(_sendfile, sock, fd, count)
+                except OSError as e:
+                    if e.errno != errno.EAGAIN:
+                        raise
+                    # The socket has a timeout, so it is non-blocking.
+                    if not uninterruptible_poll(poller.poll, SEND_TIMEOUT):
+                        error = "timeout sending data to socket"
+                        log.error(error)
+                        raise se.MiscFileWriteException(error)
+                    continue
+
+                if n == 0:
+                    self._partialData(0)
+
+                self._done += n
+                self._report()
+        finally:
+            poller.close()
+            os.close(fd)
+
+    def _copyOut(self):
+        src = io.FileIO(_openDirect(self._path, os.O_RDONLY), "r",
+                        closefd=True)
+        with utils.closing(src, log=log.name):
+            buf = mmap.mmap(-1, self._bufsize, mmap.MAP_SHARED)
+            with utils.closing(buf, log=log.name):
+                while self._done < self._size:
+                    count = min(self._bufsize, self._size - self._done)
+                    # Direct I/O reads must be aligned, so we always read the
+                    # entire buffer; the read is short only at end of file.
+                    nread = uninterruptible(src.readinto, buf)
+                    if nread < count:
+                        self._partialData(nread)
+
+                    self._file.write(_bufferView(buf, 0, count))
+                    # outFile may not be a real file object but a wrapper.
+                    self._file.flush()
+
+                    self._done += count
+                    self._report()
+
+    def _partialData(self, pos):
+        error = "partial data %s from %s" % (self._done + pos, self._size)
+        log.error(error)
+        raise se.MiscFileReadException(error)
+
+    def _report(self):
+        now = monotonic_time()
+        if now >= self._next_report:
+            log.info("Transfer of %s: %.2f%% done", self._path, self.progress)
+            self._next_report = now + self._interval
+
+
+def _openDirect(path, flags):
+    try:
+        return os.open(path, flags | os.O_DIRECT)
+    except OSError as e:
+        # Some file systems (e.g. tmpfs) do not support direct I/O.
+        if e.errno != errno.EINVAL:
+            raise
+        log.debug("Direct I/O not supported for %s", path)
+        return os.open(path, flags)
+
+
+def _writeAligned(fd, buf, count):
+    aligned = count - count % DIRECT_ALIGNMENT
+    _writeAll(fd, buf, 0, aligned)
+    if aligned < count:
+        # The last block of an unaligned image cannot be written using direct
+        # I/O. This happens only once, at the end of the transfer.
+        flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+        if flags & os.O_DIRECT:
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags & ~os.O_DIRECT)
+        _writeAll(fd, buf, aligned, count)
+
+
+def _writeAll(fd, buf, start, end):
+    while start < end:
+        start += uninterruptible(os.write, fd, _bufferView(buf, start, end))
+
+
+def _socketFileno(fileObj):
+    """
+    Return the file descriptor of fileObj if it wraps a plain socket, None
+    otherwise.
+
+    sendfile() writes directly to the file descriptor, so it must not be used
+    with a TLS connection; fileno() of a file wrapping a ssl socket returns
+    the underlying TCP socket, and the data would be sent unencrypted inside
+    the TLS stream. Files wrapping anything but a known plain socket are
+    copied using the buffered path.
+    """
+    sock = _underlyingSocket(fileObj)
+    if (not isinstance(sock, (socket.socket, _socket.socket)) or
+            isinstance(sock, ssl.SSLSocket)):
+        return None
+    try:
+        fd = fileObj.fileno()
+    except (AttributeError, ValueError, EnvironmentError):
+        return None
+    if not stat.S_ISSOCK(os.fstat(fd).st_mode):
+        return None
+    return fd
+
+
+def _underlyingSocket(fileObj):
+    """
+    Return the socket object wrapped by a file returned from
+    socket.makefile(), or None.
+    """
+    # Python 2: socket._fileobject
+    sock = getattr(fileObj, "_sock", None)
+    if sock is None:
+        # Python 3: io.BufferedWriter wrapping a socket.SocketIO
+        sock = getattr(getattr(fileObj, "raw", None), "_sock", None)
+    return sock
+
+
+if six.PY2:
+    import ctypes
+
+    _libc = ctypes.CDLL("libc.so.6", use_errno=True)
+
+    def _bufferView(buf, start, end):
+        return buffer(buf, start, end - start)
+
+    def _sendfile(out_fd, in_fd, count):
+        n = _libc.sendfile(out_fd, in_fd, None, ctypes.c_size_t(count))
+        if n < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        return n
+else:
+    def _bufferView(buf, start, end):
+        return memoryview(buf)[start:end]
+
+    def _sendfile(out_fd, in_fd, count):
+        return os.sendfile(out_fd, in_fd, None, count)
+
+
 _METHOD_IMPLEMENTATIONS = {
     'http': (httpGetSize, httpDownloadImage, httpUploadImage),
 }
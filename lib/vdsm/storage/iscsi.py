@@ -201,6 +201,10 @@ def addIscsiNode(iface, target, credentials=None):
     # bounded iface. Explicitly specifying tpgt on iSCSI login imposes creation
     # of the node record in the new style format which enables to access a
     # portal through multiple ifaces for multipathing.
+    #
+    # The login does not modify the node records, and may take long time
+    # when the portal is not reachable, so it is done without holding the
+    # transaction lock, letting other nodes login concurrently.
     with _iscsiadmTransactionLock:
         iscsiadm.node_new(iface.name, target.address, target.iqn)
         try:
@@ -213,14 +217,21 @@ def addIscsiNode(iface, target, credentials=None):
 
             setRpFilterIfNeeded(iface.netIfaceName, target.portal.hostname,
                                 True)
+        except:
+            removeIscsiNode(iface, target)
+            raise
 
-            iscsiadm.node_login(iface.name, target.address, target.iqn)
+    try:
+        timeout = config.getint('irs', 'iscsi_login_timeout')
+        iscsiadm.node_login(iface.name, target.address, target.iqn,
+                            timeout=timeout)
 
+        with _iscsiadmTransactionLock:
             iscsiadm.node_update(iface.name, target.address, target.iqn,
                                  "node.startup", "manual")
-        except:
-            removeIscsiNode(iface, target)
-            raise
+    except:
+        removeIscsiNode(iface, target)
+        raise
 
 
 def removeIscsiNode(iface, target):
@@ -87,6 +87,10 @@ class IscsiNodeError(IscsiError):
     pass
 
 
+class IscsiLoginTimeout(IscsiNodeError):
+    pass
+
+
 class IscsiSessionNotFound(IscsiError):
     pass
 
@@ -322,19 +326,43 @@ def node_disconnect(iface, portal, targetName):
     raise IscsiNodeError(rc, out, err)
 
 
-def node_login(iface, portal, targetName):
-    rc, out, err = _runCmd(["-m", "node", "-T", targetName, "-I", iface, "-p",
-                            portal, "-l"])
-    if rc == 0:
-        return
+def node_login_async(iface, portal, targetName):
+    """
+    Start login to a node, returning AsyncProcessOperation. iscsiadm calls
+    are serialized only while starting the login, so logins to different
+    nodes run concurrently.
+    """
+    proc = _runCmd(["-m", "node", "-T", targetName, "-I", iface, "-p",
+                    portal, "-l"], sync=False)
 
-    if not iface_exists(iface):
-        raise IscsiInterfaceDoesNotExistError(iface)
+    def parse_result(rc, out, err):
+        if rc == 0:
+            return
 
-    if rc == ISCSI_ERR_LOGIN_AUTH_FAILED:
-        raise IscsiAuthenticationError(rc, out, err)
+        if not iface_exists(iface):
+            raise IscsiInterfaceDoesNotExistError(iface)
 
-    raise IscsiNodeError(rc, out, err)
+        if rc == ISCSI_ERR_LOGIN_AUTH_FAILED:
+            raise IscsiAuthenticationError(rc, out, err)
+
+        raise IscsiNodeError(rc, out, err)
+
+    return AsyncProcessOperation(proc, parse_result)
+
+
+def node_login(iface, portal, targetName, timeout=None):
+    """
+    Login to a node, waiting up to timeout seconds. Raises IscsiLoginTimeout
+    if the login did not finish in time.
+    """
+    aop = node_login_async(iface, portal, targetName)
+    if not aop.wait(timeout=timeout):
+        aop.stop()
+        raise IscsiLoginTimeout(iface, portal, targetName, timeout)
+
+    _, err = aop.result()
+    if err is not None:
+        raise err
 
 
 def session_rescan_async():
@@ -23,8 +23,11 @@ import logging
 import threading
 import time
 
+from vdsm import executor
+from vdsm import schedule
 from vdsm import utils
 from vdsm.common import concurrent
+from vdsm.common.time import monotonic_time
 from vdsm.config import config
 from vdsm.storage import check
 from vdsm.storage import clusterlock
@@ -33,6 +36,9 @@ from vdsm.storage.sdc import sdCache
 
 log = logging.getLogger('storage.Monitor')
 
+# Every domain has at most one cycle waiting in the executor queue.
+_MAX_TASKS = 1000
+
 
 class Status(object):
 
@@ -147,6 +153,22 @@ class DomainMonitor(object):
             "storage.DomainMonitor.onDomainStateChange", sync=False)
         self._checker = check.CheckService()
         self._checker.start()
+        self._scheduler = schedule.Scheduler(name="monitor/scheduler",
+                                             clock=monotonic_time)
+        self._scheduler.start()
+        self._workers_count = config.getint("irs", "monitor_workers")
+        # A domain has at most one cycle in progress, so at most one worker
+        # per domain can be blocked on inaccessible storage. Allowing a
+        # worker per domain on top of the workers count ensures that domains
+        # on accessible storage are always checked.
+        self._executor = executor.Executor(
+            name="monitor",
+            workers_count=self._workers_count,
+            max_tasks=_MAX_TASKS,
+            scheduler=self._scheduler,
+            max_workers=self._workers_count,
+            log=log)
+        self._executor.start()
 
     @property
     def domains(self):
@@ -180,9 +202,11 @@ class DomainMonitor(object):
             return
 
         log.info("Start monitoring %s", sdUUID)
-        monitor = MonitorThread(sdUUID, hostId, self._interval,
-                                self.onDomainStateChange, self._checker)
+        monitor = MonitorTask(sdUUID, hostId, self._interval,
+                              self.onDomainStateChange, self._checker,
+                              self._scheduler, self._executor)
         monitor.poolDomain = poolDomain
+        self._updateMaxWorkers(len(self._monitors) + 1)
         monitor.start()
         # The domain should be added only after it succesfully started
         self._monitors[sdUUID] = monitor
@@ -222,6 +246,9 @@ class DomainMonitor(object):
         log.info("Shutting down domain monitors")
         self._stopMonitors(self._monitors.values(), shutdown=True)
         self._checker.stop()
+        # Workers blocked on inaccessible storage may never finish.
+        self._executor.stop(wait=False)
+        self._scheduler.stop()
 
     def _stopMonitors(self, monitors, shutdown=False):
         # The domain monitor issues events that might become raceful if
@@ -230,14 +257,14 @@ class DomainMonitor(object):
         # the host id is released. If the monitor didn't actually exit it
         # might respawn a new acquire host id.
 
-        # First stop monitor threads - this take no time, and make the process
+        # First stop monitors - this take no time, and make the process
         # about 7 times faster when stopping 30 monitors.
         for monitor in monitors:
             log.info("Stop monitoring %s (shutdown=%s)",
                      monitor.sdUUID, shutdown)
             monitor.stop(shutdown=shutdown)
 
-        # Now wait for threads to finish - this takes about 10 seconds with 30
+        # Now wait for monitors to finish - this takes about 10 seconds with 30
         # monitors, most of the time spent waiting for sanlock.
         for monitor in monitors:
             log.debug("Waiting for monitor %s", monitor.sdUUID)
@@ -247,13 +274,32 @@ class DomainMonitor(object):
             except KeyError:
                 log.warning("Montior for %s removed while stopping",
                             monitor.sdUUID)
+        self._updateMaxWorkers(len(self._monitors))
+
+    def _updateMaxWorkers(self, domains):
+        self._executor.max_workers = self._workers_count + domains
+
 
+class MonitorTask(object):
+    """
+    Monitors a storage domain periodically.
 
-class MonitorThread(object):
+    Monitoring cycles are scheduled by the domain monitor scheduler and run
+    by the domain monitor executor, so monitoring many domains does not need
+    a thread per domain. A domain has at most one cycle in progress; the next
+    cycle is scheduled when the current cycle ends. If a cycle is blocked on
+    inaccessible storage, the executor replaces the blocked worker, so other
+    domains are still monitored. The domain monitor allows a worker per
+    domain on top of the workers count, so even if all the domains but one
+    are blocked, the remaining domain is monitored.
+    """
 
-    def __init__(self, sdUUID, hostId, interval, changeEvent, checker):
-        self.thread = concurrent.thread(self._run, log=log,
-                                        name="monitor/" + sdUUID[:7])
+    # A cycle blocked for this number of intervals is considered stuck, and
+    # the executor replaces the worker running it.
+    BLOCKED_INTERVALS = 3
+
+    def __init__(self, sdUUID, hostId, interval, changeEvent, checker,
+                 scheduler, executor):
         self.stopEvent = threading.Event()
         self.domain = None
         self.sdUUID = sdUUID
@@ -277,16 +323,35 @@ class MonitorThread(object):
         self.wasShutdown = False
         # Used for synchronizing during the tests
         self.cycleCallback = _NULL_CALLBACK
+        self._scheduler = scheduler
+        self._executor = executor
+        # Protects the scheduling state below.
+        self._cycleLock = threading.Lock()
+        self._nextCycle = None
+        self._cycleRunning = False
+        self._ready = False
+        self._stopped = threading.Event()
 
     def start(self):
-        self.thread.start()
+        log.debug("Domain monitor for %s started", self.sdUUID)
+        with self._cycleLock:
+            self._nextCycle = self._scheduler.schedule(0, self._dispatch)
 
     def stop(self, shutdown=False):
         self.wasShutdown = shutdown
-        self.stopEvent.set()
+        with self._cycleLock:
+            self.stopEvent.set()
+            if self._nextCycle is not None:
+                self._nextCycle.cancel()
+                self._nextCycle = None
+            # If a cycle is in progress, it will finish the monitor when it
+            # ends.
+            finish = not self._cycleRunning
+        if finish:
+            self._finish()
 
     def join(self):
-        self.thread.join()
+        self._stopped.wait()
 
     def getStatus(self):
         return self.status
@@ -300,39 +365,78 @@ class MonitorThread(object):
         """ Accessed by methods decorated with @util.cancelpoint """
         return self.stopEvent.is_set()
 
-    def _run(self):
-        log.debug("Domain monitor for %s started", self.sdUUID)
+    # Scheduling cycles
+
+    def _dispatch(self):
+        """
+        Called from the scheduler thread. Must not block!
+        """
+        with self._cycleLock:
+            self._nextCycle = None
+            if self.stopEvent.is_set():
+                return
+            self._cycleRunning = True
         try:
-            self._setupLoop()
-            self._monitorLoop()
+            self._executor.dispatch(
+                self._cycle, timeout=self.interval * self.BLOCKED_INTERVALS)
+        except Exception as e:
+            log.error("Cannot run monitor cycle for %s: %s", self.sdUUID, e)
+            self._cycleDone()
+
+    def _cycle(self):
+        try:
+            if not self._ready:
+                self._setup()
+            if self._ready:
+                self._monitor()
         except utils.Canceled:
             log.debug("Domain monitor for %s canceled", self.sdUUID)
         finally:
-            log.debug("Domain monitor for %s stopped (shutdown=%s)",
-                      self.sdUUID, self.wasShutdown)
+            self._cycleDone()
+
+    def _cycleDone(self):
+        with self._cycleLock:
+            self._cycleRunning = False
+            if not self.stopEvent.is_set():
+                self._nextCycle = self._scheduler.schedule(self.interval,
+                                                           self._dispatch)
+                return
+        self._finish()
+
+    def _finish(self):
+        # Releasing the host id may take several seconds. When stopping many
+        # domains, release the host ids in parallel.
+        t = concurrent.thread(self._stopMonitor, log=log,
+                              name="monitor/" + self.sdUUID[:7])
+        t.start()
+
+    def _stopMonitor(self):
+        try:
             self._stopCheckingPath()
             if self._shouldReleaseHostId():
                 self._releaseHostId()
+        finally:
+            log.debug("Domain monitor for %s stopped (shutdown=%s)",
+                      self.sdUUID, self.wasShutdown)
+            self._stopped.set()
 
     # Setting up
 
-    def _setupLoop(self):
+    def _setup(self):
         """
-        Set up the monitor, retrying on failures. Returns when the monitor is
-        ready.
+        Set up the monitor. On failure, the setup is retried in the next
+        cycle.
         """
-        while True:
-            try:
-                self._setupMonitor()
-                return
-            except Exception as e:
-                log.exception("Setting up monitor for %s failed", self.sdUUID)
-                domain_status = DomainStatus(error=e)
-                status = Status(self.status._path_status, domain_status)
-                self._updateStatus(status)
-                self.cycleCallback()
-                if self.stopEvent.wait(self.interval):
-                    raise utils.Canceled
+        try:
+            self._setupMonitor()
+        except Exception as e:
+            log.exception("Setting up monitor for %s failed", self.sdUUID)
+            domain_status = DomainStatus(error=e)
+            status = Status(self.status._path_status, domain_status)
+            self._updateStatus(status)
+            self.cycleCallback()
+        else:
+            self._ready = True
 
     def _setupMonitor(self):
         # Pick up changes in the domain, for example, domain upgrade.
@@ -340,7 +444,7 @@ class MonitorThread(object):
             self._refreshDomain()
 
         # Producing the domain is deferred because it might take some time and
-        # we don't want to slow down the thread start (and anything else that
+        # we don't want to slow down the monitor start (and anything else that
         # relies on that as for example updateMonitoringThreads). It also might
         # fail and we want keep trying until we succeed or the domain is
         # deactivated.
@@ -375,19 +479,13 @@ class MonitorThread(object):
 
     # Monitoring
 
-    def _monitorLoop(self):
-        """
-        Monitor the domain peroidically until the monitor is stopped.
-        """
-        while True:
-            try:
-                self._monitorDomain()
-            except Exception:
-                log.exception("Domain monitor for %s failed", self.sdUUID)
-            finally:
-                self.cycleCallback()
-            if self.stopEvent.wait(self.interval):
-                raise utils.Canceled
+    def _monitor(self):
+        try:
+            self._monitorDomain()
+        except Exception:
+            log.exception("Domain monitor for %s failed", self.sdUUID)
+        finally:
+            self.cycleCallback()
 
     def _monitorDomain(self):
         # Pick up changes in the domain, for example, domain upgrade.
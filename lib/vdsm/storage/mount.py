@@ -24,7 +24,9 @@ import errno
 import logging
 import os
 import re
+import select
 import stat
+import threading
 
 from collections import namedtuple
 
@@ -134,21 +136,102 @@ def _resolveLoopDevice(path):
     return path
 
 
-def _iterKnownMounts():
-    with open(_PROC_MOUNTS_PATH, "r") as f:
-        for line in f:
-            yield _parseFstabLine(line)
+def _resolveMountRecord(rec):
+    realSpec = _resolveLoopDevice(rec.fs_spec)
+    if rec.fs_spec == realSpec:
+        return rec
 
+    return MountRecord(realSpec, rec.fs_file, rec.fs_vfstype,
+                       rec.fs_mntops, rec.fs_freq, rec.fs_passno)
 
-def _iterMountRecords():
-    for rec in _iterKnownMounts():
-        realSpec = _resolveLoopDevice(rec.fs_spec)
-        if rec.fs_spec == realSpec:
-            yield rec
-            continue
 
-        yield MountRecord(realSpec, rec.fs_file, rec.fs_vfstype,
-                          rec.fs_mntops, rec.fs_freq, rec.fs_passno)
+class _MountTable(object):
+    """
+    Parsed mount table, reloaded only when the mount table changes.
+
+    The kernel reports a change in the mount namespace by signaling POLLPRI
+    and POLLERR on an open /proc/mounts file, so checking if the table is
+    valid is a poll() with zero timeout. Records are parsed, normalized and
+    resolved once per change, and indexed by target and by spec and target.
+
+    Files that do not report changes (e.g. fake mount tables in the tests)
+    are loaded once.
+    """
+
+    _CHANGED = select.POLLPRI | select.POLLERR
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._path = None
+        self._file = None
+        self._poller = None
+        self._records = ()
+        self._by_file = {}
+        self._by_spec_file = {}
+
+    def records(self):
+        with self._lock:
+            self._refresh()
+            return self._records
+
+    def lookup(self, fs_file, fs_spec=None):
+        """
+        Return the first record mounted at fs_file, and if fs_spec is
+        specified, mounting fs_spec. Return None if there is no such record.
+        """
+        with self._lock:
+            self._refresh()
+            if fs_spec is None:
+                return self._by_file.get(fs_file)
+            return self._by_spec_file.get((fs_spec, fs_file))
+
+    def invalidate(self):
+        with self._lock:
+            self._close()
+
+    def _refresh(self):
+        if self._path != _PROC_MOUNTS_PATH:
+            self._close()
+
+        if self._file is None:
+            self._path = _PROC_MOUNTS_PATH
+            self._file = open(self._path, "r")
+            self._poller = select.poll()
+            self._poller.register(self._file.fileno(), self._CHANGED)
+            # Polling resets the change event.
+            self._poller.poll(0)
+        elif not any(ev & self._CHANGED for _, ev in self._poller.poll(0)):
+            return
+
+        self._file.seek(0)
+        records = tuple(_resolveMountRecord(_parseFstabLine(line))
+                        for line in self._file)
+        by_file = {}
+        by_spec_file = {}
+        for rec in records:
+            by_file.setdefault(rec.fs_file, rec)
+            by_spec_file.setdefault((rec.fs_spec, rec.fs_file), rec)
+
+        self._records = records
+        self._by_file = by_file
+        self._by_spec_file = by_spec_file
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+        self._path = None
+        self._file = None
+        self._poller = None
+        self._records = ()
+        self._by_file = {}
+        self._by_spec_file = {}
+
+
+_mountTable = _MountTable()
+
+
+def _iterMountRecords():
+    return iter(_mountTable.records())
 
 
 def iterMounts():
@@ -171,9 +254,9 @@ def getMountFromTarget(target):
     """
     The given target should be normalized.
     """
-    for rec in _iterMountRecords():
-        if rec.fs_file == target:
-            return Mount(rec.fs_spec, rec.fs_file)
+    rec = _mountTable.lookup(target)
+    if rec is not None:
+        return Mount(rec.fs_spec, rec.fs_file)
 
     raise OSError(errno.ENOENT, 'Mount target %s not found' % target)
 
@@ -244,10 +327,11 @@ class Mount(object):
         if os.path.islink(self.fs_spec):
             fs_specs = self.fs_spec, os.path.realpath(self.fs_spec)
         else:
-            fs_specs = self.fs_spec, None
+            fs_specs = self.fs_spec,
 
-        for record in _iterMountRecords():
-            if self.fs_file == record.fs_file and record.fs_spec in fs_specs:
+        for fs_spec in fs_specs:
+            record = _mountTable.lookup(self.fs_file, fs_spec)
+            if record is not None:
                 return record
 
         raise OSError(errno.ENOENT,
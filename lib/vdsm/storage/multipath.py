@@ -222,7 +222,7 @@ def getHBTL(physdev):
 
 def pathListIter(filterGuids=()):
     filterLen = len(filterGuids) if filterGuids else -1
-    devsFound = 0
+    devs = []
 
     knownSessions = {}
 
@@ -230,19 +230,28 @@ def pathListIter(filterGuids=()):
     pathStatuses = devicemapper.getPathsStatus()
 
     for dmId, guid in getMPDevsIter():
-        if devsFound == filterLen:
+        if len(devs) == filterLen:
             break
 
         if filterGuids and guid not in filterGuids:
             continue
 
-        devsFound += 1
+        devs.append((dmId, guid))
+
+    # Getting the serial requires root; fetch all of them in one batch so
+    # supervdsm can serve them concurrently.
+    serials = svdsm.batch([("getScsiSerial", (dmId,), {})
+                           for dmId, _ in devs])
+
+    for (dmId, guid), serial in zip(devs, serials):
+        if not serial.succeeded:
+            raise serial.value
 
         devInfo = {
             "guid": guid,
             "dm": dmId,
             "capacity": str(getDeviceSize(dmId)),
-            "serial": svdsm.getScsiSerial(dmId),
+            "serial": serial.value,
             "paths": [],
             "connections": [],
             "devtypes": [],
@@ -19,15 +19,23 @@
 #
 
 from __future__ import absolute_import
+import collections
+import errno
+import hashlib
+import io
 import json
 import logging
+import mmap
 import os
 import re
+import threading
 
 from vdsm import cmdutils
 from vdsm import commands
+from vdsm import utils
 from vdsm.common import cmdutils as common_cmdutils
 from vdsm.common import exception
+from vdsm.common.osutils import uninterruptible
 from vdsm.config import config
 from vdsm.storage import operation
 
@@ -46,6 +54,31 @@ class FORMAT:
 _QCOW2_COMPAT_SUPPORTED = ("0.10", "1.1")
 
 
+class PREALLOCATION:
+    OFF = "off"
+    FALLOC = "falloc"
+    FULL = "full"
+    METADATA = "metadata"
+
+
+class COPY_MODE:
+    # Use qemu-img convert defaults.
+    DEFAULT = "default"
+    # Use more coroutines, out of order writes and preallocation when the
+    # destination allows it.
+    PARALLEL = "parallel"
+
+
+COPY_MODES = (COPY_MODE.DEFAULT, COPY_MODE.PARALLEL)
+
+# qemu-img limits the number of coroutines used by convert to 16.
+_MAX_COROUTINES = 16
+
+# The fields reported by info(), including the backing file name, are stored
+# in the image header, in the first cluster of the image.
+_HEADER_SIZE = 64 * 1024
+
+
 def supports_compat(compat):
     return compat in _QCOW2_COMPAT_SUPPORTED
 
@@ -61,6 +94,49 @@ class InvalidOutput(cmdutils.Error):
 
 
 def info(image, format=None):
+    """
+    Return image information using qemu-img info.
+
+    Results are cached and reused while the image size and header do not
+    change, avoiding running qemu-img for repeated queries about unchanged
+    images. The header is read using direct I/O, so changes made by other
+    hosts are detected. Operations modifying images in this module also
+    invalidate the cache.
+    """
+    key = (image, format)
+    stamp = None
+    capacity = config.getint('irs', 'qemuimg_info_cache_size')
+    if capacity > 0:
+        stamp = _image_stamp(image)
+        if stamp is not None:
+            cached = _info_cache.get(key, stamp)
+            if cached is not None:
+                return cached
+
+    info = _run_info(image, format)
+
+    if stamp is not None:
+        _info_cache.put(key, stamp, info, capacity)
+
+    return info
+
+
+def info_cache_stats():
+    """
+    Return info cache statistics: number of hits (qemu-img runs avoided),
+    misses, and cached entries.
+    """
+    return _info_cache.stats()
+
+
+def invalidate_info(image):
+    """
+    Drop cached info for image, modified by vdsm.
+    """
+    _info_cache.invalidate(image)
+
+
+def _run_info(image, format):
     cmd = [_qemuimg.cmd, "info", "--output", "json"]
 
     if format:
@@ -119,6 +195,7 @@ def create(image, size=None, format=None, qcow2Compat=None,
     if size is not None:
         cmd.append(str(size))
 
+    invalidate_info(image)
     _run_cmd(cmd, cwd=cwdPath)
 
 
@@ -142,7 +219,8 @@ def check(image, format=None):
 
 
 def convert(srcImage, dstImage, srcFormat=None, dstFormat=None,
-            dstQcow2Compat=None, backing=None, backingFormat=None):
+            dstQcow2Compat=None, backing=None, backingFormat=None,
+            preallocation=None, unordered_writes=False, coroutines=None):
     cmd = [_qemuimg.cmd, "convert", "-p", "-t", "none", "-T", "none"]
     options = []
     cwdPath = None
@@ -152,12 +230,23 @@ def convert(srcImage, dstImage, srcFormat=None, dstFormat=None,
 
     cmd.append(srcImage)
 
+    if coroutines is not None:
+        if not 1 <= coroutines <= _MAX_COROUTINES:
+            raise ValueError("Invalid number of coroutines %r" % coroutines)
+        cmd.extend(("-m", str(coroutines)))
+
+    if unordered_writes:
+        cmd.append("-W")
+
     if dstFormat:
         cmd.extend(("-O", dstFormat))
         if dstFormat == FORMAT.QCOW2:
             qcow2Compat = _validate_qcow2_compat(dstQcow2Compat)
             options.append('compat=' + qcow2Compat)
 
+    if preallocation:
+        options.append('preallocation=' + preallocation)
+
     if backing:
         if not os.path.isabs(backing):
             cwdPath = os.path.dirname(srcImage)
@@ -172,7 +261,45 @@ def convert(srcImage, dstImage, srcFormat=None, dstFormat=None,
 
     cmd.append(dstImage)
 
-    return ProgressCommand(cmd, cwd=cwdPath)
+    return ProgressCommand(cmd, cwd=cwdPath, modifies=(dstImage,))
+
+
+def convert_options(mode, dstFormat, dstIsBlock, dstPreallocated):
+    """
+    Return convert() keyword arguments for copying an image to a destination
+    with dstFormat, on block or file storage, using copy mode.
+
+    In COPY_MODE.PARALLEL:
+    - Use the maximum number of coroutines, configurable using
+      irs:qemuimg_convert_coroutines.
+    - Allow out of order writes only for raw images on block storage. On file
+      storage out of order writes fragment the image, and qcow2 images would
+      allocate clusters out of order.
+    - Preallocate raw images on file storage if the destination volume is
+      preallocated, since qemu-img recreates the destination file. Block
+      storage is always allocated and does not support preallocation.
+
+    Zero detection is left to qemu-img: zero areas are not written to file
+    storage, and are written efficiently to block storage, which is not
+    guaranteed to read as zeros.
+    """
+    if mode not in COPY_MODES:
+        raise ValueError("Invalid copy mode %r" % mode)
+
+    if mode == COPY_MODE.DEFAULT:
+        return {}
+
+    options = {
+        "coroutines": config.getint("irs", "qemuimg_convert_coroutines"),
+    }
+
+    if dstFormat == FORMAT.RAW:
+        if dstIsBlock:
+            options["unordered_writes"] = True
+        elif dstPreallocated:
+            options["preallocation"] = PREALLOCATION.FALLOC
+
+    return options
 
 
 def commit(top, topFormat, base=None):
@@ -193,7 +320,8 @@ def commit(top, topFormat, base=None):
 
     # For simplicity, we always run commit in the image directory.
     workdir = os.path.dirname(top)
-    return ProgressCommand(cmd, cwd=workdir)
+    modifies = (top, base) if base else (top,)
+    return ProgressCommand(cmd, cwd=workdir, modifies=modifies)
 
 
 def map(image):
@@ -214,6 +342,7 @@ def amend(image, compat):
     # For simplicity, we always run commit in the image directory.
     workdir = os.path.dirname(image)
     cmd = [_qemuimg.cmd, "amend", "-o", "compat=" + compat, image]
+    invalidate_info(image)
     _run_cmd(cmd, cwd=workdir)
 
 
@@ -221,15 +350,20 @@ class ProgressCommand(object):
 
     REGEXPR = re.compile(r'\s*\(([\d.]+)/100%\)\s*')
 
-    def __init__(self, cmd, cwd=None):
+    def __init__(self, cmd, cwd=None, modifies=()):
         self._operation = operation.Command(cmd, cwd=cwd)
         self._progress = 0.0
+        self._modifies = modifies
 
     def run(self):
         out = bytearray()
-        for data in self._operation.watch():
-            out += data
-            self._update_progress(out)
+        try:
+            for data in self._operation.watch():
+                out += data
+                self._update_progress(out)
+        finally:
+            for image in self._modifies:
+                invalidate_info(image)
 
     def abort(self):
         """
@@ -284,6 +418,7 @@ def resize(image, newSize, format=None):
         cmd.extend(("-f", format))
 
     cmd.extend((image, str(newSize)))
+    invalidate_info(image)
     _run_cmd(cmd)
 
 
@@ -303,6 +438,9 @@ def rebase(image, backing, format=None, backingFormat=None, unsafe=False):
 
     cwdPath = None if os.path.isabs(backing) else os.path.dirname(image)
 
+    # The operation is run by the caller; changes made after this point are
+    # detected by info() when the image header changes.
+    invalidate_info(image)
     return operation.Command(cmd, cwd=cwdPath)
 
 
@@ -331,6 +469,89 @@ def _validate_qcow2_compat(value):
     return value
 
 
+def _image_stamp(image):
+    """
+    Return a value identifying the image size and header, or None if the image
+    cannot be read.
+    """
+    try:
+        fd = os.open(image, os.O_RDONLY | os.O_DIRECT)
+    except OSError as e:
+        if e.errno != errno.EINVAL:
+            return None
+        # File system does not support direct I/O (e.g. tmpfs).
+        try:
+            fd = os.open(image, os.O_RDONLY)
+        except OSError:
+            return None
+
+    try:
+        with io.FileIO(fd, "r", closefd=True) as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(0)
+            buf = mmap.mmap(-1, _HEADER_SIZE, mmap.MAP_SHARED)
+            with utils.closing(buf, log=_log.name):
+                nread = uninterruptible(f.readinto, buf)
+                digest = hashlib.sha1(buf[:nread]).digest()
+    except EnvironmentError:
+        return None
+
+    return size, digest
+
+
+class _InfoCache(object):
+    """
+    LRU cache of info() results, validated using the image stamp.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key, stamp):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry[0] != stamp:
+                self._misses += 1
+                return None
+            self._entries[key] = entry
+            self._hits += 1
+            # Callers may modify the returned info.
+            return dict(entry[1])
+
+    def put(self, key, stamp, info, capacity):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (stamp, dict(info))
+            while len(self._entries) > capacity:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, image):
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == image:
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": len(self._entries),
+            }
+
+
+_info_cache = _InfoCache()
+
+
 def _run_cmd(cmd, cwd=None):
     rc, out, err = commands.execCmd(cmd, raw=True, cwd=cwd)
     if rc != 0:
@@ -24,6 +24,7 @@ import logging
 
 from vdsm import jobs
 from vdsm.common import properties
+from vdsm.config import config
 from vdsm.storage import constants as sc
 from vdsm.storage import guarded
 from vdsm.storage import qemuimg
@@ -39,13 +40,21 @@ class Job(base.Job):
     """
     Copy data from one endpoint to another using qemu-img convert. Currently we
     only support endpoints that are vdsm volumes.
+
+    copy_mode is one of qemuimg.COPY_MODES, selecting how qemu-img convert
+    is tuned for the destination. If not specified, irs:copy_mode is used.
     """
     log = logging.getLogger('storage.sdm.copy_data')
 
-    def __init__(self, job_id, host_id, source, destination):
+    def __init__(self, job_id, host_id, source, destination, copy_mode=None):
         super(Job, self).__init__(job_id, 'copy_data', host_id)
+        if copy_mode is None:
+            copy_mode = config.get('irs', 'copy_mode')
+        if copy_mode not in qemuimg.COPY_MODES:
+            raise ValueError("Invalid copy mode %r" % copy_mode)
         self._source = _create_endpoint(source, host_id, writable=False)
         self._dest = _create_endpoint(destination, host_id, writable=True)
+        self._copy_mode = copy_mode
         self._operation = None
 
     @property
@@ -71,6 +80,12 @@ class Job(base.Job):
                     src_format = self._source.qemu_format
                     dst_format = self._dest.qemu_format
 
+                options = qemuimg.convert_options(
+                    self._copy_mode,
+                    dst_format,
+                    self._dest.is_block,
+                    self._dest.is_preallocated)
+
                 with self._dest.volume_operation():
                     self._operation = qemuimg.convert(
                         self._source.path,
@@ -79,7 +94,8 @@ class Job(base.Job):
                         dstFormat=dst_format,
                         dstQcow2Compat=self._dest.qcow2_compat,
                         backing=self._dest.backing_path,
-                        backingFormat=self._dest.backing_qemu_format)
+                        backingFormat=self._dest.backing_qemu_format,
+                        **options)
                     self._operation.run()
 
 
@@ -143,6 +159,14 @@ class CopyDataDivEndpoint(properties.Owner):
         dom = sdCache.produce_manifest(self.sd_id)
         return dom.qcow2_compat()
 
+    @property
+    def is_block(self):
+        return self.volume.is_block()
+
+    @property
+    def is_preallocated(self):
+        return self.volume.getType() == sc.PREALLOCATED_VOL
+
     @property
     def backing_qemu_format(self):
         parent_vol = self.volume.getParentVolume()
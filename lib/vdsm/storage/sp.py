@@ -326,6 +326,10 @@ class StoragePool(object):
 
             self.log.debug("spm lock acquired successfully")
 
+            # The previous SPM may have created volumes using metadata slots
+            # that we consider free.
+            blockSD.invalidateMetadataSlots()
+
             try:
                 self.lver = int(oldlver) + 1
 
@@ -1337,6 +1337,10 @@ class Volume(object):
     def max_size(cls, virtual_size, format):
         return cls.manifestClass.max_size(virtual_size, format)
 
+    @classmethod
+    def is_block(cls):
+        return cls.manifestClass.is_block()
+
     def optimal_size(self):
         return self._manifest.optimal_size()
 
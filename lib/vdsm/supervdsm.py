@@ -26,6 +26,9 @@ from multiprocessing.managers import BaseManager, RemoteError
 import logging
 import threading
 from vdsm import constants, utils
+from vdsm.common import concurrent
+from vdsm.common import muxrpc
+from vdsm.config import config
 from vdsm.panic import panic
 
 _g_singletonSupervdsmInstance = None
@@ -33,6 +36,7 @@ _g_singletonSupervdsmInstance_lock = threading.Lock()
 
 
 ADDRESS = os.path.join(constants.P_VDSM_RUN, "svdsm.sock")
+MUX_ADDRESS = os.path.join(constants.P_VDSM_RUN, "svdsm-mux.sock")
 
 
 class _SuperVdsmManager(BaseManager):
@@ -46,12 +50,16 @@ class ProxyCaller(object):
         self._supervdsmProxy = supervdsmProxy
 
     def __call__(self, *args, **kwargs):
-        callMethod = lambda: \
-            getattr(self._supervdsmProxy._svdsm, self._funcName)(*args,
-                                                                 **kwargs)
+        mux = self._supervdsmProxy._mux
+        if mux is not None:
+            callMethod = lambda: mux.call(self._funcName, *args, **kwargs)
+        else:
+            callMethod = lambda: \
+                getattr(self._supervdsmProxy._svdsm, self._funcName)(*args,
+                                                                     **kwargs)
         try:
             return callMethod()
-        except RemoteError:
+        except (RemoteError, muxrpc.ConnectionClosed):
             self._supervdsmProxy._connect()
             raise RuntimeError(
                 "Broken communication with supervdsm. Failed call to %s"
@@ -67,6 +75,7 @@ class SuperVdsmProxy(object):
     def __init__(self):
         self._manager = None
         self._svdsm = None
+        self._mux = None
         self._connect()
 
     def open(self, *args, **kwargs):
@@ -87,6 +96,56 @@ class SuperVdsmProxy(object):
         # pylint: disable=no-member
         self._svdsm = self._manager.instance()
 
+        if config.get('vars', 'supervdsm_transport') == 'mux':
+            self._connect_mux()
+
+    def _connect_mux(self):
+        if self._mux is not None:
+            self._mux.close()
+        mux = muxrpc.Client(MUX_ADDRESS)
+        self._log.debug("Trying to connect to Super Vdsm mux channel")
+        try:
+            utils.retry(mux.connect, Exception, timeout=60, tries=3)
+        except Exception as ex:
+            msg = "Connect to supervdsm mux channel failed: %s" % ex
+            panic(msg)
+        self._mux = mux
+
+    def batch(self, calls):
+        """
+        Call multiple supervdsm methods, returning a list of
+        concurrent.Result in the order of calls.
+
+        calls is an iterable of (name, args, kwargs) tuples. When using the
+        mux transport all calls are in flight at the same time and run
+        concurrently in supervdsm; with the manager transport they are
+        performed one after another.
+        """
+        if self._mux is not None:
+            results = self._mux.batch(calls)
+            if any(isinstance(r.value, muxrpc.ConnectionClosed)
+                   for r in results if not r.succeeded):
+                self._connect()
+            return results
+
+        results = []
+        for name, args, kwargs in calls:
+            try:
+                value = getattr(self, name)(*args, **kwargs)
+            except Exception as e:
+                results.append(concurrent.Result(False, e))
+            else:
+                results.append(concurrent.Result(True, value))
+        return results
+
+    def stats(self):
+        """
+        Return per-method latency statistics of the mux transport.
+        """
+        if self._mux is None:
+            return {}
+        return self._mux.stats()
+
     def __getattr__(self, name):
         return ProxyCaller(self, name)
 
@@ -98,3 +157,14 @@ def getProxy():
             if _g_singletonSupervdsmInstance is None:
                 _g_singletonSupervdsmInstance = SuperVdsmProxy()
     return _g_singletonSupervdsmInstance
+
+
+def stats():
+    """
+    Return supervdsm call statistics, without connecting to supervdsm if no
+    connection was made yet.
+    """
+    proxy = _g_singletonSupervdsmInstance
+    if proxy is None:
+        return {}
+    return proxy.stats()
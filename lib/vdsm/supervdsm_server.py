@@ -34,6 +34,7 @@ from contextlib import closing
 
 from vdsm.common import concurrent
 from vdsm.common import fileutils
+from vdsm.common import muxrpc
 from vdsm.common import sigutils
 from vdsm.common import time
 from vdsm.common import zombiereaper
@@ -239,6 +240,7 @@ def main(args):
     parser = option_parser()
     args = parser.parse_args(args=args)
     sockfile = args.sockfile
+    mux_sockfile = args.mux_sockfile
     pidfile = args.pidfile
     if not config.getboolean('vars', 'core_dump_enable'):
         resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
@@ -298,6 +300,15 @@ def main(args):
 
             log.debug("Started serving super vdsm object")
 
+            if mux_sockfile:
+                log.debug("Starting mux channel at %s", mux_sockfile)
+                mux_server = muxrpc.Server(
+                    mux_sockfile, _SuperVdsm(),
+                    workers=config.getint('vars', 'supervdsm_mux_workers'))
+                mux_server.start()
+                chown(mux_sockfile, getpwnam(VDSM_USER).pw_uid,
+                      METADATA_GROUP)
+
             init_privileged_network_components()
 
             while _running:
@@ -307,6 +318,8 @@ def main(args):
         finally:
             if os.path.exists(address):
                 fileutils.rm_file(address)
+            if mux_sockfile and os.path.exists(mux_sockfile):
+                fileutils.rm_file(mux_sockfile)
 
     except Exception:
         log.error("Could not start Super Vdsm", exc_info=True)
@@ -317,6 +330,8 @@ def option_parser():
     parser = argparse.ArgumentParser()
     parser.add_argument('--sockfile', dest='sockfile', required=True,
                         help="socket file path")
+    parser.add_argument('--mux-sockfile', dest='mux_sockfile', default=None,
+                        help="multiplexed channel socket file path")
     parser.add_argument('--pidfile', dest='pidfile', default=None,
                         help="pid file path")
     return parser
@@ -26,8 +26,9 @@ status is a way to feedback information on the job (init, error etc)
 
 from __future__ import absolute_import
 
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 from contextlib import closing, contextmanager
+import copy
 import errno
 import io
 import logging
@@ -54,6 +55,7 @@ from vdsm.common.compat import CPopen
 from vdsm.common.define import errCode, doneCode
 from vdsm.common.logutils import traceback
 from vdsm.common.time import monotonic_time
+from vdsm.config import config
 from vdsm.constants import P_VDSM_LOG, P_VDSM_RUN, EXT_KVM_2_OVIRT
 from vdsm.utils import terminating, NICENESS, IOCLASS
 
@@ -172,18 +174,15 @@ def get_external_vms(uri, username, password, vm_names=None):
         return {'status': {'code': errCode['V2VConnection']['status']['code'],
                            'message': str(e)}}
 
+    def connect():
+        return libvirtconnection.open_connection(uri=uri,
+                                                 username=username,
+                                                 passwd=password)
+
     with closing(conn):
-        vms = []
-        for vm in _list_domains(conn):
-            if vm_names is not None and vm.name() not in vm_names:
-                # Skip this VM.
-                continue
-            elif conn.getType() == "ESX" and _vm_has_snapshot(vm):
-                logging.error("vm %r has snapshots and therefore can not be "
-                              "imported since snapshot conversion is not "
-                              "supported for VMware", vm.name())
-                continue
-            _add_vm(conn, vms, vm)
+        domains = [vm for vm in _list_domains(conn)
+                   if vm_names is None or vm.name() in vm_names]
+        vms = _inventory.collect((uri, username), conn, domains, connect)
         return {'status': doneCode, 'vmList': vms}
 
 
@@ -1075,6 +1074,164 @@ def _add_vm(conn, vms, vm):
                         vm.name())
 
 
+class _Inventory(object):
+    """
+    Collects information about VMs of external hypervisors.
+
+    VMs are read concurrently, since reading a VM requires several round
+    trips to the remote hypervisor. Some drivers, like esx and vpx, serialize
+    the calls of a connection, so every reader uses its own connection. Every
+    VM read is kept for [vars] v2v_inventory_cache_timeout seconds, so if the
+    caller times out while listing a big hypervisor, the next request returns
+    the VMs already read and reads only the rest.
+    """
+
+    def __init__(self, clock=monotonic_time):
+        self._clock = clock
+        self._lock = threading.Lock()
+        # {(uri, username): {vm_name: (time, params)}}
+        self._sources = {}
+
+    def collect(self, source, conn, domains, connect):
+        """
+        Return list of VM params for domains of conn, in the same order. VMs
+        which cannot be imported are not returned. connect opens additional
+        connections to source, up to [vars] v2v_inventory_workers.
+        """
+        timeout = config.getfloat('vars', 'v2v_inventory_cache_timeout')
+        workers = config.getint('vars', 'v2v_inventory_workers')
+        now = self._clock()
+
+        with self._lock:
+            cached = self._sources.get(source, {})
+            self._sources[source] = cached = {
+                name: entry for name, entry in cached.items()
+                if now - entry[0] < timeout}
+
+        connections = _Connections(conn, connect)
+
+        def read(vm):
+            name = vm.name()
+            entry = cached.get(name)
+            with connections.get() as worker_conn:
+                if worker_conn is not conn:
+                    vm = _lookup_vm(worker_conn, vm)
+                    if vm is None:
+                        return None
+                # Snapshots may have been created since the VM was read.
+                if _has_unsupported_snapshot(worker_conn, vm):
+                    return None
+                if entry is not None:
+                    params = copy.deepcopy(entry[1])
+                    # The VM may have been started or stopped since it was
+                    # read.
+                    _add_vm_info(vm, params)
+                    return params
+                params = _read_vm(worker_conn, vm)
+            if params is not None and timeout > 0:
+                with self._lock:
+                    cached[name] = (self._clock(), copy.deepcopy(params))
+            return params
+
+        start = monotonic_time()
+        with closing(connections):
+            results = concurrent.tmap(read, domains, max_workers=workers)
+        vms = []
+        for vm, res in zip(domains, results):
+            if not res.succeeded:
+                logging.error("Error reading vm %r: %s", vm.name(), res.value)
+            elif res.value is not None:
+                vms.append(res.value)
+        logging.info("Read %d vms from %s in %.2f seconds", len(vms),
+                     source[0], monotonic_time() - start)
+        return vms
+
+    def clear(self):
+        with self._lock:
+            self._sources.clear()
+
+
+_inventory = _Inventory()
+
+
+class _Connections(object):
+    """
+    Connections to an external hypervisor for concurrent readers. A reader
+    gets an idle connection, or a new one if all connections are in use.
+    """
+
+    def __init__(self, conn, connect):
+        self._conn = conn
+        self._connect = connect
+        self._lock = threading.Lock()
+        self._idle = [conn]
+        self._opened = []
+
+    @contextmanager
+    def get(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._open()
+            if conn is None:
+                # The shared connection is slower, but still works.
+                yield self._conn
+                return
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                self._idle.append(conn)
+
+    def _open(self):
+        try:
+            conn = self._connect()
+        except libvirt.libvirtError as e:
+            logging.warning("Error opening connection, using the shared "
+                            "connection: %s", e)
+            return None
+        with self._lock:
+            self._opened.append(conn)
+        return conn
+
+    def close(self):
+        for conn in self._opened:
+            try:
+                conn.close()
+            except libvirt.libvirtError as e:
+                logging.warning("Error closing connection: %s", e)
+
+
+def _lookup_vm(conn, vm):
+    """
+    Return vm as a domain of conn, or vm itself if it cannot be looked up.
+    """
+    try:
+        return conn.lookupByName(vm.name())
+    except libvirt.libvirtError as e:
+        if e.get_error_code() == libvirt.VIR_ERR_NO_DOMAIN:
+            logging.debug("vm %r was removed", vm.name())
+            return None
+        logging.warning("Error looking up vm %r, using the shared "
+                        "connection: %s", vm.name(), e)
+        return vm
+
+
+def _has_unsupported_snapshot(conn, vm):
+    if conn.getType() == "ESX" and _vm_has_snapshot(vm):
+        logging.error("vm %r has snapshots and therefore can not be "
+                      "imported since snapshot conversion is not "
+                      "supported for VMware", vm.name())
+        return True
+    return False
+
+
+def _read_vm(conn, vm):
+    vms = []
+    _add_vm(conn, vms, vm)
+    return vms[0] if vms else None
+
+
 def _block_disk_supported(conn, root):
     '''
     Currently we do not support importing VMs with block device from
@@ -1294,6 +1451,21 @@ def _read_ovf_from_zip_ova(ova_path):
 
 
 def _read_ovf_from_tar_ova(ova_path):
+    try:
+        members = _tar_index(ova_path)
+    except tarfile.ReadError:
+        # Compressed tar, must be read sequentially.
+        return _read_ovf_from_compressed_tar_ova(ova_path)
+    name = _find_ovf(m.name for m in members)
+    if name is None:
+        raise ClientError('OVA does not contains file with .ovf suffix')
+    member = next(m for m in members if m.name == name)
+    with open(ova_path, 'rb') as f:
+        f.seek(member.offset)
+        return f.read(member.size)
+
+
+def _read_ovf_from_compressed_tar_ova(ova_path):
     with tarfile.open(ova_path) as tar:
         for member in tar:
             if member.name.endswith('.ovf'):
@@ -1302,6 +1474,54 @@ def _read_ovf_from_tar_ova(ova_path):
         raise ClientError('OVA does not contains file with .ovf suffix')
 
 
+_TarMember = namedtuple('_TarMember', 'name, offset, size')
+
+# Number of ova indexes to keep
+_TAR_INDEX_CACHE_SIZE = 16
+
+_tar_index_lock = threading.Lock()
+# {ova_path: (file_id, [_TarMember, ...])}, least recently used first
+_tar_index_cache = OrderedDict()
+
+
+def _tar_index(ova_path):
+    """
+    Return list of _TarMember with the offset and size of every file in the
+    uncompressed tar ova_path. The index is kept until the file is modified,
+    since the same ova is inspected again when it is imported.
+
+    Raises tarfile.ReadError if ova_path is not an uncompressed tar.
+    """
+    st = os.stat(ova_path)
+    file_id = (st.st_ino, st.st_size, st.st_mtime)
+    with _tar_index_lock:
+        entry = _tar_index_cache.pop(ova_path, None)
+        if entry is not None and entry[0] == file_id:
+            _tar_index_cache[ova_path] = entry
+            return entry[1]
+
+    members = _read_tar_index(ova_path)
+
+    with _tar_index_lock:
+        _tar_index_cache[ova_path] = (file_id, members)
+        while len(_tar_index_cache) > _TAR_INDEX_CACHE_SIZE:
+            _tar_index_cache.popitem(last=False)
+    return members
+
+
+def _read_tar_index(ova_path):
+    start = monotonic_time()
+    with open(ova_path, 'rb') as f:
+        # Unlike the default mode, mode "r:" does not try compression methods,
+        # and seeks over members data, reading only the headers.
+        with closing(tarfile.open(fileobj=f, mode='r:')) as tar:
+            members = [_TarMember(m.name, m.offset_data, m.size)
+                       for m in tar if m.isfile()]
+    logging.debug("Indexed %d files in %s in %.3f seconds", len(members),
+                  ova_path, monotonic_time() - start)
+    return members
+
+
 def _add_general_ovf_info(vm, node, ns, ova_path):
     vm['status'] = 'Down'
     vmName = node.find('./ovf:VirtualSystem/ovf:Name', ns)
@@ -42,6 +42,7 @@ from vdsm.common import sigutils
 from vdsm.common import time
 from vdsm.common import zombiereaper
 from vdsm.config import config
+from vdsm.host import caps
 from vdsm.network.initializer import init_unprivileged_network_components
 from vdsm.panic import panic
 from vdsm.profiling import profile
@@ -109,6 +110,12 @@ def serve_clients(log):
 
         init_unprivileged_network_components(cif)
 
+        try:
+            caps.start()
+        except Exception:
+            log.exception("Cannot watch network events, network "
+                          "capabilities will not be cached")
+
         periodic.start(cif, scheduler)
         health.start()
         try:
@@ -119,6 +126,7 @@ def serve_clients(log):
         finally:
             metrics.stop()
             health.stop()
+            caps.stop()
             periodic.stop()
             cif.prepareForShutdown()
             jobs.stop()
@@ -58,8 +58,10 @@ import xml.etree.ElementTree as ET
 import libvirt
 import six
 
+from vdsm.common import concurrent
 from vdsm.common import conv
 from vdsm.common import errors
+from vdsm.common.time import monotonic_time
 from vdsm.virt import vmxml
 from vdsm.virt import xmlconstants
 from vdsm import utils
@@ -647,6 +649,109 @@ class Descriptor(object):
         return data
 
 
+class Writer(object):
+    """
+    Writes a Descriptor to a libvirt domain, coalescing frequent writes.
+
+    The first write after an idle interval is done immediately. Writes
+    requested during the interval after a write are coalesced into one write
+    at the end of the interval, done in a writer thread. Use flush() when the
+    metadata must be in the libvirt domain, e.g. before migration or before
+    starting an operation which must be recovered after vdsm restart.
+    """
+
+    _log = logging.getLogger('virt.metadata.Writer')
+
+    def __init__(self, desc, interval, name='md-writer', clock=monotonic_time):
+        """
+        :param desc: descriptor to write
+        :type desc: Descriptor
+        :param interval: minimal interval between writes in seconds, 0
+                         disables coalescing
+        :type interval: float
+        :param name: name of the thread doing deferred writes
+        :type name: str
+        """
+        self._desc = desc
+        self._interval = interval
+        self._name = name
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._dom = None
+        self._dirty = False
+        self._timer = None
+        self._last_write = None
+
+    def write(self, dom):
+        """
+        Request writing the descriptor to the given libvirt domain.
+
+        :param dom: domain to access
+        :type dom: libvirt.Domain
+        """
+        with self._lock:
+            self._dom = dom
+            self._dirty = True
+            if self._timer is not None:
+                return
+            if self._last_write is not None:
+                delay = self._last_write + self._interval - self._clock()
+                if delay > 0:
+                    self._timer = threading.Event()
+                    t = concurrent.thread(self._deferred_flush,
+                                          args=(delay, self._timer),
+                                          name=self._name, log=self._log)
+                    t.start()
+                    return
+        self.flush()
+
+    def flush(self):
+        """
+        Write pending changes to the libvirt domain now.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.set()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                dom = self._dom
+            try:
+                self._desc.dump(dom)
+            except:
+                with self._lock:
+                    self._dirty = True
+                raise
+            finally:
+                with self._lock:
+                    self._last_write = self._clock()
+
+    def cancel(self):
+        """
+        Drop pending changes, when the domain is gone.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.set()
+                self._timer = None
+            self._dirty = False
+
+    @property
+    def pending(self):
+        return self._dirty
+
+    def _deferred_flush(self, delay, cancelled):
+        if cancelled.wait(delay):
+            return
+        try:
+            self.flush()
+        except Exception:
+            self._log.exception("Error writing metadata")
+
+
 def _load_device(md_obj, dev):
     info = md_obj.load(dev)
 
@@ -20,6 +20,8 @@
 from __future__ import absolute_import
 
 import collections
+import functools
+import logging
 import re
 import threading
 import time
@@ -27,8 +29,8 @@ import libvirt
 
 from vdsm.common import concurrent
 from vdsm.common import conv
-from vdsm.common import logutils
 from vdsm.common import response
+from vdsm import executor
 from vdsm import sslutils
 from vdsm import utils
 from vdsm import jsonrpcvdscli
@@ -135,7 +137,7 @@ class SourceThread(object):
             self.run, name='migsrc/' + self._vm.id[:8])
         self._preparingMigrationEvt = True
         self._migrationCanceledEvt = threading.Event()
-        self._monitorThread = None
+        self._monitor = None
         self._destServer = None
         self._convergence_schedule = {
             'init': [],
@@ -178,12 +180,12 @@ class SourceThread(object):
         return self._mode == MODE_FILE
 
     def _update_progress(self):
-        if self._monitorThread is None:
+        if self._monitor is None:
             return
 
         # fetch migration status from the monitor thread
-        if self._monitorThread.progress is not None:
-            progress = self._monitorThread.progress.percentage
+        if self._monitor.progress is not None:
+            progress = self._monitor.progress.percentage
         else:
             progress = 0
 
@@ -238,6 +240,7 @@ class SourceThread(object):
         self.log.debug('Destination server is: ' + hostPort)
 
     def _setupRemoteMachineParams(self):
+        self._vm.flush_metadata()
         self._machineParams.update(self._vm.status())
         self._machineParams['elapsedTimeOffset'] = \
             time.time() - self._vm._startTime
@@ -497,14 +500,14 @@ class SourceThread(object):
             self._vm.log.info('starting migration to %s '
                               'with miguri %s', duri, muri)
 
-            self._monitorThread = MonitorThread(self._vm, startTime,
-                                                self._convergence_schedule,
-                                                self._use_convergence_schedule)
+            self._monitor = MigrationMonitor(self._vm, startTime,
+                                             self._convergence_schedule,
+                                             self._use_convergence_schedule)
 
             if self._use_convergence_schedule:
                 self._perform_with_conv_schedule(duri, muri)
             else:
-                self._perform_with_downtime_thread(duri, muri)
+                self._perform_with_downtime_schedule(duri, muri)
 
             self.log.info("migration took %d seconds to complete",
                           (time.time() - startTime) + destCreationTime)
@@ -564,24 +567,24 @@ class SourceThread(object):
                 break
         return flags
 
-    def _perform_with_downtime_thread(self, duri, muri):
-        self._vm.log.debug('performing migration with downtime thread')
-        self._monitorThread.downtime_thread = DowntimeThread(
+    def _perform_with_downtime_schedule(self, duri, muri):
+        self._vm.log.debug('performing migration with downtime schedule')
+        self._monitor.downtime_schedule = DowntimeSchedule(
             self._vm,
             int(self._downtime),
             config.getint('vars', 'migration_downtime_steps')
         )
 
-        with utils.running(self._monitorThread):
+        with utils.running(self._monitor):
             self._perform_migration(duri, muri)
 
-        self._monitorThread.join()
+        self._monitor.join()
 
     def _perform_with_conv_schedule(self, duri, muri):
         self._vm.log.debug('performing migration with conv schedule')
-        with utils.running(self._monitorThread):
+        with utils.running(self._monitor):
             self._perform_migration(duri, muri)
-        self._monitorThread.join()
+        self._monitor.join()
 
     def set_max_bandwidth(self, bandwidth):
         self._vm.log.debug('setting migration max bandwidth to %d', bandwidth)
@@ -639,7 +642,11 @@ def exponential_downtime(downtime, steps):
         yield downtime
 
 
-class DowntimeThread(object):
+class DowntimeSchedule(object):
+    """
+    Increase the migration downtime in steps, using the shared migration
+    monitoring instead of a thread per migration.
+    """
 
     # avoid grow too large for large VMs
     _WAIT_STEP_LIMIT = 60  # seconds
@@ -648,7 +655,10 @@ class DowntimeThread(object):
         self._vm = vm
         self._downtime = downtime
         self._steps = steps
-        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._call = None
+        self._stopped = False
+        self._done = threading.Event()
 
         delay_per_gib = config.getint('vars', 'migration_downtime_delay')
         memSize = vm.mem_size_mb()
@@ -660,39 +670,49 @@ class DowntimeThread(object):
         # we need the first value to support set_initial_downtime
         self._initial_downtime = next(self._downtimes)
 
-        self._thread = concurrent.thread(
-            self.run, name='migdwn/' + self._vm.id[:8])
-
     def start(self):
-        self._thread.start()
+        self._vm.log.debug('starting migration downtime schedule (%i steps)',
+                           self._steps)
+        self._step()
 
-    def join(self):
-        self._thread.join()
+    def join(self, timeout=None):
+        """
+        Wait until all the steps were performed or the schedule was stopped.
+        """
+        self._done.wait(timeout)
 
     def is_alive(self):
-        return self._thread.is_alive()
-
-    @logutils.traceback()
-    def run(self):
-        self._vm.log.debug('migration downtime thread started (%i steps)',
-                           self._steps)
+        return self._call is not None
 
-        for downtime in self._downtimes:
-            if self._stop.is_set():
-                break
+    def set_initial_downtime(self):
+        self._set_downtime(self._initial_downtime)
 
-            self._set_downtime(downtime)
+    def stop(self):
+        self._vm.log.debug('stopping migration downtime schedule')
+        with self._lock:
+            self._stopped = True
+            if self._call is not None:
+                self._call.cancel()
+                self._call = None
+        self._done.set()
 
-            self._stop.wait(self._wait)
+    def _step(self):
+        with self._lock:
+            self._call = None
+            if self._stopped:
+                return
+            downtime = next(self._downtimes, None)
 
-        self._vm.log.debug('migration downtime thread exiting')
+        if downtime is None:
+            self._vm.log.debug('migration downtime schedule finished')
+            self._done.set()
+            return
 
-    def set_initial_downtime(self):
-        self._set_downtime(self._initial_downtime)
+        self._set_downtime(downtime)
 
-    def stop(self):
-        self._vm.log.debug('stopping migration downtime thread')
-        self._stop.set()
+        with self._lock:
+            if not self._stopped:
+                self._call = _monitoring.schedule(self._wait, self._step)
 
     def _set_downtime(self, downtime):
         self._vm.log.debug('setting migration downtime to %d', downtime)
@@ -700,8 +720,8 @@ class DowntimeThread(object):
 
 
 # we introduce this empty fake so the monitoring code doesn't have
-# to distinguish between no DowntimeThread and DowntimeThread present.
-class _FakeThreadInterface(object):
+# to distinguish between no DowntimeSchedule and DowntimeSchedule present.
+class _FakeDowntimeSchedule(object):
 
     def start(self):
         pass
@@ -709,7 +729,7 @@ class _FakeThreadInterface(object):
     def stop(self):
         pass
 
-    def join(self):
+    def join(self, timeout=None):
         pass
 
     def is_alive(self):
@@ -719,152 +739,182 @@ class _FakeThreadInterface(object):
         pass
 
 
-class MonitorThread(object):
+class MigrationMonitor(object):
+    """
+    Monitor the progress of an outgoing migration, applying the convergence
+    schedule or the downtime steps.
+
+    The monitor has no thread; it is registered with the shared migration
+    monitoring, polling all the outgoing migrations every
+    migration_monitor_interval seconds.
+    """
+
     _MIGRATION_MONITOR_INTERVAL = config.getint(
         'vars', 'migration_monitor_interval')  # seconds
 
     def __init__(self, vm, startTime, conv_schedule, use_conv_schedule):
-        super(MonitorThread, self).__init__()
-        self._stop = threading.Event()
         self._vm = vm
         self._startTime = startTime
-        self.daemon = True
         self.progress = None
         self._conv_schedule = conv_schedule
         self._use_conv_schedule = use_conv_schedule
-        self.downtime_thread = _FakeThreadInterface()
-        self._thread = concurrent.thread(
-            self.run, name='migmon/' + self._vm.id[:8])
-
-    def start(self):
-        self._thread.start()
-
-    def join(self):
-        self._thread.join()
+        self.downtime_schedule = _FakeDowntimeSchedule()
+        # Serializes polls, so a poll blocked in libvirt is skipped by the
+        # next monitoring passes.
+        self._poll_lock = threading.Lock()
+        self._finished = threading.Event()
+        self._initialized = False
+        self._migrationMaxTime = None
+        self._progress_timeout = None
+        self._lastProgressTime = None
+        self._lowmark = None
+        self._lastDataRemaining = None
+        self._iterationCount = 0
 
     @property
     def enabled(self):
-        return MonitorThread._MIGRATION_MONITOR_INTERVAL > 0
+        return MigrationMonitor._MIGRATION_MONITOR_INTERVAL > 0
 
-    @logutils.traceback()
-    def run(self):
-        if self.enabled:
-            self._vm.log.debug('starting migration monitor thread')
-            try:
-                self.monitor_migration()
-            finally:
-                self.downtime_thread.stop()
-            if self.downtime_thread.is_alive():
-                # on very short migrations, the downtime thread
-                # may not be started at all.
-                self.downtime_thread.join()
-            self._vm.log.debug('stopped migration monitor thread')
-        else:
-            self._vm.log.info('migration monitor thread disabled'
+    def start(self):
+        if not self.enabled:
+            self._vm.log.info('migration monitor disabled'
                               ' (monitoring interval set to 0)')
+            self._finished.set()
+            return
 
-    def monitor_migration(self):
+        self._vm.log.debug('starting migration monitor')
         memSize = self._vm.mem_size_mb()
         maxTimePerGiB = config.getint('vars',
                                       'migration_max_time_per_gib_mem')
-        migrationMaxTime = (maxTimePerGiB * memSize + 1023) / 1024
-        progress_timeout = config.getint('vars', 'migration_progress_timeout')
-        lastProgressTime = time.time()
-        lowmark = None
-        lastDataRemaining = None
-        iterationCount = 0
+        self._migrationMaxTime = (maxTimePerGiB * memSize + 1023) / 1024
+        self._progress_timeout = config.getint('vars',
+                                               'migration_progress_timeout')
+        self._lastProgressTime = time.time()
+        _monitoring.register(self)
+
+    def join(self):
+        self._finished.wait()
+
+    def stop(self):
+        self._vm.log.debug('stopping migration monitor')
+        self._finish()
 
+    def poll(self):
+        """
+        Called from the shared migration monitoring executor. Performs the
+        initial actions on the first call, and samples the migration progress
+        on the next calls.
+        """
+        if not self._poll_lock.acquire(False):
+            self._vm.log.debug('previous migration monitor poll still '
+                               'running, skipping')
+            return
+        try:
+            if self._finished.is_set():
+                return
+            if self._initialized:
+                self._sample()
+            else:
+                self._initialize()
+        except Exception:
+            self._vm.log.exception('migration monitor failed')
+            self._finish()
+        finally:
+            self._poll_lock.release()
+
+    def _finish(self):
+        _monitoring.unregister(self)
+        self.downtime_schedule.stop()
+        if not self._finished.is_set():
+            self._finished.set()
+            self._vm.log.debug('stopped migration monitor')
+
+    def _initialize(self):
+        self._initialized = True
         self._execute_init(self._conv_schedule['init'])
         if not self._use_conv_schedule:
             self._vm.log.debug('setting initial migration downtime')
-            self.downtime_thread.set_initial_downtime()
+            self.downtime_schedule.set_initial_downtime()
 
-        while not self._stop.isSet():
-            stopped = self._stop.wait(self._MIGRATION_MONITOR_INTERVAL)
-            if stopped:
-                break
+    def _sample(self):
+        job_stats = self._vm._dom.jobStats()
+        # It may happen that the migration did not start yet
+        # so we'll keep waiting
+        if not ongoing(job_stats):
+            return
 
-            job_stats = self._vm._dom.jobStats()
-            # It may happen that the migration did not start yet
-            # so we'll keep waiting
-            if not ongoing(job_stats):
-                continue
-
-            progress = Progress.from_job_stats(job_stats)
-            self._vm.send_migration_status_event()
-
-            now = time.time()
-            if self._vm.post_copy != PostCopyPhase.NONE:
-                # Post-copy mode is a final state of a migration -- it either
-                # completes or fails and stops the VM, there is no way to
-                # continue with the migration in either case.  So we won't
-                # handle any further schedule actions once post-copy is
-                # successfully started.  It's still recommended to put the
-                # abort action after the post-copy action in the schedule, for
-                # the case when it's not possible to switch to the post-copy
-                # mode for some reason.
-                if self._vm.post_copy == PostCopyPhase.RUNNING:
-                    # If post-copy is not RUNNING then we are in the interim
-                    # phase (which should be short) between initiating the
-                    # post-copy migration and the actual start of the post-copy
-                    # migration.  Nothing needs to be done in that case.
-                    self._vm.log.debug(
-                        'Post-copy migration still in progress: %d',
-                        progress.data_remaining
-                    )
-            elif not self._use_conv_schedule and\
-                    (0 < migrationMaxTime < now - self._startTime):
-                self._vm.log.warn('The migration took %d seconds which is '
-                                  'exceeding the configured maximum time '
-                                  'for migrations of %d seconds. The '
-                                  'migration will be aborted.',
-                                  now - self._startTime,
-                                  migrationMaxTime)
-                self._vm._dom.abortJob()
-                self.stop()
-                break
-            elif (lowmark is None) or (lowmark > progress.data_remaining):
-                lowmark = progress.data_remaining
-                lastProgressTime = now
-            else:
-                self._vm.log.warn(
-                    'Migration stalling: remaining (%sMiB)'
-                    ' > lowmark (%sMiB).',
-                    progress.data_remaining / Mbytes, lowmark / Mbytes)
-
-            if not self._vm.post_copy and\
-                    lastDataRemaining is not None and\
-                    lastDataRemaining < progress.data_remaining:
-                iterationCount += 1
-                self._vm.log.debug('new iteration detected: %i',
-                                   iterationCount)
-                if self._use_conv_schedule:
-                    self._next_action(iterationCount)
-                elif iterationCount == 1:
-                    # it does not make sense to do any adjustments before
-                    # first iteration.
-                    self.downtime_thread.start()
-
-            lastDataRemaining = progress.data_remaining
-
-            if not self._use_conv_schedule and\
-                    (now - lastProgressTime) > progress_timeout:
-                # Migration is stuck, abort
-                self._vm.log.warn(
-                    'Migration is stuck: Hasn\'t progressed in %s seconds. '
-                    'Aborting.' % (now - lastProgressTime))
-                self._vm._dom.abortJob()
-                self.stop()
-
-            if self._stop.isSet():
-                break
+        progress = Progress.from_job_stats(job_stats)
+        self._vm.send_migration_status_event()
+
+        now = time.time()
+        if self._vm.post_copy != PostCopyPhase.NONE:
+            # Post-copy mode is a final state of a migration -- it either
+            # completes or fails and stops the VM, there is no way to
+            # continue with the migration in either case.  So we won't
+            # handle any further schedule actions once post-copy is
+            # successfully started.  It's still recommended to put the
+            # abort action after the post-copy action in the schedule, for
+            # the case when it's not possible to switch to the post-copy
+            # mode for some reason.
+            if self._vm.post_copy == PostCopyPhase.RUNNING:
+                # If post-copy is not RUNNING then we are in the interim
+                # phase (which should be short) between initiating the
+                # post-copy migration and the actual start of the post-copy
+                # migration.  Nothing needs to be done in that case.
+                self._vm.log.debug(
+                    'Post-copy migration still in progress: %d',
+                    progress.data_remaining
+                )
+        elif not self._use_conv_schedule and\
+                (0 < self._migrationMaxTime < now - self._startTime):
+            self._vm.log.warn('The migration took %d seconds which is '
+                              'exceeding the configured maximum time '
+                              'for migrations of %d seconds. The '
+                              'migration will be aborted.',
+                              now - self._startTime,
+                              self._migrationMaxTime)
+            self._vm._dom.abortJob()
+            self.stop()
+            return
+        elif (self._lowmark is None or
+              self._lowmark > progress.data_remaining):
+            self._lowmark = progress.data_remaining
+            self._lastProgressTime = now
+        else:
+            self._vm.log.warn(
+                'Migration stalling: remaining (%sMiB)'
+                ' > lowmark (%sMiB).',
+                progress.data_remaining / Mbytes, self._lowmark / Mbytes)
+
+        if not self._vm.post_copy and\
+                self._lastDataRemaining is not None and\
+                self._lastDataRemaining < progress.data_remaining:
+            self._iterationCount += 1
+            self._vm.log.debug('new iteration detected: %i',
+                               self._iterationCount)
+            if self._use_conv_schedule:
+                self._next_action(self._iterationCount)
+            elif self._iterationCount == 1:
+                # it does not make sense to do any adjustments before
+                # first iteration.
+                self.downtime_schedule.start()
+
+        self._lastDataRemaining = progress.data_remaining
+
+        if not self._use_conv_schedule and\
+                (now - self._lastProgressTime) > self._progress_timeout:
+            # Migration is stuck, abort
+            self._vm.log.warn(
+                'Migration is stuck: Hasn\'t progressed in %s seconds. '
+                'Aborting.' % (now - self._lastProgressTime))
+            self._vm._dom.abortJob()
+            self.stop()
 
-            self.progress = progress
-            self._vm.log.info('%s', progress)
+        if self._finished.is_set():
+            return
 
-    def stop(self):
-        self._vm.log.debug('stopping migration monitor thread')
-        self._stop.set()
+        self.progress = progress
+        self._vm.log.info('%s', progress)
 
     def _next_action(self, stalling):
         head = self._conv_schedule['stalling'][0]
@@ -900,6 +950,117 @@ class MonitorThread(object):
             self.stop()
 
 
+# Just made up numbers; monitoring dispatches one task per interval, and
+# workers blocked on unresponsive domains are replaced.
+_MONITOR_WORKERS = 2
+_MONITOR_TASKS = 64
+_MONITOR_MAX_WORKERS = 16
+
+
+class _Monitoring(object):
+    """
+    Monitor all the outgoing migrations from a single periodic pass, built on
+    the vdsm scheduler and an executor.
+
+    Every interval, each registered monitor is polled in its own executor
+    task, so a monitor blocked in libvirt does not delay the others. The
+    task times out after half an interval and the executor replaces the
+    blocked worker; the next polls of the blocked monitor are skipped until
+    it returns.
+    """
+
+    _log = logging.getLogger("virt.migration.Monitoring")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._monitors = []
+        self._scheduler = None
+        self._executor = None
+        self._interval = None
+        self._call = None
+
+    def start(self, scheduler, interval):
+        with self._lock:
+            if self._scheduler is not None:
+                raise AssertionError("Migration monitoring already running")
+            self._executor = executor.Executor(
+                name="migmon",
+                workers_count=_MONITOR_WORKERS,
+                max_tasks=_MONITOR_TASKS,
+                scheduler=scheduler,
+                max_workers=_MONITOR_MAX_WORKERS)
+            self._executor.start()
+            self._scheduler = scheduler
+            self._interval = interval
+            if interval > 0:
+                self._call = scheduler.schedule(interval, self._tick)
+
+    def stop(self):
+        with self._lock:
+            if self._scheduler is None:
+                return
+            if self._call is not None:
+                self._call.cancel()
+                self._call = None
+            self._executor.stop(wait=False)
+            self._executor = None
+            self._scheduler = None
+
+    def register(self, monitor):
+        with self._lock:
+            self._monitors.append(monitor)
+        # Perform the initial actions as soon as possible.
+        self.dispatch(monitor.poll)
+
+    def unregister(self, monitor):
+        with self._lock:
+            if monitor in self._monitors:
+                self._monitors.remove(monitor)
+
+    def schedule(self, delay, func):
+        """
+        Run func in the monitoring executor after delay seconds.
+
+        Returns a ScheduledCall, or None if monitoring is not running.
+        """
+        with self._lock:
+            if self._scheduler is None:
+                return None
+            return self._scheduler.schedule(
+                delay, functools.partial(self.dispatch, func))
+
+    def dispatch(self, func):
+        with self._lock:
+            if self._executor is None:
+                return
+            ex = self._executor
+            timeout = self._interval / 2.
+        try:
+            ex.dispatch(func, timeout)
+        except (executor.TooManyTasks, executor.NotRunning):
+            self._log.warning('could not run %s, executor queue full', func)
+
+    def _tick(self):
+        with self._lock:
+            if self._scheduler is None:
+                return
+            self._call = self._scheduler.schedule(self._interval, self._tick)
+            monitors = list(self._monitors)
+        for monitor in monitors:
+            self.dispatch(monitor.poll)
+
+
+_monitoring = _Monitoring()
+
+
+def start_monitoring(scheduler):
+    _monitoring.start(scheduler, MigrationMonitor._MIGRATION_MONITOR_INTERVAL)
+
+
+def stop_monitoring():
+    _monitoring.stop()
+
+
 _Progress = collections.namedtuple('_Progress', [
     'job_type', 'time_elapsed', 'data_total',
     'data_processed', 'data_remaining',
@@ -133,8 +133,12 @@ def start(cif, scheduler):
     for op in _operations:
         op.start()
 
+    migration.start_monitoring(scheduler)
+
 
 def stop():
+    migration.stop_monitoring()
+
     for op in _operations:
         op.stop()
 
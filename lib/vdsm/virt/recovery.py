@@ -28,9 +28,11 @@ import time
 
 import libvirt
 
+from vdsm.common import concurrent
 from vdsm.common import fileutils
 from vdsm.common import response
 from vdsm.common.compat import pickle
+from vdsm.config import config
 from vdsm import constants
 from vdsm import containersconnection
 from vdsm import libvirtconnection
@@ -58,25 +60,39 @@ def _is_ignored_vm(dom_xml):
 
 def _list_domains():
     conn = libvirtconnection.get()
+    # Getting the domain XML is a round trip to libvirt per domain; run them
+    # concurrently to keep recovery time reasonable on hosts with many vms.
+    results = concurrent.tmap(_domain_info, conn.listAllDomains(),
+                              max_workers=_max_workers())
     domains = []
-    for dom_obj in conn.listAllDomains():
-        dom_uuid = 'unknown'
-        try:
-            dom_uuid = dom_obj.UUIDString()
-            logging.debug("Found domain %s", dom_uuid)
-            dom_xml = dom_obj.XMLDesc(0)
-        except libvirt.libvirtError as e:
-            if e.get_error_code() == libvirt.VIR_ERR_NO_DOMAIN:
-                logging.exception("domain %s is dead", dom_uuid)
-            else:
-                raise
-        else:
-            if _is_ignored_vm(dom_xml):
-                continue
-            domains.append((dom_obj, dom_xml, _is_external_vm(dom_xml),))
+    for res in results:
+        if not res.succeeded:
+            raise res.value
+        if res.value is not None:
+            domains.append(res.value)
     return domains
 
 
+def _domain_info(dom_obj):
+    dom_uuid = 'unknown'
+    try:
+        dom_uuid = dom_obj.UUIDString()
+        logging.debug("Found domain %s", dom_uuid)
+        dom_xml = dom_obj.XMLDesc(0)
+    except libvirt.libvirtError as e:
+        if e.get_error_code() == libvirt.VIR_ERR_NO_DOMAIN:
+            logging.exception("domain %s is dead", dom_uuid)
+            return None
+        raise
+    if _is_ignored_vm(dom_xml):
+        return None
+    return dom_obj, dom_xml, _is_external_vm(dom_xml)
+
+
+def _max_workers():
+    return config.getint('vars', 'recovery_workers')
+
+
 def _recover_domain(cif, vm_id, dom_xml, external):
     external_str = " (external)" if external else ""
     cif.log.debug("recovery: trying with VM%s %s", (external_str, vm_id,))
@@ -208,7 +224,11 @@ class File(object):
 def all_domains(cif):
     doms = _list_domains() + containersconnection.recovery()
     num_doms = len(doms)
-    for idx, (dom_obj, dom_xml, external) in enumerate(doms):
+
+    def recover(item):
+        # All the steps for a single domain run in the same worker, so they
+        # keep their order; only different domains are recovered concurrently.
+        idx, (dom_obj, dom_xml, external) = item
         vm_id = dom_obj.UUIDString()
         if _recover_domain(cif, vm_id, dom_xml, external):
             cif.log.info(
@@ -227,6 +247,37 @@ def all_domains(cif):
                     'recovery [1:%d/%d]: failed to kill loose domain %s',
                     idx + 1, num_doms, vm_id)
 
+    for res in concurrent.tmap(recover, enumerate(doms),
+                               max_workers=_max_workers()):
+        if not res.succeeded:
+            raise res.value
+
+
+def prepare_paths(cif, vm_objects):
+    """
+    Prepare the storage of recovered vms, running up to recovery_workers
+    vms concurrently.
+    """
+    num_vm_objects = len(vm_objects)
+
+    def prepare(item):
+        idx, vm_obj = item
+        # Let's recover as much VMs as possible
+        try:
+            # Do not prepare volumes when system goes down
+            if cif._enabled:
+                cif.log.info(
+                    'recovery [%d/%d]: preparing paths for'
+                    ' domain %s', idx + 1, num_vm_objects, vm_obj.id)
+                vm_obj.preparePaths()
+        except:
+            cif.log.exception(
+                "recovery [%d/%d]: failed for vm %s",
+                idx + 1, num_vm_objects, vm_obj.id)
+
+    concurrent.tmap(prepare, enumerate(vm_objects),
+                    max_workers=_max_workers())
+
 
 def lookup_external_vms(cif):
     conn = libvirtconnection.get()
@@ -24,11 +24,11 @@ import six
 Support for VM and host statistics sampling.
 """
 
+from array import array
 from collections import defaultdict, deque, namedtuple
 import errno
 import logging
 import os
-import re
 import threading
 import time
 
@@ -49,6 +49,7 @@ _THP_STATE_PATH = '/sys/kernel/mm/transparent_hugepage/enabled'
 if not os.path.exists(_THP_STATE_PATH):
     _THP_STATE_PATH = '/sys/kernel/mm/redhat_transparent_hugepage/enabled'
 _METRICS_ENABLED = config.getboolean('metrics', 'enabled')
+_PROC_STAT_PATH = '/proc/stat'
 
 
 class InterfaceSample(object):
@@ -112,10 +113,11 @@ class TotalCpuSample(object):
 
     The sample is taken at initialization time and can't be updated.
     """
-    def __init__(self):
-        with open('/proc/stat') as f:
-            self.user, userNice, self.sys, self.idle = \
-                map(int, f.readline().split()[1:5])
+    def __init__(self, cpu_lines=None):
+        if cpu_lines is None:
+            cpu_lines = _read_cpu_lines()
+        self.user, userNice, self.sys, self.idle = \
+            map(int, cpu_lines[0].split()[1:5])
         self.user += userNice
 
 
@@ -123,28 +125,53 @@ class CpuCoreSample(object):
     """
     A sample of the CPU consumption of each core
 
+    The jiffies of the cores are kept in flat arrays ordered like cpus, so
+    the usage of all the cores can be computed in bulk.
+
     The sample is taken at initialization time and can't be updated.
     """
-    CPU_CORE_STATS_PATTERN = re.compile(r'cpu(\d+)\s+(.*)')
 
-    def __init__(self):
-        self.coresSample = {}
-        with open('/proc/stat') as src:
-            for line in src:
-                match = self.CPU_CORE_STATS_PATTERN.match(line)
-                if match:
-                    coreSample = {}
-                    user, userNice, sys, idle = \
-                        map(int, match.group(2).split()[0:4])
-                    coreSample['user'] = user
-                    coreSample['userNice'] = userNice
-                    coreSample['sys'] = sys
-                    coreSample['idle'] = idle
-                    self.coresSample[match.group(1)] = coreSample
+    def __init__(self, cpu_lines=None):
+        if cpu_lines is None:
+            cpu_lines = _read_cpu_lines()
+        self.cpus = array('i')
+        self.user = array('d')
+        self.userNice = array('d')
+        self.sys = array('d')
+        self.idle = array('d')
+        # The first line is the total of all the cores.
+        for line in cpu_lines[1:]:
+            cpu, user, userNice, sys, idle = line.split(None, 5)[:5]
+            self.cpus.append(int(cpu[3:]))
+            self.user.append(int(user))
+            self.userNice.append(int(userNice))
+            self.sys.append(int(sys))
+            self.idle.append(int(idle))
 
     def getCoreSample(self, coreId):
-        strCoreId = str(coreId)
-        return self.coresSample.get(strCoreId)
+        try:
+            i = self.cpus.index(int(coreId))
+        except ValueError:
+            return None
+        return {'user': int(self.user[i]),
+                'userNice': int(self.userNice[i]),
+                'sys': int(self.sys[i]),
+                'idle': int(self.idle[i])}
+
+
+def _read_cpu_lines():
+    """
+    Return the cpu lines of /proc/stat, the total of all the cores first.
+    The cpu lines precede the other statistics, so the rest of the file is
+    not read.
+    """
+    lines = []
+    with open(_PROC_STAT_PATH) as src:
+        for line in src:
+            if not line.startswith('cpu'):
+                break
+            lines.append(line)
+    return lines
 
 
 class NumaNodeMemorySample(object):
@@ -231,7 +258,8 @@ class HostSample(TimedSample):
         self.interfaces = _get_interfaces_and_samples()
         self.pidcpu = PidCpuSample(pid)
         self.ncpus = os.sysconf('SC_NPROCESSORS_ONLN')
-        self.totcpu = TotalCpuSample()
+        cpu_lines = _read_cpu_lines()
+        self.totcpu = TotalCpuSample(cpu_lines)
         meminfo = utils.readMemInfo()
         freeOrCached = (meminfo['MemFree'] +
                         meminfo['Cached'] + meminfo['Buffers'])
@@ -250,7 +278,7 @@ class HostSample(TimedSample):
         except:
             self.thpState = 'never'
         self.hugepages = hugepages.state()
-        self.cpuCores = CpuCoreSample()
+        self.cpuCores = CpuCoreSample(cpu_lines)
         self.numaNodeMem = NumaNodeMemorySample()
 
 
@@ -352,6 +352,9 @@ class Vm(object):
                 params.get('memGuaranteedSize', '0')
             )
             self._launch_paused = self.conf.get('launchPaused', False)
+        self._md_writer = metadata.Writer(
+            self._md_desc, config.getfloat('vars', 'metadata_sync_interval'),
+            name="md-writer/" + self.id[:8])
         self._destroy_requested = threading.Event()
         self._monitorResponse = 0
         self._post_copy = migration.PostCopyPhase.NONE
@@ -778,6 +781,7 @@ class Vm(object):
         return mem_stats
 
     def hibernate(self, dst):
+        self.flush_metadata()
         hooks.before_vm_hibernate(self._dom.XMLDesc(0), self._custom)
         fname = self.cif.prepareVolumePath(dst)
         try:
@@ -786,6 +790,7 @@ class Vm(object):
             self.cif.teardownVolumePath(dst)
 
     def prepare_migration(self):
+        self.flush_metadata()
         for dev in self._customDevices():
             hooks.before_device_migrate_source(
                 dev._deviceXML, self._custom, dev.custom)
@@ -4001,6 +4006,7 @@ class Vm(object):
         def _vmConfForMemorySnapshot():
             """Returns the needed vm configuration with the memory snapshot"""
 
+            self.flush_metadata()
             return {'restoreFromSnapshot': True,
                     '_srcDomXML': self._dom.XMLDesc(
                         libvirt.VIR_DOMAIN_XML_MIGRATABLE),
@@ -4361,6 +4367,7 @@ class Vm(object):
             conf['diskReplicate'] = replica
             self._add_legacy_disk_conf_to_metadata(conf)
         self._sync_metadata()
+        self.flush_metadata()
 
         drive.diskReplicate = replica
 
@@ -4377,6 +4384,7 @@ class Vm(object):
             conf['diskReplicate'] = drive.diskReplicate
             self._add_legacy_disk_conf_to_metadata(conf)
         self._sync_metadata()
+        self.flush_metadata()
 
     def _delDiskReplica(self, drive):
         """
@@ -4390,6 +4398,7 @@ class Vm(object):
             del conf['diskReplicate']
             self._add_legacy_disk_conf_to_metadata(conf)
         self._sync_metadata()
+        self.flush_metadata()
 
     def _diskSizeExtendCow(self, drive, newSizeBytes):
         try:
@@ -4717,7 +4726,16 @@ class Vm(object):
     def _sync_metadata(self):
         if self._external:
             return
-        self._md_desc.dump(self._dom)
+        self._md_writer.write(self._dom)
+
+    def flush_metadata(self):
+        """
+        Write pending metadata changes to libvirt. Must be called before
+        operations using the metadata stored in libvirt.
+        """
+        if self._external:
+            return
+        self._md_writer.flush()
 
     def releaseVm(self, gracefulAttempts=1):
         """
@@ -4756,6 +4774,7 @@ class Vm(object):
                 result = self._destroyVm(gracefulAttempts)
                 if response.is_error(result):
                     return result
+            self._md_writer.cancel()
 
             # Wait for any Live Merge cleanup threads.  This will only block in
             # the extremely rare case where a VM is being powered off at the
@@ -5208,6 +5227,8 @@ class Vm(object):
             vm['block_jobs'] = json.dumps(self.conf['_blockJobs'])
         # _sync_metadata is included in the following call
         self._save_legacy_disk_conf_to_metadata()
+        # The job must be recovered if vdsm is restarted.
+        self.flush_metadata()
         self._updateDomainDescriptor()
 
     def _activeLayerCommitReady(self, jobInfo, drive):
@@ -312,6 +312,7 @@ class _JsonRpcServeRequestContext(object):
             return
 
         encodedObjects = []
+        requestIds = []
         for response in self._responses:
             try:
                 encodedObjects.append(response.encode())
@@ -319,13 +320,16 @@ class _JsonRpcServeRequestContext(object):
                 response = JsonRpcResponse(None, JsonRpcInternalError(),
                                            response.id)
                 encodedObjects.append(response.encode())
+            requestIds.append(response.id)
 
         if len(encodedObjects) == 1:
             data = encodedObjects[0]
         else:
             data = '[' + ','.join(encodedObjects) + ']'
 
-        self._client.send(data.encode('utf-8'))
+        # Pass the request ids with the encoded data, so the client can
+        # route the reply without parsing it again.
+        self._client.send_reply(data.encode('utf-8'), requestIds)
 
     def addResponse(self, response):
         self._responses.append(response)
@@ -19,16 +19,25 @@
 from __future__ import absolute_import
 import asyncore
 import errno
+import heapq
 import logging
+import select
 import socket
+import ssl
+import threading
 
 from vdsm import sslutils
 from vdsm.common.eventfd import EventFD
+from vdsm.common.osutils import uninterruptible_poll
+from vdsm.common.time import monotonic_time
 
 
 _BLOCKING_IO_ERRORS = (errno.EAGAIN, errno.EALREADY, errno.EINPROGRESS,
                        errno.EWOULDBLOCK)
 
+# Keep well below IOV_MAX.
+_MAX_SEND_BUFFERS = 64
+
 
 class Dispatcher(asyncore.dispatcher):
 
@@ -139,6 +148,29 @@ class Dispatcher(asyncore.dispatcher):
             self.handle_close()
             return 0
 
+    def send_buffers(self, buffers):
+        """
+        Send buffers with one sendmsg() call if the socket supports it.
+        Otherwise, send only the first buffer. Returns the number of bytes
+        sent.
+        """
+        sendmsg = getattr(self.socket, "sendmsg", None)
+        # SSL sockets do not support sendmsg.
+        if sendmsg is None or isinstance(
+                self.socket, (ssl.SSLSocket, sslutils.SSLSocket)):
+            return self.send(buffers[0])
+
+        try:
+            return sendmsg(buffers[:_MAX_SEND_BUFFERS])
+        except socket.error as why:
+            if why.args[0] in _BLOCKING_IO_ERRORS:
+                return 0
+            elif why.args[0] in asyncore._DISCONNECTED:
+                self.handle_close()
+                return 0
+            else:
+                raise
+
     def del_channel(self, map=None):
         asyncore.dispatcher.del_channel(self, map)
         self.__impl = None
@@ -195,17 +227,56 @@ class AsyncoreEvent(asyncore.file_dispatcher):
         asyncore.file_dispatcher.close(self)
 
 
+class _DispatcherMap(dict):
+    """
+    asyncore channel map reporting added and removed channels, so the
+    reactor can keep its epoll registration up to date.
+    """
+
+    def __init__(self, changed, removed):
+        super(_DispatcherMap, self).__init__()
+        self._changed = changed
+        self._removed = removed
+
+    def __setitem__(self, fd, obj):
+        dict.__setitem__(self, fd, obj)
+        self._changed(fd)
+
+    def __delitem__(self, fd):
+        dict.__delitem__(self, fd)
+        self._removed(fd)
+
+
 class Reactor(object):
     """
     map dictionary maps sock.fileno() to channels to watch. We add channels to
     it by running add_dispatcher and removing by remove_dispatcher.
-    It is used by asyncore loop to know which channels events to track.
 
-    We use eventfd as mechanism to trigger processing when needed.
+    Channels are registered in an epoll object for their lifetime. Instead of
+    asking every channel if it is readable or writable on each iteration,
+    the reactor checks only channels that had events, channels that were
+    added, and channels whose check deadline expired. The deadlines, based on
+    the channels' next_check_interval, are kept in a heap.
+
+    We use eventfd as mechanism to trigger processing when needed. Since we
+    don't know which channel has new data to write, a wakeup checks all the
+    channels.
     """
 
-    def __init__(self):
-        self._map = {}
+    # Maximum time to wait before checking a channel again.
+    _MAX_INTERVAL = 30.0
+
+    def __init__(self, clock=monotonic_time):
+        self._clock = clock
+        self._epoll = select.epoll()
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._removed_fds = set()
+        self._check_all = False
+        self._registered = {}
+        self._deadlines = {}
+        self._timers = []
+        self._map = _DispatcherMap(self._changed, self._removed)
         self._is_running = False
         self._wakeupEvent = AsyncoreEvent(self._map)
 
@@ -214,29 +285,161 @@ class Reactor(object):
 
     def process_requests(self):
         self._is_running = True
-        while self._is_running:
-            asyncore.loop(
-                timeout=self._get_timeout(self._map),
-                use_poll=True,
-                map=self._map,
-                count=1,
-            )
-
-        for dispatcher in self._map.values():
-            dispatcher.close()
+        try:
+            while self._is_running:
+                self._process_once()
+
+            for dispatcher in list(self._map.values()):
+                dispatcher.close()
+
+            self._map.clear()
+        finally:
+            self._epoll.close()
+
+    def _process_once(self):
+        self._check_dispatchers()
+
+        events = uninterruptible_poll(self._epoll.poll, self._timeout())
+
+        for fd, flags in events:
+            obj = self._map.get(fd)
+            if obj is None:
+                continue
+            asyncore.readwrite(obj, flags)
+            with self._lock:
+                self._dirty.add(fd)
+
+        self._expire_timers()
+
+    def _changed(self, fd):
+        with self._lock:
+            self._dirty.add(fd)
+
+    def _removed(self, fd):
+        with self._lock:
+            self._dirty.add(fd)
+            self._removed_fds.add(fd)
+
+    def _check_dispatchers(self):
+        with self._lock:
+            if self._check_all:
+                self._check_all = False
+                self._dirty.update(self._map)
+            fds = self._dirty
+            self._dirty = set()
+            removed = self._removed_fds
+            self._removed_fds = set()
+
+        # The file descriptor of a removed channel may already be used by a
+        # new channel, so the registration state of the removed channel must
+        # be dropped before checking the new one.
+        for fd in removed:
+            self._forget(fd)
+
+        now = self._clock()
+        for fd in fds:
+            self._check(fd, now)
+
+    def _check(self, fd, now):
+        obj = self._map.get(fd)
+        if obj is not None:
+            flags = 0
+            if obj.readable():
+                flags |= select.EPOLLIN | select.EPOLLPRI
+            # accepting sockets should not be writable
+            if obj.writable() and not obj.accepting:
+                flags |= select.EPOLLOUT
+            # readable() and writable() may close the channel.
+            if self._map.get(fd) is obj:
+                self._register(fd, flags)
+                self._schedule(fd, now + self._interval(obj))
+                return
+
+        self._register(fd, 0)
+        self._deadlines.pop(fd, None)
+
+    def _interval(self, obj):
+        interval = None
+        if hasattr(obj, "next_check_interval"):
+            interval = obj.next_check_interval()
+        if interval is None or interval < 0:
+            return self._MAX_INTERVAL
+        return min(interval, self._MAX_INTERVAL)
+
+    def _register(self, fd, flags):
+        """
+        Update the epoll registration if flags changed. Channels with no
+        flags are not registered, as asyncore poll does not watch them.
+        """
+        if self._registered.get(fd, 0) == flags:
+            return
 
-        self._map.clear()
+        try:
+            if flags == 0:
+                self._epoll.unregister(fd)
+            elif fd in self._registered:
+                self._epoll.modify(fd, flags)
+            else:
+                self._epoll.register(fd, flags)
+        except EnvironmentError as e:
+            # The kernel removes closed file descriptors from the epoll set,
+            # and the same file descriptor may be reused by a new channel.
+            if e.errno == errno.ENOENT and flags != 0:
+                self._epoll.register(fd, flags)
+            elif e.errno == errno.EEXIST:
+                self._epoll.modify(fd, flags)
+            elif e.errno not in (errno.ENOENT, errno.EBADF):
+                raise
 
-    def _get_timeout(self, map):
-        timeout = 30.0
-        for disp in self._map.values():
-            if hasattr(disp, "next_check_interval"):
-                interval = disp.next_check_interval()
-                if interval is not None and interval >= 0:
-                    timeout = min(interval, timeout)
-        return timeout
+        if flags == 0:
+            self._registered.pop(fd, None)
+        else:
+            self._registered[fd] = flags
+
+    def _forget(self, fd):
+        if self._registered.pop(fd, None) is not None:
+            try:
+                self._epoll.unregister(fd)
+            except EnvironmentError as e:
+                # Usually the kernel already removed the closed file
+                # descriptor from the epoll set.
+                if e.errno not in (errno.ENOENT, errno.EBADF):
+                    raise
+        self._deadlines.pop(fd, None)
+
+    def _schedule(self, fd, deadline):
+        # An earlier deadline is kept; checking the channel early computes a
+        # new deadline. This keeps the heap small when channels are checked
+        # often.
+        current = self._deadlines.get(fd)
+        if current is not None and current <= deadline:
+            return
+        self._deadlines[fd] = deadline
+        heapq.heappush(self._timers, (deadline, fd))
+
+    def _expire_timers(self):
+        now = self._clock()
+        while self._timers and self._timers[0][0] <= now:
+            deadline, fd = heapq.heappop(self._timers)
+            if self._deadlines.get(fd) == deadline:
+                del self._deadlines[fd]
+                with self._lock:
+                    self._dirty.add(fd)
+
+    def _timeout(self):
+        with self._lock:
+            if self._dirty or self._check_all:
+                return 0
+        # Drop timers replaced by earlier deadlines.
+        while self._timers:
+            deadline, fd = self._timers[0]
+            if self._deadlines.get(fd) == deadline:
+                return max(deadline - self._clock(), 0)
+            heapq.heappop(self._timers)
+        return self._MAX_INTERVAL
 
     def wakeup(self):
+        self._check_all = True
         self._wakeupEvent.set()
 
     def stop(self):
@@ -100,6 +100,9 @@ class _HeartBeatFrame(object):
     def encode(self):
         return "\n"
 
+    def encode_buffers(self):
+        return ["\n"]
+
 # There is no reason to have multiple instances
 _heartBeatFrame = _HeartBeatFrame()
 
@@ -119,6 +122,14 @@ class Frame(object):
         self.body = body
 
     def encode(self):
+        return ''.join(self.encode_buffers())
+
+    def encode_buffers(self):
+        """
+        Return the frame as a list of strings: the command and headers, the
+        body, and the terminating null. The body is not copied, so large
+        frames can be sent without joining the buffers.
+        """
         body = self.body
         # We do it here so we are sure header is up to date
         if body is not None:
@@ -132,11 +143,11 @@ class Frame(object):
             data.append("\n")
 
         data.append('\n')
-        if body is not None:
-            data.append(body)
+        if body is None:
+            data.append("\0")
+            return [''.join(data)]
 
-        data.append("\0")
-        return ''.join(data)
+        return [''.join(data), body, "\0"]
 
     def __repr__(self):
         return "<StompFrame command=%s>" % (repr(self.command))
@@ -339,14 +350,28 @@ class AsyncDispatcher(object):
     There are two implementations available:
     - StompAdapterImpl - responsible for server side
     - AsyncClient - responsible for client side
+
+    Outgoing frames are taken from the frame handler in batches. Small
+    buffers (headers, heartbeats, small bodies) are joined so several frames
+    are sent with one call, while large bodies are sent from the frame
+    itself, advancing a memoryview after partial sends instead of copying the
+    rest of the data.
     """
+
+    # Buffers smaller than this are joined with their neighbours.
+    _COPY_THRESHOLD = 4096
+
+    # Stop taking frames from the frame handler when this many bytes are
+    # waiting to be sent.
+    _WRITE_BATCH = 65536
+
     def __init__(self, connection, frame_handler, bufferSize=4096,
                  clock=time.monotonic_time):
         self._frame_handler = frame_handler
         self.connection = connection
         self._bufferSize = bufferSize
         self._parser = Parser()
-        self._outbuf = None
+        self._outbufs = deque()
         self._incoming_heartbeat_in_milis = 0
         self._outgoing_heartbeat_in_milis = 0
         self._clock = clock
@@ -360,7 +385,7 @@ class AsyncDispatcher(object):
         self._outgoing_heartbeat_in_milis = outgoing
 
     def handle_connect(self, dispatcher):
-        self._outbuf = None
+        self._outbufs.clear()
         self._frame_handler.handle_connect(self)
 
     def handle_read(self, dispatcher):
@@ -420,32 +445,65 @@ class AsyncDispatcher(object):
 
     def handle_write(self, dispatcher):
         while True:
-            if self._outbuf is None:
-                try:
-                    frame = self._frame_handler.peek_message()
-                except IndexError:
+            if not self._outbufs:
+                self._take_frames()
+                if not self._outbufs:
                     return
 
-                self._outbuf = frame.encode()
-
-            data = self._outbuf
-            numSent = dispatcher.send(data)
+            numSent = self._send(dispatcher)
             if numSent == 0:
                 return
 
             self._update_outgoing_heartbeat()
-            if numSent < len(data):
-                self._outbuf = data[numSent:]
+            self._consume(numSent)
+            if self._outbufs:
+                # Partial send, the socket buffer is full.
                 return
 
-            self._outbuf = None
+    def _take_frames(self):
+        small = []
+        size = 0
+        while size < self._WRITE_BATCH:
+            try:
+                frame = self._frame_handler.peek_message()
+            except IndexError:
+                break
+
             self._frame_handler.pop_message()
+            for buf in frame.encode_buffers():
+                if len(buf) < self._COPY_THRESHOLD:
+                    small.append(buf)
+                else:
+                    if small:
+                        self._outbufs.append(memoryview(''.join(small)))
+                        small = []
+                    self._outbufs.append(memoryview(buf))
+                size += len(buf)
+
+        if small:
+            self._outbufs.append(memoryview(''.join(small)))
+
+    def _send(self, dispatcher):
+        if len(self._outbufs) > 1:
+            send_buffers = getattr(dispatcher, "send_buffers", None)
+            if send_buffers is not None:
+                return send_buffers(list(self._outbufs))
+        return dispatcher.send(self._outbufs[0])
+
+    def _consume(self, numSent):
+        while numSent:
+            buf = self._outbufs[0]
+            if numSent < len(buf):
+                self._outbufs[0] = buf[numSent:]
+                return
+            numSent -= len(buf)
+            self._outbufs.popleft()
 
     def writable(self, dispatcher):
         if self._frame_handler.has_outgoing_messages:
             return True
 
-        if self._outbuf is not None:
+        if self._outbufs:
             return True
 
         if (self.next_check_interval() == 0):
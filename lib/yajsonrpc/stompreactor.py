@@ -17,7 +17,6 @@ from __future__ import absolute_import
 import logging
 from collections import deque
 from uuid import uuid4
-import functools
 
 from vdsm import utils
 from vdsm.config import config
@@ -259,9 +258,8 @@ class StompAdapterImpl(object):
         to build response map for each message.
         """
         if isinstance(request, list):
-            map(functools.partial(self._handle_destination, dispatcher,
-                                  req_dest),
-                request)
+            for r in request:
+                self._handle_destination(dispatcher, req_dest, r)
             return
 
         self._req_dest[request.get("id")] = req_dest
@@ -352,20 +350,6 @@ class StompServer(object):
     Sends message to all subscribes that subscribed to destination.
     """
     def send(self, message, destination=stomp.SUBSCRIPTION_ID_RESPONSE):
-        resp = json.loads(message)
-        if not isinstance(resp, dict):
-            raise ValueError(
-                'Provided message %s failed parsing to dictionary' % message)
-        # pylint: disable=no-member
-        response_id = resp.get("id")
-
-        try:
-            destination = self._req_dest[response_id]
-            del self._req_dest[response_id]
-        except KeyError:
-            # we could have no reply-to or we could send events (no message id)
-            pass
-
         try:
             connections = self._sub_map[destination]
         except KeyError:
@@ -387,6 +371,24 @@ class StompServer(object):
             if not connection.client.is_closed():
                 connection.client.send_raw(res)
 
+    def send_reply(self, message, request_ids):
+        """
+        Sends encoded response to the destination of the requests with
+        request_ids, or to the default response destination.
+
+        The destination of each request was recorded when the request was
+        received, so we do not need to parse the response again.
+        """
+        destination = stomp.SUBSCRIPTION_ID_RESPONSE
+        for request_id in request_ids:
+            try:
+                destination = self._req_dest.pop(request_id)
+            except KeyError:
+                # we could have no reply-to
+                pass
+
+        self.send(message, destination)
+
 
 class StompClient(object):
     log = logging.getLogger("jsonrpc.AsyncoreClient")
@@ -569,6 +571,9 @@ class ServerRpcContextAdapter(object):
                 }
             )
 
+    def send_reply(self, data, request_ids):
+        self.send(data)
+
 
 class ClientRpcTransportAdapter(object):
     def __init__(self, request_queue, response_queue, client):
@@ -18,13 +18,21 @@
 #
 # Refer to the README and COPYING files for full details of the license
 #
+from __future__ import print_function
+
+import asyncore
 import socket
+import threading
+import time
 from contextlib import closing
+from contextlib import contextmanager
 
 from vdsm.common import concurrent
 from yajsonrpc.betterAsyncore import AsyncoreEvent, Reactor
 
 from testlib import VdsmTestCase as TestCaseBase
+from testlib import expandPermutations, permutations
+from testValidation import stresstest
 
 
 class TestEvent(TestCaseBase):
@@ -68,3 +76,220 @@ class TestReactor(TestCaseBase):
 
         self.assertTrue(disp.closing)
         self.assertFalse(reactor._wakeupEvent.closing)
+
+
+class CountingImpl(object):
+
+    def __init__(self, interval=None):
+        self.interval = interval
+        self.want_write = False
+        self.checks = 0
+        self.reads = 0
+        self.writes = 0
+        self.read_event = threading.Event()
+        self.write_event = threading.Event()
+
+    def readable(self, dispatcher):
+        self.checks += 1
+        return True
+
+    def writable(self, dispatcher):
+        return self.want_write
+
+    def next_check_interval(self):
+        return self.interval
+
+    def handle_read(self, dispatcher):
+        dispatcher.recv(4096)
+        self.reads += 1
+        self.read_event.set()
+
+    def handle_write(self, dispatcher):
+        dispatcher.send(b"x")
+        self.writes += 1
+        self.want_write = False
+        self.write_event.set()
+
+
+@contextmanager
+def running_reactor():
+    reactor = Reactor()
+    thread = concurrent.thread(reactor.process_requests,
+                               name='test reactor')
+    thread.start()
+    try:
+        yield reactor
+    finally:
+        reactor.stop()
+        thread.join()
+
+
+@contextmanager
+def connections(reactor, count, impl_factory=CountingImpl):
+    pairs = [socket.socketpair() for _ in range(count)]
+    try:
+        impls = []
+        for s1, _ in pairs:
+            impl = impl_factory()
+            reactor.create_dispatcher(s1, impl=impl)
+            impls.append(impl)
+        reactor.wakeup()
+        yield [s2 for _, s2 in pairs], impls
+    finally:
+        for _, s2 in pairs:
+            s2.close()
+
+
+class TestEpollReactor(TestCaseBase):
+
+    def test_read(self):
+        with running_reactor() as reactor:
+            with connections(reactor, 1) as (peers, impls):
+                peers[0].send(b"x")
+                self.assertTrue(impls[0].read_event.wait(1))
+
+    def test_write_after_wakeup(self):
+        with running_reactor() as reactor:
+            with connections(reactor, 1) as (peers, impls):
+                impls[0].want_write = True
+                reactor.wakeup()
+                self.assertTrue(impls[0].write_event.wait(1))
+                self.assertEqual(peers[0].recv(1), b"x")
+
+    def test_idle_channels_not_checked(self):
+        with running_reactor() as reactor:
+            with connections(reactor, 10) as (peers, impls):
+                # Wait until all channels were checked once.
+                time.sleep(0.1)
+                idle_checks = [impl.checks for impl in impls[1:]]
+                for _ in range(10):
+                    impls[0].read_event.clear()
+                    peers[0].send(b"x")
+                    self.assertTrue(impls[0].read_event.wait(1))
+                self.assertEqual([impl.checks for impl in impls[1:]],
+                                 idle_checks)
+
+    def test_next_check_interval(self):
+        with running_reactor() as reactor:
+            with connections(
+                    reactor, 1,
+                    impl_factory=lambda: CountingImpl(0.1)) as (_, impls):
+                time.sleep(0.5)
+                checks = impls[0].checks
+        self.assertGreaterEqual(checks, 3)
+        self.assertLessEqual(checks, 10)
+
+    def test_closed_channel(self):
+        with running_reactor() as reactor:
+            with connections(reactor, 1) as (peers, impls):
+                peers[0].close()
+                time.sleep(0.1)
+                self.assertEqual(len(reactor._map), 1)  # wakeup event
+
+    def test_reused_fd(self):
+        with running_reactor() as reactor:
+            s1, s2 = socket.socketpair()
+            disp = reactor.create_dispatcher(s1, impl=CountingImpl())
+            reactor.wakeup()
+            time.sleep(0.1)
+            fd = s1.fileno()
+            disp.close()
+            s2.close()
+
+            # The new channel gets the file descriptor of the closed one
+            # before the reactor checks the closed channel.
+            s1, s2 = socket.socketpair()
+            with closing(s1), closing(s2):
+                self.assertEqual(s1.fileno(), fd)
+                impl = CountingImpl()
+                reactor.create_dispatcher(s1, impl=impl)
+                reactor.wakeup()
+                s2.send(b"x")
+                self.assertTrue(impl.read_event.wait(1))
+
+
+class PingPongImpl(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.count = 0
+        self.pending = False
+
+    def readable(self, dispatcher):
+        return True
+
+    def writable(self, dispatcher):
+        return self.pending
+
+    def next_check_interval(self):
+        # Like stomp dispatchers, sending heartbeats every few seconds.
+        return 5.0
+
+    def handle_read(self, dispatcher):
+        if dispatcher.recv(1):
+            self.count -= 1
+            if self.count > 0:
+                self.pending = True
+            else:
+                self.done.set()
+
+    def handle_write(self, dispatcher):
+        dispatcher.send(b"x")
+        self.pending = False
+
+
+class _AsyncoreLoopReactor(Reactor):
+    """
+    The previous reactor loop, for comparison.
+    """
+
+    def _process_once(self):
+        timeout = 30.0
+        for disp in self._map.values():
+            if hasattr(disp, "next_check_interval"):
+                interval = disp.next_check_interval()
+                if interval is not None and interval >= 0:
+                    timeout = min(interval, timeout)
+        asyncore.loop(timeout=timeout, use_poll=True, map=self._map,
+                      count=1)
+
+
+def _echo(sock, count):
+    for _ in range(count):
+        sock.recv(1)
+        sock.send(b"x")
+
+
+@expandPermutations
+class TestReactorBenchmark(TestCaseBase):
+
+    @stresstest
+    @permutations([[10], [100], [1000]])
+    def test_connection_scaling(self, idle):
+        count = 2000
+        for reactor_class in (_AsyncoreLoopReactor, Reactor):
+            reactor = reactor_class()
+            thread = concurrent.thread(reactor.process_requests)
+            thread.start()
+            try:
+                with connections(reactor, idle):
+                    s1, s2 = socket.socketpair()
+                    with closing(s2):
+                        impl = PingPongImpl()
+                        impl.count = count
+                        impl.pending = True
+                        reactor.create_dispatcher(s1, impl=impl)
+                        echo = concurrent.thread(_echo, args=(s2, count))
+                        echo.start()
+                        start = time.time()
+                        reactor.wakeup()
+                        impl.done.wait()
+                        elapsed = time.time() - start
+                        echo.join()
+            finally:
+                reactor.stop()
+                thread.join()
+
+            print("\nreactor=%s idle=%d round trips=%d elapsed=%.3fs "
+                  "(%.0f/s)" % (reactor_class.__name__, idle, count,
+                                elapsed, count / elapsed))
@@ -22,16 +22,22 @@
 import os
 import platform
 import tempfile
+import threading
+import time
 import xml.etree.ElementTree as ET
 from testlib import VdsmTestCase as TestCaseBase
+from testlib import namedTemporaryDir
 from monkeypatch import MonkeyPatch
+from monkeypatch import MonkeyPatchScope
 
 from vdsm.host import caps
 from vdsm import commands
+from vdsm import containersconnection
 from vdsm import cpuarch
 from vdsm import numa
 from vdsm import machinetype
 from vdsm import osinfo
+from vdsm import utils
 from vdsm.common import cache
 
 
@@ -349,3 +355,192 @@ class TestCaps(TestCaseBase):
         self.assertEqual(t.sockets, 1)
         self.assertEqual(t.online_cpus,
                          ['0', '1', '2', '3', '4', '5', '6', '7'])
+
+
+class FakeSection(caps.Section):
+
+    def __init__(self, name, source, delay=0):
+        super(FakeSection, self).__init__(name, source, self._collect)
+        self.delay = delay
+        self.calls = 0
+        self.started = threading.Event()
+        self.resume = None
+
+    def _collect(self):
+        self.calls += 1
+        self.started.set()
+        if self.resume is not None:
+            self.resume.wait()
+        time.sleep(self.delay)
+        return {self.name: {'calls': self.calls}}
+
+
+class FailingSection(caps.Section):
+
+    def __init__(self, name, source):
+        super(FailingSection, self).__init__(name, source, self._collect)
+
+    def _collect(self):
+        raise RuntimeError("collection failed")
+
+
+class TestSectionsCache(TestCaseBase):
+
+    def test_collect_all(self):
+        sections = [FakeSection(s, s) for s in caps.SOURCES + (caps.ALWAYS,)]
+        cache = caps._SectionsCache(sections, {})
+        c = cache.get()
+        self.assertEqual(sorted(c), sorted(s.name for s in sections))
+
+    def test_cached(self):
+        section = FakeSection('boot', caps.BOOT)
+        cache = caps._SectionsCache([section], {})
+        cache.get()
+        self.assertEqual(cache.get(), {'boot': {'calls': 1}})
+        self.assertEqual(section.calls, 1)
+
+    def test_always(self):
+        section = FakeSection('host', caps.ALWAYS)
+        cache = caps._SectionsCache([section], {})
+        cache.get()
+        self.assertEqual(cache.get(), {'host': {'calls': 2}})
+
+    def test_disabled(self):
+        section = FakeSection('boot', caps.BOOT)
+        cache = caps._SectionsCache([section], {}, enabled=False)
+        cache.get()
+        cache.get()
+        self.assertEqual(section.calls, 2)
+
+    def test_invalidate_source(self):
+        network = FakeSection('network', caps.NETWORK)
+        boot = FakeSection('boot', caps.BOOT)
+        cache = caps._SectionsCache([network, boot], {})
+        cache.get()
+        cache.invalidate(caps.NETWORK)
+        cache.get()
+        self.assertEqual(network.calls, 2)
+        self.assertEqual(boot.calls, 1)
+
+    def test_invalidate_all(self):
+        sections = [FakeSection(s, s) for s in caps.SOURCES]
+        cache = caps._SectionsCache(sections, {})
+        cache.get()
+        cache.invalidate()
+        cache.get()
+        self.assertTrue(all(s.calls == 2 for s in sections))
+
+    def test_stamp_changed(self):
+        stamp = [1]
+        section = FakeSection('packages', caps.PACKAGES)
+        cache = caps._SectionsCache(
+            [section], {caps.PACKAGES: lambda: stamp[0]})
+        cache.get()
+        cache.get()
+        self.assertEqual(section.calls, 1)
+        stamp[0] = 2
+        cache.get()
+        self.assertEqual(section.calls, 2)
+
+    def test_no_stamp(self):
+        section = FakeSection('network', caps.NETWORK)
+        cache = caps._SectionsCache([section], {caps.NETWORK: lambda: None})
+        cache.get()
+        cache.get()
+        self.assertEqual(section.calls, 2)
+
+    def test_invalidate_during_collection(self):
+        section = FakeSection('network', caps.NETWORK)
+        section.resume = threading.Event()
+        cache = caps._SectionsCache([section], {})
+        t = threading.Thread(target=cache.get)
+        t.daemon = True
+        t.start()
+        section.started.wait(1)
+        cache.invalidate(caps.NETWORK)
+        section.resume.set()
+        t.join()
+        cache.get()
+        self.assertEqual(section.calls, 2)
+
+    def test_result_is_copy(self):
+        section = FakeSection('boot', caps.BOOT)
+        cache = caps._SectionsCache([section], {})
+        cache.get()['boot']['calls'] = 42
+        cache.get()['boot']['calls'] = 42
+        self.assertEqual(cache.get(), {'boot': {'calls': 1}})
+
+    def test_failure(self):
+        cache = caps._SectionsCache(
+            [FakeSection('boot', caps.BOOT),
+             FailingSection('network', caps.NETWORK)], {})
+        with self.assertRaises(RuntimeError):
+            cache.get()
+
+    def test_concurrent(self):
+        sections = [FakeSection(s, s, delay=0.5) for s in caps.SOURCES]
+        cache = caps._SectionsCache(sections, {})
+        start = time.time()
+        cache.get()
+        self.assertLess(time.time() - start, 1.0)
+
+
+class TestSources(TestCaseBase):
+
+    def test_runtime_tunables_not_cached(self):
+        section, = [s for s in caps._SECTIONS if s.func == caps._host_caps]
+        self.assertEqual(caps.ALWAYS, section.source)
+        with MonkeyPatchScope([
+            (numa, 'autonuma_status', lambda: 1),
+            (osinfo, 'nested_virtualization',
+             lambda: osinfo.NestedVirtualization(True, 'kvm_intel')),
+            (osinfo, 'selinux_status', lambda: {}),
+            (osinfo, 'kdump_status', lambda: 0),
+            (caps, '_getIscsiIniName', lambda: ''),
+            (containersconnection, 'is_supported', lambda: False),
+        ]):
+            host_caps = caps._host_caps()
+        self.assertEqual(1, host_caps['autoNumaBalancing'])
+        self.assertTrue(host_caps['nestedVirtualization'])
+
+    def test_network_stamp_resolv_conf(self):
+        with namedTemporaryDir() as tmpdir:
+            resolv_conf = os.path.join(tmpdir, 'resolv.conf')
+            with open(resolv_conf, 'w') as f:
+                f.write('nameserver 192.0.2.1\n')
+            with MonkeyPatchScope([
+                (caps, '_RESOLV_CONF', resolv_conf),
+                (caps, '_network_watcher', object()),
+                (caps, 'monotonic_time', lambda: 0),
+            ]):
+                before = caps._network_stamp()
+                self.assertEqual(before, caps._network_stamp())
+                # Replaced by a DHCP client, without network events.
+                tmp = resolv_conf + '.tmp'
+                with open(tmp, 'w') as f:
+                    f.write('nameserver 192.0.2.2\n')
+                os.rename(tmp, resolv_conf)
+                self.assertNotEqual(before, caps._network_stamp())
+
+    def test_network_stamp_expires(self):
+        now = [0]
+        with MonkeyPatchScope([
+            (caps, '_network_watcher', object()),
+            (caps, 'monotonic_time', lambda: now[0]),
+        ]):
+            before = caps._network_stamp()
+            now[0] = caps._NETWORK_CACHE_TTL - 1
+            self.assertEqual(before, caps._network_stamp())
+            now[0] = caps._NETWORK_CACHE_TTL
+            self.assertNotEqual(before, caps._network_stamp())
+
+    def test_network_stamp_without_watcher(self):
+        with MonkeyPatchScope([(caps, '_network_watcher', None)]):
+            self.assertIsNone(caps._network_stamp())
+
+    def test_devices_stamp_memory_hotplug(self):
+        meminfo = {'MemTotal': 4096}
+        with MonkeyPatchScope([(utils, 'readMemInfo', lambda: meminfo)]):
+            before = caps._devices_stamp()
+            meminfo['MemTotal'] = 8192
+            self.assertNotEqual(before, caps._devices_stamp())
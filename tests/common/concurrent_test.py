@@ -188,6 +188,45 @@ class TMapTests(VdsmTestCase):
         expected = [concurrent.Result(False, error)] * 10
         self.assertEqual(results, expected)
 
+    def test_max_workers_results_order(self):
+        def func(x):
+            time.sleep(x)
+            return x
+        values = tuple(random.random() * 0.1 for x in range(10))
+        results = concurrent.tmap(func, values, max_workers=3)
+        expected = [concurrent.Result(True, x) for x in values]
+        self.assertEqual(results, expected)
+
+    def test_max_workers_concurrency(self):
+        lock = threading.Lock()
+        running = [0]
+        max_running = [0]
+
+        def func(x):
+            with lock:
+                running[0] += 1
+                max_running[0] = max(max_running[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+
+        concurrent.tmap(func, range(10), max_workers=3)
+        self.assertEqual(max_running[0], 3)
+
+    def test_max_workers_error(self):
+        error = RuntimeError("No result for you!")
+
+        def func(x):
+            raise error
+
+        results = concurrent.tmap(func, range(10), max_workers=3)
+        expected = [concurrent.Result(False, error)] * 10
+        self.assertEqual(results, expected)
+
+    def test_max_workers_invalid(self):
+        self.assertRaises(ValueError, concurrent.tmap, lambda x: x, range(3),
+                          max_workers=0)
+
 
 @expandPermutations
 class ThreadTests(VdsmTestCase):
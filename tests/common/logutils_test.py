@@ -18,10 +18,20 @@
 # Refer to the README and COPYING files for full details of the license
 #
 
+from __future__ import absolute_import
+from __future__ import print_function
+
 import logging
+import logging.config
+import os
+import threading
+import time
+from contextlib import closing
 
 from testlib import VdsmTestCase as TestCaseBase
 from testlib import forked
+from testlib import namedTemporaryDir
+from testValidation import stresstest
 
 from vdsm.common import logutils
 
@@ -82,3 +92,205 @@ class TestSetLevel(TestCaseBase):
         # The old name should work as well.
         logutils.set_level("ERROR")
         self.assertEqual(logger.getEffectiveLevel(), logging.ERROR)
+
+
+class Handler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+class BlockingHandler(Handler):
+
+    def __init__(self):
+        Handler.__init__(self)
+        self.ready = threading.Event()
+        self.unblock = threading.Event()
+
+    def emit(self, record):
+        self.ready.set()
+        self.unblock.wait()
+        Handler.emit(self, record)
+
+
+def make_logger(handler):
+    logger = logging.getLogger("test.threaded")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.handlers = [handler]
+    return logger
+
+
+class TestThreadedHandler(TestCaseBase):
+
+    def test_write(self):
+        target = Handler()
+        handler = logutils.ThreadedHandler(target=target)
+        with closing(handler):
+            log = make_logger(handler)
+            for i in range(10):
+                log.info("message %d", i)
+        self.assertEqual(target.messages,
+                         ["INFO message %d" % i for i in range(10)])
+
+    def test_format_when_logging(self):
+        target = Handler()
+        handler = logutils.ThreadedHandler(target=target)
+        with closing(handler):
+            log = make_logger(handler)
+            value = ["before"]
+            log.info("value %s", value)
+            value[0] = "after"
+        self.assertEqual(target.messages, ["INFO value ['before']"])
+
+    def test_exception(self):
+        target = Handler()
+        handler = logutils.ThreadedHandler(target=target)
+        with closing(handler):
+            log = make_logger(handler)
+            try:
+                raise RuntimeError("error")
+            except RuntimeError:
+                log.exception("failed")
+        message = target.messages[0]
+        self.assertTrue(message.startswith("ERROR failed\nTraceback"))
+        self.assertTrue(message.endswith("RuntimeError: error"))
+
+    def test_drop(self):
+        target = BlockingHandler()
+        # Room for 2 messages of 9 bytes.
+        handler = logutils.ThreadedHandler(capacity=20, target=target)
+        with closing(handler):
+            log = make_logger(handler)
+            # The writer takes the first record and blocks.
+            log.info("message 0")
+            target.ready.wait(2)
+            for i in range(1, 6):
+                log.info("message %d", i)
+            self.assertEqual(handler.queue_depth, 2)
+            self.assertEqual(handler.queue_bytes, 18)
+            self.assertEqual(handler.dropped, 3)
+            target.unblock.set()
+        self.assertEqual(target.messages, [
+            "INFO message 0",
+            "WARNING Log queue full, dropped 3 records",
+            "INFO message 1",
+            "INFO message 2",
+        ])
+
+    def test_large_record(self):
+        target = Handler()
+        handler = logutils.ThreadedHandler(capacity=10, target=target)
+        with closing(handler):
+            log = make_logger(handler)
+            log.info("x" * 100)
+        self.assertEqual(target.messages, ["INFO " + "x" * 100])
+        self.assertEqual(handler.dropped, 0)
+
+    def test_keep_records_until_target(self):
+        handler = logutils.ThreadedHandler()
+        with closing(handler):
+            log = make_logger(handler)
+            for i in range(3):
+                log.info("message %d", i)
+            self.assertEqual(handler.queue_depth, 3)
+            target = Handler()
+            handler.setTarget(target)
+        self.assertEqual(target.messages,
+                         ["INFO message %d" % i for i in range(3)])
+
+    def test_stats(self):
+        handler = logutils.ThreadedHandler(capacity=20)
+        with closing(handler):
+            log = make_logger(handler)
+            for i in range(3):
+                log.info("message %d", i)
+            stats = logutils.threaded_handler_stats()
+            self.assertEqual(stats["queue_depth"], 2)
+            self.assertEqual(stats["queue_bytes"], 18)
+            self.assertEqual(stats["dropped"], 1)
+            handler.setTarget(Handler())
+        stats = logutils.threaded_handler_stats()
+        self.assertEqual(stats["queue_depth"], 0)
+
+    @forked
+    def test_config(self):
+        with namedTemporaryDir() as tmpdir:
+            log_file = os.path.join(tmpdir, "test.log")
+            conf_file = os.path.join(tmpdir, "logger.conf")
+            with open(conf_file, "w") as f:
+                f.write(LOGGER_CONF % log_file)
+            logging.config.fileConfig(conf_file,
+                                      disable_existing_loggers=False)
+            logging.getLogger("test").info("message")
+            logging.shutdown()
+            with open(log_file) as f:
+                self.assertEqual(f.read(), "INFO message\n")
+
+    @stresstest
+    def test_slow_log_file(self):
+        count = 1000
+
+        class SlowHandler(Handler):
+            def emit(self, record):
+                time.sleep(0.001)
+                Handler.emit(self, record)
+
+        log = make_logger(SlowHandler())
+        start = time.time()
+        for i in range(count):
+            log.info("message %d", i)
+        sync_elapsed = time.time() - start
+
+        handler = logutils.ThreadedHandler(target=SlowHandler())
+        with closing(handler):
+            log = make_logger(handler)
+            start = time.time()
+            for i in range(count):
+                log.info("message %d", i)
+            threaded_elapsed = time.time() - start
+
+        print("\nrecords=%d sync=%.3fs threaded=%.3fs"
+              % (count, sync_elapsed, threaded_elapsed))
+
+
+LOGGER_CONF = """
+[loggers]
+keys=root,test
+
+[handlers]
+keys=logfile,logthread
+
+[formatters]
+keys=simple
+
+[logger_root]
+level=INFO
+handlers=
+
+[logger_test]
+level=INFO
+handlers=logthread
+qualname=test
+propagate=0
+
+[handler_logfile]
+class=FileHandler
+args=('%s',)
+level=DEBUG
+formatter=simple
+
+[handler_logthread]
+class=vdsm.common.logutils.ThreadedHandler
+args=(100,)
+level=DEBUG
+target=logfile
+
+[formatter_simple]
+format=%%(levelname)s %%(message)s
+"""
@@ -0,0 +1,255 @@
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing.managers import BaseManager
+
+from testlib import VdsmTestCase, expandPermutations, permutations
+from testlib import namedTemporaryDir
+from testValidation import stresstest
+
+from vdsm.common import muxrpc
+
+
+class Unpicklable(Exception):
+
+    def __init__(self):
+        super(Unpicklable, self).__init__()
+        self.lock = threading.Lock()
+
+
+class Service(object):
+
+    def echo(self, value):
+        return value
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+        return seconds
+
+    def fail(self, msg):
+        raise ValueError(msg)
+
+    def fail_unpicklable(self):
+        raise Unpicklable()
+
+    def _private(self):
+        return "secret"
+
+
+@contextmanager
+def server_and_client(workers=4, timeout=5):
+    with namedTemporaryDir() as tmpdir:
+        address = os.path.join(tmpdir, "mux.sock")
+        server = muxrpc.Server(address, Service(), workers=workers)
+        server.start()
+        try:
+            client = muxrpc.Client(address, timeout=timeout)
+            client.connect()
+            try:
+                yield server, client
+            finally:
+                client.close()
+        finally:
+            server.stop()
+
+
+@expandPermutations
+class TestChannel(VdsmTestCase):
+
+    @permutations([
+        # value
+        [None],
+        [42],
+        ["text"],
+        [(1, "two")],
+        [{"key": [1, 2, 3]}],
+    ])
+    def test_call(self, value):
+        with server_and_client() as (_, client):
+            self.assertEqual(client.call("echo", value), value)
+
+    def test_call_kwargs(self):
+        with server_and_client() as (_, client):
+            self.assertEqual(client.call("echo", value="kw"), "kw")
+
+    def test_remote_exception(self):
+        with server_and_client() as (_, client):
+            with self.assertRaises(ValueError):
+                client.call("fail", "error")
+
+    def test_remote_exception_unpicklable(self):
+        with server_and_client() as (_, client):
+            with self.assertRaises(muxrpc.RemoteError):
+                client.call("fail_unpicklable")
+
+    def test_private_method(self):
+        with server_and_client() as (_, client):
+            with self.assertRaises(AttributeError):
+                client.call("_private")
+
+    def test_missing_method(self):
+        with server_and_client() as (_, client):
+            with self.assertRaises(AttributeError):
+                client.call("no_such_method")
+
+    def test_timeout(self):
+        with server_and_client(timeout=0.1) as (_, client):
+            with self.assertRaises(muxrpc.Timeout):
+                client.call("sleep", 0.5)
+
+    def test_concurrent_calls(self):
+        with server_and_client(workers=4) as (_, client):
+            threads = []
+            start = time.time()
+            for i in range(4):
+                t = threading.Thread(target=client.call, args=("sleep", 0.5))
+                t.daemon = True
+                t.start()
+                threads.append(t)
+            for t in threads:
+                t.join()
+            elapsed = time.time() - start
+        self.assertLess(elapsed, 1.0)
+
+    def test_batch(self):
+        with server_and_client() as (_, client):
+            results = client.batch([
+                ("echo", (1,), {}),
+                ("fail", ("error",), {}),
+                ("echo", (), {"value": 3}),
+            ])
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0], (True, 1))
+        self.assertFalse(results[1].succeeded)
+        self.assertIsInstance(results[1].value, ValueError)
+        self.assertEqual(results[2], (True, 3))
+
+    def test_batch_concurrency(self):
+        with server_and_client(workers=4) as (_, client):
+            start = time.time()
+            results = client.batch([("sleep", (0.5,), {})] * 4)
+            elapsed = time.time() - start
+        self.assertTrue(all(r.succeeded for r in results))
+        self.assertLess(elapsed, 1.0)
+
+    def test_stats(self):
+        with server_and_client() as (_, client):
+            client.call("echo", 1)
+            client.call("echo", 2)
+            with self.assertRaises(ValueError):
+                client.call("fail", "error")
+            stats = client.stats()
+        self.assertEqual(stats["echo"]["count"], 2)
+        self.assertEqual(stats["echo"]["errors"], 0)
+        self.assertEqual(stats["fail"]["count"], 1)
+        self.assertEqual(stats["fail"]["errors"], 1)
+        self.assertGreaterEqual(stats["echo"]["max"], stats["echo"]["avg"])
+
+    def test_server_stopped(self):
+        with server_and_client() as (server, client):
+            server.stop()
+            with self.assertRaises(muxrpc.ConnectionClosed):
+                client.call("echo", 1)
+
+    def test_not_connected(self):
+        client = muxrpc.Client("/no/such/socket")
+        with self.assertRaises(muxrpc.ConnectionClosed):
+            client.call("echo", 1)
+
+
+class _Manager(BaseManager):
+    pass
+
+
+@contextmanager
+def manager_proxy():
+    with namedTemporaryDir() as tmpdir:
+        address = os.path.join(tmpdir, "manager.sock")
+        _Manager.register("instance", callable=Service)
+        manager = _Manager(address=address, authkey=b"")
+        manager.start()
+        try:
+            yield manager.instance()
+        finally:
+            manager.shutdown()
+
+
+@expandPermutations
+class TestChannelBenchmark(VdsmTestCase):
+
+    @stresstest
+    @permutations([[1], [4], [16]])
+    def test_concurrent_callers(self, callers):
+        calls = 2000
+
+        def run(func):
+            threads = []
+            start = time.time()
+            for _ in range(callers):
+                t = threading.Thread(
+                    target=lambda: [func("echo", 1)
+                                    for _ in range(calls // callers)])
+                t.daemon = True
+                t.start()
+                threads.append(t)
+            for t in threads:
+                t.join()
+            return time.time() - start
+
+        with manager_proxy() as proxy:
+            manager_elapsed = run(lambda name, *a: getattr(proxy, name)(*a))
+
+        # No timeout, avoiding python 2 polling in Event.wait().
+        with server_and_client(workers=callers, timeout=None) as (_, client):
+            mux_elapsed = run(client.call)
+
+        print()
+        print("callers=%d calls=%d manager=%.3fs (%.0f/s) mux=%.3fs (%.0f/s)"
+              % (callers, calls, manager_elapsed, calls / manager_elapsed,
+                 mux_elapsed, calls / mux_elapsed))
+
+    @stresstest
+    @permutations([[10], [100]])
+    def test_fan_out(self, count):
+        # Simulates many small privileged operations, like getScsiSerial per
+        # LUN, each taking some time in supervdsm.
+        delay = 0.005
+
+        with manager_proxy() as proxy:
+            start = time.time()
+            for _ in range(count):
+                proxy.sleep(delay)
+            manager_elapsed = time.time() - start
+
+        with server_and_client(workers=8, timeout=None) as (_, client):
+            start = time.time()
+            client.batch([("sleep", (delay,), {})] * count)
+            mux_elapsed = time.time() - start
+
+        print()
+        print("calls=%d manager=%.3fs mux batch=%.3fs"
+              % (count, manager_elapsed, mux_elapsed))
@@ -79,6 +79,18 @@ class TestClock(VdsmTestCase):
                 time.monotonic_time.time += 4
         self.assertEqual(str(c), "<Clock(outer=7.00, inner=4.00)>")
 
+    @MonkeyPatch(time, "monotonic_time", FakeTime())
+    def test_elapsed(self):
+        c = time.Clock()
+        c.start("foo")
+        time.monotonic_time.time += 3
+        c.start("bar")
+        time.monotonic_time.time += 4
+        c.stop("foo")
+        time.monotonic_time.time += 1
+        self.assertEqual(c.elapsed("foo"), 7)
+        self.assertEqual(c.elapsed("bar"), 5)
+
     # Inccorrect usage
 
     def test_start_started_clock(self):
@@ -98,6 +110,10 @@ class TestClock(VdsmTestCase):
         c = time.Clock()
         self.assertRaises(RuntimeError, c.stop, "foo")
 
+    def test_elapsed_missing_clock(self):
+        c = time.Clock()
+        self.assertRaises(RuntimeError, c.elapsed, "foo")
+
     def test_run_started(self):
         c = time.Clock()
         c.start("started")
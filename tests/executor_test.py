@@ -194,6 +194,30 @@ class ExecutorTests(TestCaseBase):
             blocked.set()
             blocked_forever.set()
 
+    @slowtest
+    def test_raise_max_workers(self):
+        blocked = threading.Event()
+        barrier = concurrent.Barrier(self.max_workers + 1)
+
+        try:
+            # Exhaust workers
+            for i in range(self.max_workers):
+                task = Task(event=blocked, start_barrier=barrier)
+                self.executor.dispatch(task, 0)
+            barrier.wait(3)
+
+            extra_task = Task()
+            self.executor.dispatch(extra_task, 0)
+            self.assertFalse(extra_task.executed.wait(1))
+
+            # Raising the limit adds a worker running the extra task
+            self.executor.max_workers = self.max_workers + 1
+            self.assertTrue(extra_task.executed.wait(1))
+
+        finally:
+            # Cleanup: Finish all the executor jobs
+            blocked.set()
+
     @slowtest
     def test_max_workers_many_tasks(self):
         # Check we don't get TooManyTasks exception after reaching the limit on
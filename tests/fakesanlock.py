@@ -46,6 +46,17 @@ class FakeSanlock(object):
     # Copied from sanlock src/sanlock_rv.h
     SANLK_LEADER_MAGIC = -223
 
+    # Copied from sanlock src/sanlock.h
+    LSFLAG_ADD = 0x1
+    LSFLAG_REM = 0x2
+
+    # Copied from sanlock src/sanlock_admin.h
+    HOST_UNKNOWN = 1
+    HOST_FREE = 2
+    HOST_LIVE = 3
+    HOST_FAIL = 4
+    HOST_DEAD = 5
+
     class SanlockException(Exception):
         @property
         def errno(self):
@@ -72,11 +83,13 @@ class FakeSanlock(object):
               "path": path,
               "offset": offset,
               "iotimeout": iotimeout,
+              "flags": self.LSFLAG_ADD,
               "ready": threading.Event()}
         self.spaces[lockspace] = ls
 
         def complete():
             # Wake up threads waiting on inq_lockspace()
+            ls["flags"] = 0
             ls["ready"].set()
 
         if async:
@@ -99,6 +112,7 @@ class FakeSanlock(object):
 
         # Mark the locksapce as not ready, so callers of inq_lockspace will
         # wait until it is removed.
+        ls["flags"] = self.LSFLAG_REM
         ls["ready"].clear()
 
         def complete():
@@ -144,6 +158,45 @@ class FakeSanlock(object):
 
         return lockspace in self.spaces
 
+    @maybefail
+    def get_lockspaces(self):
+        """
+        Return list of lockspaces the sanlock daemon knows about, including
+        lockspaces being added (flags & LSFLAG_ADD) or removed (flags &
+        LSFLAG_REM).
+        """
+        return [{"lockspace": lockspace,
+                 "host_id": ls["host_id"],
+                 "path": ls["path"],
+                 "offset": ls["offset"],
+                 "flags": ls["flags"]}
+                for lockspace, ls in self.spaces.items()]
+
+    @maybefail
+    def get_hosts(self, lockspace, host_id=0):
+        """
+        Return list of hosts with a lease in lockspace, or only host_id if
+        specified. The fake knows only about the host that added the
+        lockspace, reported as live.
+        """
+        ls = self.spaces.get(lockspace)
+        if ls is None or not ls["ready"].is_set():
+            raise self.SanlockException(
+                errno.ENOENT, "No such lockspace %r" % lockspace)
+
+        if host_id not in (0, ls["host_id"]):
+            return [{"host_id": host_id,
+                     "generation": 0,
+                     "timestamp": 0,
+                     "io_timeout": 0,
+                     "flags": self.HOST_FREE}]
+
+        return [{"host_id": ls["host_id"],
+                 "generation": 1,
+                 "timestamp": 1,
+                 "io_timeout": ls["iotimeout"],
+                 "flags": self.HOST_LIVE}]
+
     @maybefail
     def write_resource(self, lockspace, resource, disks, max_hosts=0,
                        num_hosts=0):
@@ -122,6 +122,48 @@ class TestFakeSanlock(VdsmTestCase):
             t.join()
         self.assertFalse(acquired, "lockspace not released")
 
+    def test_get_lockspaces(self):
+        fs = FakeSanlock()
+        fs.add_lockspace("lockspace", 1, "path", offset=42)
+        self.assertEqual(fs.get_lockspaces(), [{"lockspace": "lockspace",
+                                                "host_id": 1,
+                                                "path": "path",
+                                                "offset": 42,
+                                                "flags": 0}])
+
+    def test_get_lockspaces_adding(self):
+        fs = FakeSanlock()
+        fs.add_lockspace("lockspace", 1, "path", async=True)
+        ls, = fs.get_lockspaces()
+        self.assertEqual(ls["flags"], fs.LSFLAG_ADD)
+
+    def test_get_lockspaces_removing(self):
+        fs = FakeSanlock()
+        fs.add_lockspace("lockspace", 1, "path")
+        fs.rem_lockspace("lockspace", 1, "path", async=True)
+        ls, = fs.get_lockspaces()
+        self.assertEqual(ls["flags"], fs.LSFLAG_REM)
+
+    def test_get_hosts(self):
+        fs = FakeSanlock()
+        fs.add_lockspace("lockspace", 1, "path")
+        host, = fs.get_hosts("lockspace")
+        self.assertEqual(host["host_id"], 1)
+        self.assertEqual(host["flags"], fs.HOST_LIVE)
+
+    def test_get_hosts_other_host(self):
+        fs = FakeSanlock()
+        fs.add_lockspace("lockspace", 1, "path")
+        host, = fs.get_hosts("lockspace", 2)
+        self.assertEqual(host["host_id"], 2)
+        self.assertEqual(host["flags"], fs.HOST_FREE)
+
+    def test_get_hosts_no_lockspace(self):
+        fs = FakeSanlock()
+        with self.assertRaises(fs.SanlockException) as e:
+            fs.get_hosts("lockspace")
+        self.assertEqual(e.exception.errno, errno.ENOENT)
+
     # Writing and reading resources
 
     def test_write_read_resource(self):
@@ -20,7 +20,9 @@
 
 import six
 
+from monkeypatch import MonkeyPatchScope
 from testlib import VdsmTestCase as TestCaseBase
+from testlib import make_config
 from vdsm import osinfo
 from vdsm.gluster import cli as gcli
 import xml.etree.cElementTree as etree
@@ -1256,3 +1258,198 @@ class GlusterCliTests(TestCaseBase):
         tree = etree.fromstring(out)
         healInfo = gcli._parseVolumeHealInfo(tree)
         self.assertEqual(healInfo, glusterTestData.GLUSTER_VOLUME_HEAL_INFO)
+
+
+_VOLUMES_INFO_XML = """\
+<cliOutput>
+  <opRet>0</opRet>
+  <volInfo>
+    <volumes>
+      <volume>
+        <name>music</name>
+        <id>b3114c71-741b-4c6f-a39e-80384c4ea3cf</id>
+        <status>1</status>
+        <statusStr>Started</statusStr>
+        <brickCount>1</brickCount>
+        <distCount>1</distCount>
+        <stripeCount>1</stripeCount>
+        <replicaCount>1</replicaCount>
+        <disperseCount>0</disperseCount>
+        <redundancyCount>0</redundancyCount>
+        <arbiterCount>0</arbiterCount>
+        <type>0</type>
+        <typeStr>Distribute</typeStr>
+        <transport>0</transport>
+        <bricks>
+          <brick uuid="f06b108e-a780-4519-bb22-c3083a1e3f8a">\
+192.168.122.2:/tmp/music-b1</brick>
+        </bricks>
+        <options/>
+      </volume>
+      <volume>
+        <name>test</name>
+        <id>d2f4b5a1-87ab-4c21-8b49-55a8e7d8e2d4</id>
+        <status>2</status>
+        <statusStr>Stopped</statusStr>
+        <brickCount>1</brickCount>
+        <distCount>1</distCount>
+        <stripeCount>1</stripeCount>
+        <replicaCount>1</replicaCount>
+        <disperseCount>0</disperseCount>
+        <redundancyCount>0</redundancyCount>
+        <arbiterCount>0</arbiterCount>
+        <type>0</type>
+        <typeStr>Distribute</typeStr>
+        <transport>0</transport>
+        <bricks>
+          <brick uuid="f06b108e-a780-4519-bb22-c3083a1e3f8a">\
+192.168.122.2:/tmp/test-b1</brick>
+        </bricks>
+        <options/>
+      </volume>
+    </volumes>
+  </volInfo>
+</cliOutput>
+"""
+
+_VOLUME_STATUS_XML = """\
+      <volume>
+        <volName>%s</volName>
+        <node>
+          <hostname>192.168.122.2</hostname>
+          <path>/tmp/%s-b1</path>
+          <peerid>f06b108e-a780-4519-bb22-c3083a1e3f8a</peerid>
+          <port>49152</port>
+          <ports>
+            <tcp>49152</tcp>
+            <rdma>N/A</rdma>
+          </ports>
+          <status>1</status>
+          <pid>1313</pid>
+        </node>
+      </volume>
+"""
+
+_VOLUMES_STATUS_XML = """\
+<cliOutput>
+  <opRet>0</opRet>
+  <volStatus>
+    <volumes>
+%s%s    </volumes>
+  </volStatus>
+</cliOutput>
+""" % (_VOLUME_STATUS_XML % ("music", "music"),
+       _VOLUME_STATUS_XML % ("video", "video"))
+
+
+class FakeGlusterCli(object):
+
+    def __init__(self):
+        self.commands = []
+
+    def __call__(self, cmd):
+        self.commands.append(cmd[1:])
+        if cmd[1:] == ["volume", "info"]:
+            return etree.fromstring(_VOLUMES_INFO_XML)
+        if cmd[1:3] == ["volume", "status"]:
+            if cmd[3] == "all":
+                return etree.fromstring(_VOLUMES_STATUS_XML)
+            return etree.fromstring(_VOLUMES_STATUS_XML.replace(
+                "music", cmd[3]))
+        raise gcli.ge.GlusterCmdFailedException(rc=1, err=["unexpected"])
+
+    def execGluster(self, cmd):
+        self.commands.append(cmd[1:])
+        if cmd[1:] == ["volume", "start", "test"]:
+            return 0, [], []
+        return 1, [], ["unexpected"]
+
+
+class GlusterStateCacheTests(TestCaseBase):
+
+    def setUp(self):
+        self.cli = FakeGlusterCli()
+        for state in gcli._VOLUMES:
+            state.invalidate()
+
+    def patch(self, timeout=60):
+        cfg = make_config([("gluster", "state_cache_timeout", str(timeout))])
+        return MonkeyPatchScope([
+            (gcli, "config", cfg),
+            (gcli, "_execGlusterXml", self.cli),
+            (gcli, "_execGluster", self.cli.execGluster),
+            (gcli, "_getGlusterVolCmd", lambda: ["gluster", "volume"]),
+        ])
+
+    def test_volume_info_cached(self):
+        with self.patch():
+            volumes = gcli.volumeInfo()
+            self.assertEqual(sorted(volumes), ["music", "test"])
+            self.assertEqual(gcli.volumeInfo("test"),
+                             {"test": volumes["test"]})
+        self.assertEqual(self.cli.commands, [["volume", "info"]])
+
+    def test_volume_info_copy(self):
+        with self.patch():
+            gcli.volumeInfo()["music"]["volumeName"] = "modified"
+            self.assertEqual(gcli.volumeInfo()["music"]["volumeName"],
+                             "music")
+
+    def test_volume_info_disabled(self):
+        with self.patch(timeout=0):
+            gcli.volumeInfo()
+            gcli.volumeInfo()
+        self.assertEqual(self.cli.commands, [["volume", "info"]] * 2)
+
+    def test_volume_info_missing(self):
+        with self.patch():
+            with self.assertRaises(gcli.ge.GlusterVolumesListFailedException):
+                gcli.volumeInfo("missing")
+        self.assertEqual(self.cli.commands, [["volume", "info"],
+                                             ["volume", "info", "missing"]])
+
+    def test_volume_status_cached(self):
+        with self.patch():
+            music = gcli.volumeStatus("music")
+            video = gcli.volumeStatus("video")
+        self.assertEqual(music["name"], "music")
+        self.assertEqual(music["bricks"][0]["brick"],
+                         "192.168.122.2:/tmp/music-b1")
+        self.assertEqual(video["name"], "video")
+        self.assertEqual(self.cli.commands, [["volume", "status", "all"]])
+
+    def test_volume_status_not_started(self):
+        with self.patch():
+            status = gcli.volumeStatus("test")
+        self.assertEqual(status["name"], "test")
+        self.assertEqual(self.cli.commands, [["volume", "status", "all"],
+                                             ["volume", "status", "test"]])
+
+    def test_volume_status_brick(self):
+        with self.patch():
+            gcli.volumeStatus("music", brick="192.168.122.2:/tmp/music-b1")
+        self.assertEqual(self.cli.commands, [
+            ["volume", "status", "music", "192.168.122.2:/tmp/music-b1"]])
+
+    def test_invalidate_on_change(self):
+        with self.patch():
+            gcli.volumeInfo()
+            gcli.volumeStatus("music")
+            gcli.volumeStart("test")
+            gcli.volumeInfo()
+            gcli.volumeStatus("music")
+        self.assertEqual(self.cli.commands, [["volume", "info"],
+                                             ["volume", "status", "all"],
+                                             ["volume", "start", "test"],
+                                             ["volume", "info"],
+                                             ["volume", "status", "all"]])
+
+    def test_invalidate_on_failure(self):
+        with self.patch():
+            gcli.volumeInfo()
+            with self.assertRaises(gcli.ge.GlusterVolumeStopFailedException):
+                gcli.volumeStop("test")
+            gcli.volumeInfo()
+        self.assertEqual(self.cli.commands, [["volume", "info"],
+                                             ["volume", "stop", "test"],
+                                             ["volume", "info"]])
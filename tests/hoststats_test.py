@@ -18,15 +18,21 @@
 # Refer to the README and COPYING files for full details of the license
 #
 
+from __future__ import print_function
+
 import os
 import tempfile
 import shutil
+import time
 
 from vdsm.host import stats as hoststats
+from vdsm.host.stats import JIFFIES_BOUND
 from vdsm import numa
+from vdsm.virt import sampling
 
 from testlib import VdsmTestCase as TestCaseBase
 from monkeypatch import MonkeyPatchScope
+from testValidation import stresstest
 import vmfakelib as fake
 
 
@@ -167,6 +173,24 @@ class HostStatsThreadTests(TestCaseBase):
             self.assertEqual(len(result), 1)
             self.assertEqual(result['0'], self._core_zero_stats)
 
+    def testCpuCoreStatsCounterWrap(self):
+        first_sample = fake.HostSample(1.0, {
+            0: {'user': JIFFIES_BOUND - 10, 'sys': 0},
+            1: {'user': 0, 'sys': 0}})
+        last_sample = fake.HostSample(2.0, {
+            0: {'user': 15, 'sys': 50},
+            1: {'user': 0, 'sys': 0}})
+
+        with MonkeyPatchScope([(numa, 'topology',
+                                self._fakeNumaTopology)]):
+            result = hoststats._get_cpu_core_stats(first_sample, last_sample)
+            self.assertEqual(result['0'], {
+                'cpuIdle': '25.00',
+                'cpuSys': '50.00',
+                'cpuUser': '25.00',
+                'nodeIndex': 0
+            })
+
     def testOutputWithNoSamples(self):
         expected = {
             'cpuIdle': 100.0,
@@ -203,3 +227,41 @@ class HostStatsThreadTests(TestCaseBase):
             hoststats.produce(first_sample, last_sample),
             expected
         )
+
+
+class HostStatsBenchmark(TestCaseBase):
+
+    NODES = 8
+    CPUS = 384
+
+    def _topology(self):
+        cpus_per_node = self.CPUS // self.NODES
+        return {str(node): {'cpus': list(range(node * cpus_per_node,
+                                               (node + 1) * cpus_per_node))}
+                for node in range(self.NODES)}
+
+    def _sample(self, timestamp, jiffies):
+        cpu_lines = ['cpu  0 0 0 0 0 0 0 0 0 0\n']
+        cpu_lines.extend('cpu%d %d 0 %d %d 0 0 0 0 0 0\n'
+                         % (cpu, jiffies + cpu, jiffies, jiffies)
+                         for cpu in range(self.CPUS))
+        sample = fake.HostSample(timestamp, {})
+        sample.cpuCores = sampling.CpuCoreSample(cpu_lines)
+        return sample
+
+    @stresstest
+    def testCpuCoreStatsLargeTopology(self):
+        first_sample = self._sample(1.0, 1000)
+        last_sample = self._sample(16.0, 2000)
+        count = 1000
+
+        with MonkeyPatchScope([(numa, 'topology', self._topology)]):
+            start = time.time()
+            for i in range(count):
+                result = hoststats._get_cpu_core_stats(first_sample,
+                                                       last_sample)
+            elapsed = time.time() - start
+
+        self.assertEqual(self.CPUS, len(result))
+        print("\n%d cpus, %d nodes: %.3fms per host sample"
+              % (self.CPUS, self.NODES, elapsed / count * 1000))
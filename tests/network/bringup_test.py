@@ -0,0 +1,124 @@
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301  USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+from __future__ import absolute_import
+
+import threading
+
+from nose.plugins.attrib import attr
+
+from vdsm.common import concurrent
+from vdsm.network.configurators import bringup
+from vdsm.network.errors import ConfigNetworkError, ERR_FAILED_IFUP
+
+from testlib import VdsmTestCase
+
+
+class Recorder(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.done = []
+        self.running = 0
+        self.max_running = 0
+
+    def action(self, device, error=None, barrier=None):
+        def run():
+            with self.lock:
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+            try:
+                if barrier is not None:
+                    barrier.wait(timeout=5)
+                if error is not None:
+                    raise error
+            finally:
+                with self.lock:
+                    self.running -= 1
+                    self.done.append(device)
+        return run
+
+
+@attr(type='unit')
+class TestPlan(VdsmTestCase):
+
+    def test_hierarchy_order(self):
+        recorder = Recorder()
+        plan = bringup.Plan()
+        plan.add('br0', recorder.action('br0'), requires=('bond0.10',))
+        plan.add('br1', recorder.action('br1'), requires=('bond0.20',))
+        plan.add('bond0.10', recorder.action('bond0.10'), requires=('bond0',))
+        plan.add('bond0.20', recorder.action('bond0.20'), requires=('bond0',))
+        plan.add('bond0', recorder.action('bond0'))
+        plan.run()
+
+        self.assertEqual('bond0', recorder.done[0])
+        self.assertEqual({'bond0.10', 'bond0.20'}, set(recorder.done[1:3]))
+        self.assertEqual({'br0', 'br1'}, set(recorder.done[3:]))
+        self.assertEqual([], plan.failed)
+
+    def test_missing_requirement_is_ignored(self):
+        recorder = Recorder()
+        plan = bringup.Plan()
+        plan.add('eth0.10', recorder.action('eth0.10'), requires=('eth0',))
+        plan.run()
+        self.assertEqual(['eth0.10'], recorder.done)
+
+    def test_independent_devices_run_concurrently(self):
+        recorder = Recorder()
+        # Would time out if the actions were run one by one.
+        barrier = concurrent.Barrier(4)
+        plan = bringup.Plan(max_workers=4)
+        for i in range(4):
+            plan.add('br%d' % i, recorder.action('br%d' % i, barrier=barrier))
+        plan.run()
+        self.assertEqual(4, recorder.max_running)
+        self.assertEqual(4, len(recorder.done))
+
+    def test_bounded_parallelism(self):
+        recorder = Recorder()
+        plan = bringup.Plan(max_workers=2)
+        for i in range(10):
+            plan.add('br%d' % i, recorder.action('br%d' % i))
+        plan.run()
+        self.assertEqual(10, len(recorder.done))
+        self.assertLessEqual(recorder.max_running, 2)
+
+    def test_failure_skips_dependent_devices(self):
+        recorder = Recorder()
+        error = ConfigNetworkError(ERR_FAILED_IFUP, 'ifup failed')
+        plan = bringup.Plan()
+        plan.add('eth0', recorder.action('eth0', error=error))
+        plan.add('eth0.10', recorder.action('eth0.10'), requires=('eth0',))
+        plan.add('br0', recorder.action('br0'), requires=('eth0.10',))
+        plan.add('eth1', recorder.action('eth1'))
+        plan.add('br1', recorder.action('br1'), requires=('eth1',))
+
+        with self.assertRaises(ConfigNetworkError) as cm:
+            plan.run()
+        self.assertIs(error, cm.exception)
+        self.assertEqual({'eth0', 'eth1', 'br1'}, set(recorder.done))
+        self.assertEqual(['br0', 'eth0', 'eth0.10'], plan.failed)
+
+    def test_cyclic_dependency(self):
+        plan = bringup.Plan()
+        plan.add('a', lambda: None, requires=('b',))
+        plan.add('b', lambda: None, requires=('a',))
+        with self.assertRaises(ValueError):
+            plan.run()
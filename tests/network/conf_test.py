@@ -122,6 +122,81 @@ class ifcfgConfigWriterTests(TestCaseBase):
             self._assertFilesRestored()
 
 
+@attr(type='unit')
+class IfcfgDevicesTests(TestCaseBase):
+
+    # Two networks on vlans over a bond, one on a nic.
+    IFCFGS = {
+        'bond0': 'BONDING_OPTS="mode=4"\nONBOOT=yes\n',
+        'eth0': 'MASTER=bond0\nSLAVE=yes\nONBOOT=yes\n',
+        'eth1': 'MASTER=bond0\nSLAVE=yes\nONBOOT=yes\n',
+        'bond0.10': 'VLAN=yes\nBRIDGE=net10\nONBOOT=yes\n',
+        'bond0.20': 'VLAN=yes\nBRIDGE="net20"\nONBOOT=yes\n',
+        'net10': 'TYPE=Bridge\nDELAY=0\nONBOOT=yes\n',
+        'net20': 'TYPE=Bridge\nDELAY=0\nONBOOT=yes\n',
+        'eth2': 'BRIDGE=net30\nONBOOT=yes\n',
+        'net30': 'TYPE=Bridge\nDELAY=0\nONBOOT=yes\n',
+    }
+
+    def setUp(self):
+        self._tempdir = tempfile.mkdtemp()
+        self._pref = os.path.join(self._tempdir, 'ifcfg-')
+        for dev, content in self.IFCFGS.items():
+            with open(self._pref + dev, 'w') as f:
+                f.write(content)
+        self._files = [self._pref + dev for dev in self.IFCFGS]
+        self._files.append(self._pref + 'missing')
+
+    def tearDown(self):
+        shutil.rmtree(self._tempdir)
+
+    def test_device_hierarchy(self):
+        with MonkeyPatchScope([(ifcfg, 'NET_CONF_PREF', self._pref)]):
+            hierarchy = ifcfg._device_hierarchy(self._files)
+        self.assertEqual({
+            'bond0': set(),
+            'bond0.10': {'bond0'},
+            'bond0.20': {'bond0'},
+            'net10': {'bond0.10'},
+            'net20': {'bond0.20'},
+            'eth2': set(),
+            'net30': {'eth2'},
+        }, hierarchy)
+
+    def test_start_devices_order(self):
+        started = []
+        with MonkeyPatchScope([
+            (ifcfg, 'NET_CONF_PREF', self._pref),
+            (ifcfg, '_is_running_bond', lambda bond: True),
+            (ifcfg, '_exec_ifup_by_name', started.append),
+        ]):
+            ifcfg.start_devices(self._files)
+
+        self.assertEqual(7, len(started))
+        self._assertBefore(started, 'bond0', 'bond0.10')
+        self._assertBefore(started, 'bond0.10', 'net10')
+        self._assertBefore(started, 'bond0.20', 'net20')
+        self._assertBefore(started, 'eth2', 'net30')
+
+    def test_stop_devices_order(self):
+        stopped = []
+        with MonkeyPatchScope([
+            (ifcfg, 'NET_CONF_PREF', self._pref),
+            (ifcfg, '_is_running_bond', lambda bond: False),
+            (ifcfg, 'ifdown', stopped.append),
+        ]):
+            ifcfg.stop_devices(self._files)
+
+        self.assertEqual(7, len(stopped))
+        self._assertBefore(stopped, 'net10', 'bond0.10')
+        self._assertBefore(stopped, 'bond0.10', 'bond0')
+        self._assertBefore(stopped, 'bond0.20', 'bond0')
+        self._assertBefore(stopped, 'net30', 'eth2')
+
+    def _assertBefore(self, devices, first, second):
+        self.assertLess(devices.index(first), devices.index(second))
+
+
 IFCFG_ETH_CONF = """DEVICE="testdevice"
 ONBOOT=yes
 NETBOOT=yes
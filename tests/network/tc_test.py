@@ -20,7 +20,9 @@
 #
 
 from __future__ import absolute_import
+from __future__ import print_function
 from collections import namedtuple
+import errno
 import time
 import os
 import sys
@@ -38,8 +40,9 @@ from testlib import mock
 from testValidation import ValidateRunningAsRoot, stresstest
 from monkeypatch import MonkeyClass
 from .nettestlib import (Bridge, Dummy, IperfClient, IperfServer, Tap,
-                         bridge_device, network_namespace, requires_iperf3,
-                         requires_tc, requires_tun, veth_pair, vlan_device)
+                         bridge_device, dummy_devices, network_namespace,
+                         requires_iperf3, requires_tc, requires_tun,
+                         veth_pair, vlan_device)
 from .nettestlib import running
 from .nettestlib import EXT_TC
 
@@ -271,6 +274,90 @@ class TestFilters(TestCaseBase):
             self.assertEqual(parsed, correct)
 
 
+@attr(type='unit')
+class TestBatch(TestCaseBase):
+
+    def setUp(self):
+        self.calls = []
+        self.results = []
+
+    def exec_sync(self, command, data=None):
+        self.calls.append((command, data))
+        return self.results.pop(0) if self.results else (0, '', '')
+
+    def commit(self, batch):
+        with mock.patch.object(tc._wrapper.cmd, 'exec_sync', self.exec_sync):
+            batch.commit()
+
+    def test_single_process(self):
+        batch = tc.Batch()
+        tc.qdisc.replace('dev0', 'prio', batch=batch)
+        tc.filter.replace('dev0', parent='ffff:', protocol='all',
+                          basic=['match', 'meta(vlan eq 3)'], batch=batch)
+        self.assertEqual(self.calls, [])
+        self.commit(batch)
+        self.assertEqual(self.calls, [
+            ([tc._wrapper.EXT_TC, '-batch', '-'],
+             'qdisc replace dev dev0 root prio\n'
+             'filter replace dev dev0 protocol all parent ffff: '
+             'basic match "meta(vlan eq 3)"\n'),
+        ])
+
+    def test_empty(self):
+        self.commit(tc.Batch())
+        self.assertEqual(self.calls, [])
+
+    def test_error(self):
+        self.results.append(
+            (1, '', 'RTNETLINK answers: File exists\nCommand failed -:2\n'))
+        batch = tc.Batch()
+        tc.qdisc.replace('dev0', 'prio', batch=batch)
+        tc.qdisc.add('dev0', 'ingress', batch=batch)
+        tc.qdisc.add('dev1', 'ingress', batch=batch)
+        with self.assertRaises(tc.TrafficControlException) as cm:
+            self.commit(batch)
+        self.assertEqual(cm.exception.errCode, errno.EEXIST)
+        self.assertEqual(cm.exception.command,
+                         [tc._wrapper.EXT_TC, 'qdisc', 'add', 'dev', 'dev0',
+                          'ingress'])
+        self.assertEqual(len(self.calls), 1)
+
+    def test_ignored_error(self):
+        self.results.append(
+            (1, '', 'RTNETLINK answers: No such file or directory\n'
+                    'Command failed -:1\n'))
+        batch = tc.Batch()
+        with batch.ignore(errno.ENOENT):
+            tc.qdisc.delete('dev0', batch=batch)
+        tc.qdisc.add('dev0', 'ingress', batch=batch)
+        self.commit(batch)
+        # The batch continues after the ignored failure.
+        self.assertEqual([data for _, data in self.calls], [
+            'qdisc del dev dev0 root\nqdisc add dev dev0 ingress\n',
+            'qdisc add dev dev0 ingress\n',
+        ])
+
+    def test_ignore_applies_to_context_only(self):
+        self.results.append(
+            (1, '', 'RTNETLINK answers: No such file or directory\n'
+                    'Command failed -:2\n'))
+        batch = tc.Batch()
+        with batch.ignore(errno.ENOENT):
+            tc.qdisc.delete('dev0', batch=batch)
+        tc.qdisc.delete('dev1', batch=batch)
+        with self.assertRaises(tc.TrafficControlException) as cm:
+            self.commit(batch)
+        self.assertEqual(cm.exception.errCode, errno.ENOENT)
+
+    def test_context_discards_on_error(self):
+        with mock.patch.object(tc._wrapper.cmd, 'exec_sync', self.exec_sync):
+            with self.assertRaises(RuntimeError):
+                with tc.Batch() as batch:
+                    tc.qdisc.add('dev0', 'ingress', batch=batch)
+                    raise RuntimeError
+        self.assertEqual(self.calls, [])
+
+
 class TestPortMirror(TestCaseBase):
 
     """
@@ -385,6 +472,32 @@ class TestPortMirror(TestCaseBase):
         self.testMirroring()
         tc.unsetPortMirroring(self._bridge0.devName, self._bridge2.devName)
 
+
+class TestPortMirrorBenchmark(TestCaseBase):
+
+    @stresstest
+    @ValidateRunningAsRoot
+    @requires_tc
+    def test_mirroring_many_targets(self):
+        # Like starting many VMs with port mirroring on the same network.
+        count = 50
+        with bridge_device() as bridge, dummy_devices(count) as targets:
+            start = time.time()
+            for target in targets:
+                tc.setPortMirroring(bridge.devName, target)
+            set_elapsed = time.time() - start
+
+            start = time.time()
+            for target in targets:
+                tc.unsetPortMirroring(bridge.devName, target)
+            unset_elapsed = time.time() - start
+
+        print("\n%d targets: set %.3fs (%.1fms/target), "
+              "unset %.3fs (%.1fms/target)"
+              % (count, set_elapsed, set_elapsed / count * 1000,
+                 unset_elapsed, unset_elapsed / count * 1000))
+
+
 HOST_QOS_OUTBOUND = {
     'ls': {
         'm1': 4 * 1000 ** 2,  # 4Mbit/s
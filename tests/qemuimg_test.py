@@ -18,9 +18,14 @@
 # Refer to the README and COPYING files for full details of the license
 #
 
+from __future__ import print_function
+
+import io
 import json
 import os
 import pprint
+import time
+from contextlib import contextmanager
 from functools import partial
 
 from monkeypatch import MonkeyPatch, MonkeyPatchScope
@@ -34,6 +39,8 @@ from testlib import VdsmTestCase as TestCaseBase
 from testlib import permutations, expandPermutations
 from testlib import make_config
 from testlib import namedTemporaryDir
+from testValidation import ValidateRunningAsRoot
+from testValidation import stresstest
 from vdsm import cmdutils
 from vdsm import commands
 from vdsm.common import exception
@@ -145,6 +152,107 @@ class InfoTests(TestCaseBase):
             self.assertNotIn('compat', info)
 
 
+class InfoCacheTests(TestCaseBase):
+
+    INFO = {"format": "raw", "virtual-size": 1048576}
+
+    def setUp(self):
+        qemuimg._info_cache.clear()
+        self.calls = 0
+
+    def tearDown(self):
+        qemuimg._info_cache.clear()
+
+    def fake_info(self, cmd, **kw):
+        self.calls += 1
+        return fake_json_call(self.INFO, cmd, **kw)
+
+    def test_cached(self):
+        with self.image() as path:
+            self.assertEqual(qemuimg.info(path), qemuimg.info(path))
+        self.assertEqual(self.calls, 1)
+        stats = qemuimg.info_cache_stats()
+        self.assertEqual(stats, {"hits": 1, "misses": 1, "entries": 1})
+
+    def test_returns_copy(self):
+        with self.image() as path:
+            qemuimg.info(path)['format'] = 'modified'
+            self.assertEqual(qemuimg.info(path)['format'], 'raw')
+
+    def test_format(self):
+        with self.image() as path:
+            qemuimg.info(path)
+            qemuimg.info(path, format='raw')
+        self.assertEqual(self.calls, 2)
+
+    def test_header_changed(self):
+        with self.image() as path:
+            qemuimg.info(path)
+            with io.open(path, "r+b") as f:
+                f.write(b"header changed")
+            qemuimg.info(path)
+        self.assertEqual(self.calls, 2)
+
+    def test_size_changed(self):
+        with self.image() as path:
+            qemuimg.info(path)
+            with io.open(path, "r+b") as f:
+                f.truncate(2 * 1024**2)
+            qemuimg.info(path)
+        self.assertEqual(self.calls, 2)
+
+    def test_invalidate(self):
+        with self.image() as path:
+            qemuimg.info(path)
+            qemuimg.invalidate_info(path)
+            qemuimg.info(path)
+        self.assertEqual(self.calls, 2)
+
+    def test_resize_invalidates(self):
+        with self.image() as path:
+            qemuimg.info(path)
+            qemuimg.resize(path, 1048576)
+            qemuimg.info(path)
+        # info, resize, info
+        self.assertEqual(self.calls, 3)
+
+    def test_missing_image(self):
+        with self.image():
+            qemuimg.info("/no/such/image")
+            qemuimg.info("/no/such/image")
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(qemuimg.info_cache_stats()["entries"], 0)
+
+    def test_capacity(self):
+        config = make_config([('irs', 'qemuimg_info_cache_size', '1')])
+        with self.image(config=config) as path:
+            other = path + ".other"
+            with io.open(other, "wb") as f:
+                f.write(b"other")
+            qemuimg.info(path)
+            qemuimg.info(other)
+            qemuimg.info(path)
+        self.assertEqual(self.calls, 3)
+        self.assertEqual(qemuimg.info_cache_stats()["entries"], 1)
+
+    def test_disabled(self):
+        config = make_config([('irs', 'qemuimg_info_cache_size', '0')])
+        with self.image(config=config) as path:
+            qemuimg.info(path)
+            qemuimg.info(path)
+        self.assertEqual(self.calls, 2)
+
+    @contextmanager
+    def image(self, config=CONFIG):
+        with namedTemporaryDir() as tmpdir:
+            path = os.path.join(tmpdir, "image")
+            with io.open(path, "wb") as f:
+                f.truncate(1024**2)
+            with MonkeyPatchScope([(commands, "execCmd", self.fake_info),
+                                   (qemuimg, "config", config)]):
+                yield path
+
+
 class CreateTests(TestCaseBase):
 
     def test_no_format(self):
@@ -200,6 +308,7 @@ class CreateTests(TestCaseBase):
                 qemuimg.create('image', format='qcow2')
 
 
+@expandPermutations
 class ConvertTests(TestCaseBase):
 
     def test_no_format(self):
@@ -284,6 +393,82 @@ class ConvertTests(TestCaseBase):
                             backing='bak', backingFormat='qcow2',
                             dstQcow2Compat='1.11')
 
+    def test_coroutines(self):
+        def convert(cmd, **kw):
+            expected = [QEMU_IMG, 'convert', '-p', '-t', 'none', '-T', 'none',
+                        'src', '-m', '16', 'dst']
+            self.assertEqual(cmd, expected)
+
+        with MonkeyPatchScope([(qemuimg, 'ProgressCommand', convert)]):
+            qemuimg.convert('src', 'dst', coroutines=16)
+
+    @permutations([[0], [17]])
+    def test_coroutines_invalid(self, coroutines):
+        with self.assertRaises(ValueError):
+            qemuimg.convert('src', 'dst', coroutines=coroutines)
+
+    def test_unordered_writes(self):
+        def convert(cmd, **kw):
+            expected = [QEMU_IMG, 'convert', '-p', '-t', 'none', '-T', 'none',
+                        'src', '-W', '-O', 'raw', 'dst']
+            self.assertEqual(cmd, expected)
+
+        with MonkeyPatchScope([(qemuimg, 'ProgressCommand', convert)]):
+            qemuimg.convert('src', 'dst', dstFormat='raw',
+                            unordered_writes=True)
+
+    def test_preallocation(self):
+        def convert(cmd, **kw):
+            expected = [QEMU_IMG, 'convert', '-p', '-t', 'none', '-T', 'none',
+                        'src', '-O', 'raw', '-o', 'preallocation=falloc',
+                        'dst']
+            self.assertEqual(cmd, expected)
+
+        with MonkeyPatchScope([(qemuimg, 'ProgressCommand', convert)]):
+            qemuimg.convert('src', 'dst', dstFormat='raw',
+                            preallocation=qemuimg.PREALLOCATION.FALLOC)
+
+    def test_qcow2_preallocation(self):
+        def convert(cmd, **kw):
+            expected = [QEMU_IMG, 'convert', '-p', '-t', 'none', '-T', 'none',
+                        'src', '-O', 'qcow2', '-o',
+                        'compat=0.10,preallocation=metadata', 'dst']
+            self.assertEqual(cmd, expected)
+
+        with MonkeyPatchScope([(qemuimg, 'config', CONFIG),
+                               (qemuimg, 'ProgressCommand', convert)]):
+            qemuimg.convert('src', 'dst', dstFormat='qcow2',
+                            preallocation=qemuimg.PREALLOCATION.METADATA)
+
+
+@expandPermutations
+class ConvertOptionsTests(TestCaseBase):
+
+    @permutations((
+        # mode, format, block, preallocated, expected
+        ('default', 'raw', True, True, {}),
+        ('default', 'raw', False, True, {}),
+        ('parallel', 'raw', True, False,
+            {'coroutines': 16, 'unordered_writes': True}),
+        ('parallel', 'raw', True, True,
+            {'coroutines': 16, 'unordered_writes': True}),
+        ('parallel', 'raw', False, False, {'coroutines': 16}),
+        ('parallel', 'raw', False, True,
+            {'coroutines': 16, 'preallocation': 'falloc'}),
+        ('parallel', 'qcow2', True, False, {'coroutines': 16}),
+        ('parallel', 'qcow2', False, False, {'coroutines': 16}),
+    ))
+    def test_options(self, mode, format, block, preallocated, expected):
+        config = make_config([('irs', 'qemuimg_convert_coroutines', '16')])
+        with MonkeyPatchScope([(qemuimg, 'config', config)]):
+            options = qemuimg.convert_options(mode, format, block,
+                                              preallocated)
+        self.assertEqual(options, expected)
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            qemuimg.convert_options('invalid', 'raw', True, False)
+
 
 class CheckTests(TestCaseBase):
 
@@ -545,6 +730,73 @@ class TestAmend(TestCaseBase):
                              desired_qcow2_compat)
 
 
+@expandPermutations
+class ConvertBenchmark(TestCaseBase):
+
+    SIZE = 1024**3
+    CHUNK = 1024**2
+
+    @stresstest
+    @permutations([[False], [True]])
+    def test_file(self, preallocated):
+        with namedTemporaryDir() as tmpdir:
+            src = self.make_source(tmpdir)
+            dst = os.path.join(tmpdir, "dst")
+            for mode in qemuimg.COPY_MODES:
+                with io.open(dst, "wb") as f:
+                    f.truncate(self.SIZE)
+                options = qemuimg.convert_options(mode, "raw", False,
+                                                  preallocated)
+                elapsed = self.convert(src, dst, options)
+                allocated = os.stat(dst).st_blocks * 512
+                self.report("file", mode, elapsed, "allocated", allocated)
+
+    @stresstest
+    @ValidateRunningAsRoot
+    def test_block(self):
+        # Imported here since loop devices are used only when running as
+        # root.
+        import loopback
+        with namedTemporaryDir() as tmpdir:
+            src = self.make_source(tmpdir)
+            backing = os.path.join(tmpdir, "backing")
+            with io.open(backing, "wb") as f:
+                f.truncate(self.SIZE)
+            with loopback.Device(backing) as dev:
+                for mode in qemuimg.COPY_MODES:
+                    options = qemuimg.convert_options(mode, "raw", True,
+                                                      False)
+                    before = self.sectors_written(dev.path)
+                    elapsed = self.convert(src, dev.path, options)
+                    written = (self.sectors_written(dev.path) - before) * 512
+                    self.report("block", mode, elapsed, "written", written)
+
+    def make_source(self, tmpdir):
+        # Raw image with data in a quarter of the chunks.
+        path = os.path.join(tmpdir, "src")
+        with io.open(path, "wb") as f:
+            f.truncate(self.SIZE)
+            for offset in range(0, self.SIZE, 4 * self.CHUNK):
+                f.seek(offset)
+                f.write(os.urandom(self.CHUNK))
+        return path
+
+    def convert(self, src, dst, options):
+        start = time.time()
+        qemuimg.convert(src, dst, srcFormat="raw", dstFormat="raw",
+                        **options).run()
+        return time.time() - start
+
+    def sectors_written(self, path):
+        dev = os.path.basename(path)
+        with io.open("/sys/block/%s/stat" % dev) as f:
+            return int(f.read().split()[6])
+
+    def report(self, target, mode, elapsed, name, size):
+        print("\ntarget=%s mode=%s elapsed=%.2fs %s=%.2f MiB"
+              % (target, mode, elapsed, name, size / 1024.0**2))
+
+
 def make_image(path, size, format, index, qcow2_compat, backing=None):
     qemuimg.create(path, size=size, format=format, qcow2Compat=qcow2_compat,
                    backing=backing)
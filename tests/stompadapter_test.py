@@ -17,10 +17,17 @@
 #
 # Refer to the README and COPYING files for full details of the license
 #
+from __future__ import print_function
 from collections import defaultdict
+import json
+import time
 
 from testlib import VdsmTestCase as TestCaseBase
+from testlib import expandPermutations, permutations
+from testValidation import stresstest
 from yajsonrpc import JsonRpcRequest
+from yajsonrpc import JsonRpcResponse
+from yajsonrpc import _JsonRpcServeRequestContext
 from yajsonrpc.betterAsyncore import Reactor
 from yajsonrpc.stomp import \
     Command, \
@@ -28,7 +35,9 @@ from yajsonrpc.stomp import \
     Headers, \
     SUBSCRIPTION_ID_REQUEST
 from yajsonrpc.stomp import AsyncDispatcher
+from yajsonrpc.stomp import SUBSCRIPTION_ID_RESPONSE
 from yajsonrpc.stompreactor import StompAdapterImpl
+from yajsonrpc.stompreactor import StompServer
 
 
 class FakeAsyncClient(object):
@@ -523,3 +532,118 @@ class ServerTimeoutTests(TestCaseBase):
 
         self.assertEqual(len(adapter._sub_ids), 0)
         self.assertEqual(len(destinations), 0)
+
+
+class FakeSubscriber(object):
+
+    def __init__(self, id):
+        self.id = id
+        self.client = self
+        self.frames = []
+
+    def is_closed(self):
+        return False
+
+    def send_raw(self, frame):
+        self.frames.append(frame)
+
+
+def _stomp_server(destinations, req_dest):
+    sub_map = {dest: [FakeSubscriber(dest + '-sub')] for dest in destinations}
+    return StompServer(Reactor(), sub_map), sub_map
+
+
+def _response(request_id, size=0):
+    return JsonRpcResponse({'data': 'x' * size}, None, request_id)
+
+
+@expandPermutations
+class StompServerTest(TestCaseBase):
+
+    def test_send_reply(self):
+        server, sub_map = _stomp_server(['replies'], {})
+        server._req_dest['id-1'] = 'replies'
+        server.send_reply(_response('id-1').encode(), ['id-1'])
+
+        frames = sub_map['replies'][0].frames
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(frames[0].headers[Headers.DESTINATION], 'replies')
+        self.assertEqual(json.loads(frames[0].body)['id'], 'id-1')
+        self.assertEqual(server._req_dest, {})
+
+    def test_send_reply_batch(self):
+        server, sub_map = _stomp_server(['replies'], {})
+        server._req_dest['id-1'] = 'replies'
+        server._req_dest['id-2'] = 'replies'
+        data = '[%s,%s]' % (_response('id-1').encode(),
+                            _response('id-2').encode())
+        server.send_reply(data, ['id-1', 'id-2'])
+
+        frames = sub_map['replies'][0].frames
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(len(json.loads(frames[0].body)), 2)
+        self.assertEqual(server._req_dest, {})
+
+    def test_send_reply_default_destination(self):
+        server, sub_map = _stomp_server([SUBSCRIPTION_ID_RESPONSE], {})
+        server.send_reply(_response('id-1').encode(), ['id-1'])
+        self.assertEqual(len(sub_map[SUBSCRIPTION_ID_RESPONSE][0].frames), 1)
+
+    def test_send_event(self):
+        # Events are sent as is, without parsing.
+        server, sub_map = _stomp_server(['events'], {})
+        server.send('not json', 'events')
+        self.assertEqual(sub_map['events'][0].frames[0].body, 'not json')
+
+    @permutations([
+        # request_ids
+        [['id-1']],
+        [['id-1', 'id-2']],
+    ])
+    def test_request_context(self, request_ids):
+        server, sub_map = _stomp_server(['replies'], {})
+        for request_id in request_ids:
+            server._req_dest[request_id] = 'replies'
+        ctx = _JsonRpcServeRequestContext(server, None, None)
+        ctx.setRequests([JsonRpcRequest('Host.ping', {}, request_id)
+                         for request_id in request_ids])
+        for request_id in request_ids:
+            ctx.requestDone(_response(request_id))
+
+        frames = sub_map['replies'][0].frames
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(server._req_dest, {})
+
+    @stresstest
+    @permutations([
+        # size
+        [1024],
+        [64 * 1024],
+        [1024 * 1024],
+        [8 * 1024 * 1024],
+    ])
+    def test_response_path_benchmark(self, size):
+        count = max(1, 64 * 1024 * 1024 // (size * 4))
+        server, sub_map = _stomp_server(['replies'], {})
+        response = _response('id', size)
+
+        start = time.time()
+        for _ in range(count):
+            server._req_dest['id'] = 'replies'
+            ctx = _JsonRpcServeRequestContext(server, None, None)
+            ctx.requestDone(response)
+        reply_elapsed = time.time() - start
+
+        # The previous implementation parsed every response again to find
+        # its id.
+        data = response.encode()
+        start = time.time()
+        for _ in range(count):
+            json.loads(data)
+        parse_elapsed = time.time() - start
+
+        print("\nsize=%d count=%d reply=%.6fs/msg parse=%.6fs/msg "
+              "saved=%.0f%%" % (size, count, reply_elapsed / count,
+                                parse_elapsed / count,
+                                100 * parse_elapsed /
+                                (reply_elapsed + parse_elapsed)))
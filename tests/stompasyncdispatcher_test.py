@@ -17,10 +17,13 @@
 #
 # Refer to the README and COPYING files for full details of the license
 #
+from __future__ import print_function
 import itertools
+import time
 from collections import deque
 
 from testlib import VdsmTestCase as TestCaseBase
+from testValidation import stresstest
 from yajsonrpc.stomp import (
     AsyncDispatcher,
     Command,
@@ -82,6 +85,30 @@ class FakeAsyncDispatcher(object):
         return len(data)
 
 
+class RecordingAsyncDispatcher(FakeAsyncDispatcher):
+    """
+    Accepts up to chunk_size bytes per send, like a socket with a full
+    buffer.
+    """
+
+    def __init__(self, chunk_size=None):
+        super(RecordingAsyncDispatcher, self).__init__('')
+        self.chunk_size = chunk_size
+        self.calls = []
+
+    def send(self, data):
+        data = data[:self.chunk_size]
+        self.calls.append(data.tobytes())
+        return len(data)
+
+
+class BuffersAsyncDispatcher(RecordingAsyncDispatcher):
+
+    def send_buffers(self, buffers):
+        self.calls.append([buf.tobytes() for buf in buffers])
+        return sum(len(buf) for buf in buffers)
+
+
 class FakeTimeGen(object):
 
     def __init__(self, list):
@@ -187,6 +214,48 @@ class AsyncDispatcherTest(TestCaseBase):
         dispatcher.handle_write(FakeAsyncDispatcher(''))
         self.assertFalse(frame_handler.has_outgoing_messages)
 
+    def test_handle_write_partial(self):
+        frame = Frame(command=Command.MESSAGE, body='x' * 100000)
+        frame_handler = FakeFrameHandler()
+        frame_handler.queue_frame(frame)
+        dispatcher = AsyncDispatcher(FakeConnection(), frame_handler)
+        async_dispatcher = RecordingAsyncDispatcher(chunk_size=1000)
+
+        while dispatcher.writable(None):
+            dispatcher.handle_write(async_dispatcher)
+
+        self.assertEqual(''.join(async_dispatcher.calls), frame.encode())
+
+    def test_handle_write_coalesce(self):
+        frames = [Frame(command=Command.MESSAGE, body='event %d' % i)
+                  for i in range(10)]
+        frame_handler = FakeFrameHandler()
+        for frame in frames:
+            frame_handler.queue_frame(frame)
+        dispatcher = AsyncDispatcher(FakeConnection(), frame_handler)
+        async_dispatcher = RecordingAsyncDispatcher()
+
+        dispatcher.handle_write(async_dispatcher)
+
+        self.assertEqual(async_dispatcher.calls,
+                         [''.join(frame.encode() for frame in frames)])
+        self.assertFalse(dispatcher.writable(None))
+
+    def test_handle_write_send_buffers(self):
+        body = 'x' * 100000
+        frame = Frame(command=Command.MESSAGE, body=body)
+        frame_handler = FakeFrameHandler()
+        frame_handler.queue_frame(frame)
+        dispatcher = AsyncDispatcher(FakeConnection(), frame_handler)
+        async_dispatcher = BuffersAsyncDispatcher()
+
+        dispatcher.handle_write(async_dispatcher)
+
+        self.assertEqual(len(async_dispatcher.calls), 1)
+        headers, sent_body, terminator = async_dispatcher.calls[0]
+        self.assertEqual(sent_body, body)
+        self.assertEqual(headers + sent_body + terminator, frame.encode())
+
     def test_handle_close(self):
         connection = FakeConnection()
         dispatcher = AsyncDispatcher(connection, FakeFrameHandler())
@@ -194,3 +263,33 @@ class AsyncDispatcherTest(TestCaseBase):
         dispatcher.handle_close(None)
 
         self.assertTrue(connection.closed)
+
+
+class AsyncDispatcherBenchmark(TestCaseBase):
+
+    @stresstest
+    def test_large_response(self):
+        # A 16 MiB response sent over a slow link accepting 16 KiB per send.
+        body = 'x' * (16 * 1024**2)
+        chunk_size = 16 * 1024
+
+        start = time.time()
+        data = Frame(command=Command.MESSAGE, body=body).encode()
+        while data:
+            sent = len(data[:chunk_size])
+            data = data[sent:]
+        copy_elapsed = time.time() - start
+
+        frame_handler = FakeFrameHandler()
+        frame_handler.queue_frame(Frame(command=Command.MESSAGE, body=body))
+        dispatcher = AsyncDispatcher(FakeConnection(), frame_handler)
+        async_dispatcher = FakeAsyncDispatcher('')
+        async_dispatcher.send = lambda data: len(data[:chunk_size])
+
+        start = time.time()
+        while dispatcher.writable(None):
+            dispatcher.handle_write(async_dispatcher)
+        view_elapsed = time.time() - start
+
+        print("\nsize=%d chunk=%d copy=%.3fs memoryview=%.3fs"
+              % (len(body), chunk_size, copy_elapsed, view_elapsed))
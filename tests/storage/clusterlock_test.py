@@ -21,6 +21,7 @@
 import time
 import pytest
 from fakesanlock import FakeSanlock
+from testlib import make_config
 from vdsm.common import concurrent
 from vdsm.storage import clusterlock
 from vdsm.storage import exception as se
@@ -36,6 +37,8 @@ LEASE = clusterlock.Lease("SDM", "leases", 1024**2)
 def fake_sanlock(monkeypatch):
     fs = FakeSanlock()
     monkeypatch.setattr(clusterlock, "sanlock", fs)
+    monkeypatch.setattr(clusterlock, "_lockspace_status",
+                        clusterlock.LockspaceStatus())
     # FakeSanlock does not implement the depracated init_resource, so we will
     # create the resource using write_resource, so we can test acquire and
     # release.
@@ -118,7 +121,7 @@ def test_acquire_wait_until_host_id_is_acquired(fake_sanlock):
     assert res["acquired"]
 
 
-def test_acquire_after_inq_lockspace_failure(fake_sanlock):
+def test_acquire_after_lockspace_status_failure(fake_sanlock):
     sl = clusterlock.SANLock(LS_NAME, LS_PATH, LEASE)
     # Starts async host id acquire...
     sl.acquireHostId(HOST_ID, async=True)
@@ -127,7 +130,8 @@ def test_acquire_after_inq_lockspace_failure(fake_sanlock):
         time.sleep(0.3)
 
         # Simulate failing hasHostId...
-        fake_sanlock.errors["inq_lockspace"] = fake_sanlock.SanlockException(1)
+        fake_sanlock.errors["get_lockspaces"] = \
+            fake_sanlock.SanlockException(1)
         try:
             sl.hasHostId(HOST_ID)
         except fake_sanlock.SanlockException:
@@ -137,7 +141,7 @@ def test_acquire_after_inq_lockspace_failure(fake_sanlock):
 
         # Make the next try successful
         fake_sanlock.complete_async(LS_NAME)
-        del fake_sanlock.errors["inq_lockspace"]
+        del fake_sanlock.errors["get_lockspaces"]
         sl.hasHostId(HOST_ID)
 
     t = concurrent.thread(monitor)
@@ -166,3 +170,99 @@ def test_acquire_after_relases_host_id(fake_sanlock):
     sl.acquireHostId(HOST_ID, async=False)
     sl.releaseHostId(HOST_ID, async=False, unused=False)
     pytest.raises(concurrent.InvalidEvent, sl.acquire, HOST_ID, LEASE)
+
+
+class CountingSanlock(FakeSanlock):
+
+    def __init__(self):
+        super(CountingSanlock, self).__init__()
+        self.calls = []
+
+    def get_lockspaces(self):
+        self.calls.append("get_lockspaces")
+        return super(CountingSanlock, self).get_lockspaces()
+
+    def get_hosts(self, lockspace, host_id=0):
+        self.calls.append("get_hosts")
+        return super(CountingSanlock, self).get_hosts(lockspace, host_id)
+
+
+@pytest.fixture
+def counting_sanlock(monkeypatch):
+    fs = CountingSanlock()
+    monkeypatch.setattr(clusterlock, "sanlock", fs)
+    monkeypatch.setattr(clusterlock, "_lockspace_status",
+                        clusterlock.LockspaceStatus())
+    monkeypatch.setattr(clusterlock.SANLock, "STATUS_NAME", {
+        fs.HOST_UNKNOWN: clusterlock.HOST_STATUS_UNKNOWN,
+        fs.HOST_FREE: clusterlock.HOST_STATUS_FREE,
+        fs.HOST_LIVE: clusterlock.HOST_STATUS_LIVE,
+        fs.HOST_FAIL: clusterlock.HOST_STATUS_FAIL,
+        fs.HOST_DEAD: clusterlock.HOST_STATUS_DEAD,
+    })
+    return fs
+
+
+def test_has_host_id_shared(counting_sanlock):
+    locks = []
+    for i in range(3):
+        sl = clusterlock.SANLock("sd-%d" % i, LS_PATH, LEASE)
+        sl.acquireHostId(HOST_ID, async=False)
+        locks.append(sl)
+
+    for sl in locks:
+        assert sl.hasHostId(HOST_ID)
+
+    assert counting_sanlock.calls == ["get_lockspaces"]
+
+
+def test_has_host_id_other_lockspace(counting_sanlock):
+    sl = clusterlock.SANLock(LS_NAME, LS_PATH, LEASE)
+    assert not sl.hasHostId(HOST_ID)
+
+
+def test_has_host_id_adding_not_cached(counting_sanlock):
+    sl = clusterlock.SANLock(LS_NAME, LS_PATH, LEASE)
+    sl.acquireHostId(HOST_ID, async=True)
+    assert sl.hasHostId(HOST_ID) is None
+
+    counting_sanlock.complete_async(LS_NAME)
+    assert sl.hasHostId(HOST_ID)
+    assert counting_sanlock.calls == ["get_lockspaces", "get_lockspaces"]
+
+
+def test_has_host_id_after_release(counting_sanlock):
+    sl = clusterlock.SANLock(LS_NAME, LS_PATH, LEASE)
+    sl.acquireHostId(HOST_ID, async=False)
+    assert sl.hasHostId(HOST_ID)
+
+    sl.releaseHostId(HOST_ID, async=False, unused=False)
+    assert not sl.hasHostId(HOST_ID)
+
+
+def test_has_host_id_timeout(counting_sanlock, monkeypatch):
+    monkeypatch.setattr(clusterlock, "config", make_config([
+        ("irs", "lockspace_status_timeout", "0")]))
+    sl = clusterlock.SANLock(LS_NAME, LS_PATH, LEASE)
+    sl.acquireHostId(HOST_ID, async=False)
+    sl.hasHostId(HOST_ID)
+    sl.hasHostId(HOST_ID)
+    assert counting_sanlock.calls == ["get_lockspaces", "get_lockspaces"]
+
+
+def test_get_host_status(counting_sanlock):
+    sl = clusterlock.SANLock(LS_NAME, LS_PATH, LEASE)
+    sl.acquireHostId(HOST_ID, async=False)
+
+    assert sl.getHostStatus(HOST_ID) == clusterlock.HOST_STATUS_LIVE
+    assert sl.getHostStatus(HOST_ID + 1) == clusterlock.HOST_STATUS_FREE
+    assert counting_sanlock.calls == ["get_hosts"]
+
+
+def test_get_host_status_unavailable(counting_sanlock):
+    sl = clusterlock.SANLock(LS_NAME, LS_PATH, LEASE)
+    assert sl.getHostStatus(HOST_ID) == clusterlock.HOST_STATUS_UNAVAILABLE
+
+    # Errors are not cached.
+    sl.acquireHostId(HOST_ID, async=False)
+    assert sl.getHostStatus(HOST_ID) == clusterlock.HOST_STATUS_LIVE
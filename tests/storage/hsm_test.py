@@ -18,6 +18,8 @@
 # Refer to the README and COPYING files for full details of the license
 #
 
+import time
+
 from contextlib import contextmanager
 
 from monkeypatch import MonkeyPatchScope
@@ -31,10 +33,13 @@ from storage.storagetestlib import (
     make_file_volume,
 )
 
+from vdsm.common.threadlocal import vars
 from vdsm.storage import constants as sc
 from vdsm.storage import exception as se
 from vdsm.storage import hsm
 from vdsm.storage import qemuimg
+from vdsm.storage import sd
+from vdsm.storage import storageServer
 
 
 class FakeHSM(hsm.HSM):
@@ -141,3 +146,126 @@ class TestVerifyUntrustedVolume(VdsmTestCase):
             make_file_volume(env.sd_manifest, self.SIZE, img_id, vol_id,
                              vol_format=vol_fmt)
             yield env.sd_manifest.produceVolume(img_id, vol_id)
+
+
+class FakeTask(object):
+    id = "fake-task"
+
+    def setDefaultException(self, exc):
+        pass
+
+
+class FakeConnection(object):
+
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+
+    def connect(self):
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+
+
+class FakeSDCache(object):
+
+    def __init__(self):
+        self.knownSDs = {}
+        self.refreshed = 0
+        self.invalidated = 0
+
+    def refreshStorage(self):
+        self.refreshed += 1
+
+    def invalidateStorage(self):
+        self.invalidated += 1
+
+    def manuallyRemoveDomain(self, sdUUID):
+        pass
+
+
+class ConnectHSM(FakeHSM):
+
+    def __init__(self):
+        self.prefetched = []
+
+    def _connectStorageOverIser(self, conDef, conObj, conTypeId):
+        pass
+
+    def _HSM__prefetchDomains(self, domType, conObj):
+        self.prefetched.append(conObj)
+        return {}
+
+
+class TestConnectStorageServer(VdsmTestCase):
+
+    @contextmanager
+    def connections(self, cons, workers=8):
+        cache = FakeSDCache()
+        cfg = make_config([("irs", "connect_storage_workers", str(workers))])
+        with MonkeyPatchScope([
+            (hsm, "config", cfg),
+            (hsm, "sdCache", cache),
+            (hsm, "_connectionDict2ConnectionInfo",
+             lambda domType, conDef: conDef["id"]),
+            (storageServer.ConnectionFactory, "createConnection",
+             lambda cls, conInfo: cons[conInfo]),
+            (vars, "task", FakeTask()),
+        ]):
+            yield cache
+
+    def conList(self, cons):
+        return [{"id": con_id} for con_id in sorted(cons)]
+
+    def test_statuses(self):
+        cons = {
+            "a": FakeConnection(),
+            "b": FakeConnection(error=se.MountError()),
+            "c": FakeConnection(),
+        }
+        with self.connections(cons):
+            res = ConnectHSM().connectStorageServer(
+                sd.NFS_DOMAIN, None, self.conList(cons))
+        self.assertEqual(res["statuslist"], [
+            {"id": "a", "status": 0},
+            {"id": "b", "status": se.MountError.code},
+            {"id": "c", "status": 0},
+        ])
+
+    def test_block_refresh_once(self):
+        cons = dict((str(i), FakeConnection()) for i in range(16))
+        h = ConnectHSM()
+        with self.connections(cons) as cache:
+            h.connectStorageServer(sd.ISCSI_DOMAIN, None, self.conList(cons))
+        self.assertEqual(cache.refreshed, 1)
+        self.assertEqual(len(h.prefetched), 1)
+        self.assertEqual(cache.invalidated, 1)
+
+    def test_block_all_failed(self):
+        cons = {"a": FakeConnection(error=RuntimeError())}
+        h = ConnectHSM()
+        with self.connections(cons) as cache:
+            h.connectStorageServer(sd.ISCSI_DOMAIN, None, self.conList(cons))
+        self.assertEqual(cache.refreshed, 0)
+        self.assertEqual(h.prefetched, [])
+
+    def test_file_prefetch_each(self):
+        cons = {
+            "a": FakeConnection(),
+            "b": FakeConnection(error=se.MountError()),
+            "c": FakeConnection(),
+        }
+        h = ConnectHSM()
+        with self.connections(cons) as cache:
+            h.connectStorageServer(sd.NFS_DOMAIN, None, self.conList(cons))
+        self.assertEqual(cache.refreshed, 0)
+        self.assertEqual(h.prefetched, [cons["a"], cons["c"]])
+
+    def test_concurrent(self):
+        cons = dict((str(i), FakeConnection(delay=0.5)) for i in range(8))
+        with self.connections(cons, workers=8):
+            start = time.time()
+            ConnectHSM().connectStorageServer(
+                sd.ISCSI_DOMAIN, None, self.conList(cons))
+            elapsed = time.time() - start
+        self.assertLess(elapsed, 2.0)
@@ -0,0 +1,359 @@
+#
+# Copyright 2017 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+#
+# Refer to the README and COPYING files for full details of the license
+#
+
+from __future__ import absolute_import
+from __future__ import print_function
+
+import io
+import os
+import socket
+import ssl
+import threading
+import time
+
+from contextlib import closing
+from contextlib import contextmanager
+
+import pytest
+
+from six.moves import BaseHTTPServer
+from six.moves import http_client
+
+from integration.sslhelper import KEY_FILE, CRT_FILE
+from testlib import make_config
+from vdsm.common import exception
+from vdsm.storage import exception as se
+from vdsm.storage import imageSharing
+
+MiB = 1024**2
+BUFSIZE = imageSharing.DIRECT_BUFFER_SIZE
+
+
+@pytest.fixture(params=["direct", "dd"])
+def transfer_method(request, monkeypatch):
+    cfg = make_config([('irs', 'image_transfer_method', request.param)])
+    monkeypatch.setattr(imageSharing, "config", cfg)
+    return request.param
+
+
+@pytest.fixture
+def direct_method(monkeypatch):
+    cfg = make_config([('irs', 'image_transfer_method', 'direct')])
+    monkeypatch.setattr(imageSharing, "config", cfg)
+
+
+def image_data(size):
+    # Data blocks separated by zero blocks.
+    data = bytearray(size)
+    for offset in range(0, size, 2 * BUFSIZE):
+        block = os.urandom(min(BUFSIZE, size - offset))
+        data[offset:offset + len(block)] = block
+    return bytes(data)
+
+
+def create_volume(tmpdir, size, fill=None):
+    path = str(tmpdir.join("volume"))
+    with io.open(path, "wb") as f:
+        if fill is None:
+            f.truncate(size)
+        else:
+            f.write(fill * size)
+    return path
+
+
+def read_volume(path):
+    with io.open(path, "rb") as f:
+        return f.read()
+
+
+class TestCopyToImage:
+
+    @pytest.mark.parametrize("size", [
+        0,
+        4096,
+        BUFSIZE,
+        3 * BUFSIZE,
+        3 * BUFSIZE + 4096,
+        3 * BUFSIZE + 42,
+        1000,
+    ])
+    def test_copy(self, tmpdir, transfer_method, size):
+        data = image_data(size)
+        path = create_volume(tmpdir, size)
+        methodArgs = {"fileObj": io.BytesIO(data), "length": size}
+        imageSharing.copyToImage(path, methodArgs)
+        assert read_volume(path) == data
+
+    def test_sparse(self, tmpdir, direct_method):
+        size = 4 * BUFSIZE
+        data = image_data(size)
+        path = create_volume(tmpdir, size)
+        transfer = imageSharing.Transfer(path, io.BytesIO(data), size)
+        transfer.receive()
+        assert read_volume(path) == data
+        assert transfer.skipped == 2 * BUFSIZE
+
+    def test_zero_allocated(self, tmpdir, direct_method):
+        # Zero blocks must be written to allocated areas.
+        size = 2 * BUFSIZE
+        path = create_volume(tmpdir, size, fill=b"x")
+        data = b"\0" * size
+        transfer = imageSharing.Transfer(path, io.BytesIO(data), size)
+        transfer.receive()
+        assert read_volume(path) == data
+        assert transfer.skipped == 0
+
+    def test_zero_beyond_end(self, tmpdir, direct_method):
+        # Zero blocks after end of file must be written to extend the file.
+        size = 2 * BUFSIZE + 42
+        path = create_volume(tmpdir, 0)
+        data = b"\0" * size
+        imageSharing.Transfer(path, io.BytesIO(data), size).receive()
+        assert read_volume(path) == data
+
+    def test_partial_data(self, tmpdir, transfer_method):
+        size = 2 * BUFSIZE
+        path = create_volume(tmpdir, size)
+        methodArgs = {"fileObj": io.BytesIO(b"x" * BUFSIZE), "length": size}
+        with pytest.raises(se.MiscFileReadException):
+            imageSharing.copyToImage(path, methodArgs)
+
+    def test_progress(self, tmpdir, direct_method):
+        size = 2 * BUFSIZE
+        path = create_volume(tmpdir, size)
+        transfer = imageSharing.Transfer(path, io.BytesIO(b"x" * size), size)
+        assert transfer.progress == 0.0
+        transfer.receive()
+        assert transfer.progress == 100.0
+        assert transfer.done == size
+
+
+class TestCopyFromImage:
+
+    @pytest.mark.parametrize("size", [
+        4096,
+        3 * BUFSIZE,
+        3 * BUFSIZE + 42,
+    ])
+    def test_copy(self, tmpdir, transfer_method, size):
+        data = image_data(size)
+        path = str(tmpdir.join("volume"))
+        with io.open(path, "wb") as f:
+            f.write(data)
+        out = io.BytesIO()
+        methodArgs = {"fileObj": out, "length": size}
+        imageSharing.copyFromImage(path, methodArgs)
+        assert out.getvalue() == data
+
+    @pytest.mark.parametrize("size", [
+        4096,
+        3 * BUFSIZE + 42,
+    ])
+    def test_copy_to_socket(self, tmpdir, direct_method, size):
+        data = image_data(size)
+        path = str(tmpdir.join("volume"))
+        with io.open(path, "wb") as f:
+            f.write(data)
+        received = []
+        a, b = socket_pair()
+        with closing(a), closing(b):
+            # Use a timeout, like the http server, to test non-blocking sends.
+            a.settimeout(5)
+            t = threading.Thread(target=lambda: received.append(recvall(b)))
+            t.daemon = True
+            t.start()
+            with closing(a.makefile("wb")) as out:
+                methodArgs = {"fileObj": out, "length": size}
+                imageSharing.copyFromImage(path, methodArgs)
+            a.shutdown(socket.SHUT_WR)
+            t.join()
+        assert received[0] == data
+
+    def test_partial_data(self, tmpdir, transfer_method):
+        path = create_volume(tmpdir, BUFSIZE)
+        methodArgs = {"fileObj": io.BytesIO(), "length": 2 * BUFSIZE}
+        with pytest.raises(se.MiscFileReadException):
+            imageSharing.copyFromImage(path, methodArgs)
+
+
+def test_invalid_method(tmpdir, monkeypatch):
+    cfg = make_config([('irs', 'image_transfer_method', 'invalid')])
+    monkeypatch.setattr(imageSharing, "config", cfg)
+    path = create_volume(tmpdir, 4096)
+    methodArgs = {"fileObj": io.BytesIO(b"x" * 4096), "length": 4096}
+    with pytest.raises(exception.InvalidConfiguration):
+        imageSharing.copyToImage(path, methodArgs)
+
+
+def test_unaligned_buffer(tmpdir):
+    with pytest.raises(ValueError):
+        imageSharing.Transfer("/no/such/volume", io.BytesIO(), 4096,
+                              bufsize=1000)
+
+
+def socket_pair():
+    """
+    Return connected TCP sockets. On Python 2 socket.socketpair() returns raw
+    sockets, and makefile() returns a plain file instead of a socket file.
+    """
+    with closing(socket.socket()) as listener:
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(1)
+        a = socket.create_connection(listener.getsockname())
+        b, _ = listener.accept()
+    return a, b
+
+
+def recvall(sock):
+    chunks = []
+    while True:
+        chunk = sock.recv(BUFSIZE)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+class ImageHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Stand-in for rpc.http.ImageRequestHandler, streaming image data between
+    the request socket and the volume.
+    """
+
+    protocol_version = "HTTP/1.1"
+    timeout = 60
+
+    def do_PUT(self):
+        size = int(self.headers["content-length"])
+        methodArgs = {"fileObj": self.rfile, "length": size}
+        imageSharing.copyToImage(self.server.volume, methodArgs)
+        self.send_response(200)
+        self.send_header("content-length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        size = os.path.getsize(self.server.volume)
+        self.send_response(200)
+        self.send_header("content-length", str(size))
+        self.end_headers()
+        methodArgs = {"fileObj": self.wfile, "length": size}
+        imageSharing.copyFromImage(self.server.volume, methodArgs)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def image_server(volume, use_ssl=False):
+    server = BaseHTTPServer.HTTPServer(("127.0.0.1", 0), ImageHandler)
+    if use_ssl:
+        server.socket = ssl.wrap_socket(server.socket, keyfile=KEY_FILE,
+                                        certfile=CRT_FILE, server_side=True)
+    server.volume = volume
+    t = threading.Thread(target=server.serve_forever)
+    t.daemon = True
+    t.start()
+    try:
+        yield server.server_address
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def no_sendfile(*args):
+    raise AssertionError("sendfile() used on a TLS connection")
+
+
+@pytest.mark.parametrize("size", [
+    4096,
+    3 * BUFSIZE + 42,
+])
+def test_download_over_ssl(tmpdir, monkeypatch, direct_method, size):
+    # sendfile() would bypass the TLS layer, sending plain data.
+    monkeypatch.setattr(imageSharing, "_sendfile", no_sendfile)
+    data = image_data(size)
+    path = str(tmpdir.join("volume"))
+    with io.open(path, "wb") as f:
+        f.write(data)
+    with image_server(path, use_ssl=True) as (host, port):
+        context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+        con = http_client.HTTPSConnection(host, port, context=context)
+        with closing(con):
+            con.request("GET", "/")
+            res = con.getresponse()
+            assert res.status == 200
+            assert res.read() == data
+
+
+def test_socket_fileno_plain():
+    a, b = socket_pair()
+    with closing(a), closing(b):
+        with closing(a.makefile("wb")) as f:
+            assert imageSharing._socketFileno(f) == a.fileno()
+
+
+def test_socket_fileno_ssl():
+    a, b = socket_pair()
+    with closing(a), closing(b):
+        sock = ssl.wrap_socket(a, keyfile=KEY_FILE, certfile=CRT_FILE,
+                               server_side=True, do_handshake_on_connect=False)
+        with closing(sock.makefile("wb")) as f:
+            assert imageSharing._socketFileno(f) is None
+
+
+def test_socket_fileno_file(tmpdir):
+    path = str(tmpdir.join("file"))
+    with io.open(path, "wb") as f:
+        assert imageSharing._socketFileno(f) is None
+
+
+@pytest.mark.stress
+@pytest.mark.parametrize("sparse", [True, False])
+def test_benchmark(tmpdir, monkeypatch, sparse):
+    size = 512 * MiB
+    if sparse:
+        # Mostly zero image with some data.
+        data = image_data(64 * MiB) + b"\0" * (size - 64 * MiB)
+    else:
+        data = os.urandom(64 * MiB) * 8
+    path = create_volume(tmpdir, size)
+
+    for method in ("dd", "direct"):
+        cfg = make_config([('irs', 'image_transfer_method', method)])
+        monkeypatch.setattr(imageSharing, "config", cfg)
+        with image_server(path) as (host, port):
+            con = http_client.HTTPConnection(host, port)
+            with closing(con):
+                start = time.time()
+                con.request("PUT", "/", body=data)
+                con.getresponse().read()
+                put_elapsed = time.time() - start
+
+                start = time.time()
+                con.request("GET", "/")
+                res = con.getresponse()
+                while res.read(BUFSIZE):
+                    pass
+                get_elapsed = time.time() - start
+
+        print("\nmethod=%s sparse=%s upload=%.2fs (%.0f MiB/s) "
+              "download=%.2fs (%.0f MiB/s)"
+              % (method, sparse, put_elapsed, size / MiB / put_elapsed,
+                 get_elapsed, size / MiB / get_elapsed))
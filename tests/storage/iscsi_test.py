@@ -1,10 +1,12 @@
 import os
+import threading
 from contextlib import contextmanager
 
 import six
 import pytest
 
 from monkeypatch import MonkeyPatch
+from monkeypatch import MonkeyPatchScope
 from testlib import VdsmTestCase
 from testlib import make_config
 from testlib import expandPermutations, permutations
@@ -51,6 +53,87 @@ class TestRescanTimeout(VdsmTestCase):
             iscsi.rescan()
 
 
+class FakeIscsiadm(object):
+
+    def __init__(self, login_time):
+        self.login_time = login_time
+        self.nodes = set()
+
+    def node_new(self, iface, portal, targetName):
+        self.nodes.add((iface, portal, targetName))
+
+    def node_update(self, iface, portal, targetName, key, value,
+                    hideValue=False):
+        pass
+
+    def node_login_async(self, iface, portal, targetName):
+        proc = commands.execCmd(["sleep", str(self.login_time)], sync=False)
+        return utils.AsyncProcessOperation(proc)
+
+    def node_disconnect(self, iface, portal, targetName):
+        pass
+
+    def node_delete(self, iface, portal, targetName):
+        self.nodes.discard((iface, portal, targetName))
+
+
+class TestAddIscsiNode(VdsmTestCase):
+
+    @contextmanager
+    def fake_iscsiadm(self, login_time, timeout=10):
+        fake = FakeIscsiadm(login_time)
+        cfg = make_config([("irs", "iscsi_login_timeout", str(timeout))])
+        with MonkeyPatchScope([
+            (iscsiadm, "node_new", fake.node_new),
+            (iscsiadm, "node_update", fake.node_update),
+            (iscsiadm, "node_login_async", fake.node_login_async),
+            (iscsiadm, "node_disconnect", fake.node_disconnect),
+            (iscsiadm, "node_delete", fake.node_delete),
+            (iscsi, "setRpFilterIfNeeded", lambda *args: None),
+            (iscsi, "config", cfg),
+        ]):
+            yield fake
+
+    def target(self, n):
+        portal = iscsi.IscsiPortal("10.0.0.%d" % n, 3260)
+        return iscsi.IscsiTarget(portal, 1, "iqn.2017-05.com.example:t%d" % n)
+
+    @pytest.mark.skipif(six.PY3, reason="using AsyncProc")
+    def test_login(self):
+        iface = iscsi.IscsiInterface("default", netIfaceName="eth0")
+        with self.fake_iscsiadm(0) as fake:
+            iscsi.addIscsiNode(iface, self.target(1))
+        self.assertEqual(len(fake.nodes), 1)
+
+    @pytest.mark.skipif(six.PY3, reason="using AsyncProc")
+    def test_login_timeout(self):
+        iface = iscsi.IscsiInterface("default", netIfaceName="eth0")
+        with self.fake_iscsiadm(3, timeout=1) as fake:
+            start = time.monotonic_time()
+            with self.assertRaises(iscsiadm.IscsiLoginTimeout):
+                iscsi.addIscsiNode(iface, self.target(1))
+            elapsed = time.monotonic_time() - start
+        self.assertLess(elapsed, 2.0)
+        self.assertEqual(fake.nodes, set())
+
+    @pytest.mark.skipif(six.PY3, reason="using AsyncProc")
+    def test_concurrent_login(self):
+        iface = iscsi.IscsiInterface("default", netIfaceName="eth0")
+        threads = []
+        with self.fake_iscsiadm(0.5) as fake:
+            start = time.monotonic_time()
+            for n in range(4):
+                t = threading.Thread(target=iscsi.addIscsiNode,
+                                     args=(iface, self.target(n)))
+                t.start()
+                threads.append(t)
+            for t in threads:
+                t.join()
+            elapsed = time.monotonic_time() - start
+        self.assertLess(elapsed, 1.5)
+        self.assertEqual(len(fake.nodes), 4)
+
+
 class TestIscsiAdm(VdsmTestCase):
     def testIfaceList(self):
         dirName = os.path.dirname(os.path.realpath(__file__))
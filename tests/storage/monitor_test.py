@@ -26,6 +26,9 @@ from contextlib import contextmanager
 
 from six.moves import queue
 
+from vdsm import executor
+from vdsm import schedule
+from vdsm.common.time import monotonic_time
 from vdsm.storage import exception as se
 from vdsm.storage import monitor
 
@@ -70,6 +73,12 @@ class FakeCheckService(object):
     def __init__(self):
         self.checkers = {}
 
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
     def start_checking(self, path, complete, interval=10.0):
         log.info("Start checking %r", path)
         if path in self.checkers:
@@ -178,12 +187,12 @@ class FakeCheckResult(object):
 
 class MonitorEnv(object):
 
-    def __init__(self, thread, event, checker):
-        self.thread = thread
+    def __init__(self, task, event, checker):
+        self.task = task
         self.event = event
         self.checker = checker
         self.queue = queue.Queue()
-        self.thread.cycleCallback = self._callback
+        self.task.cycleCallback = self._callback
 
     def wait_for_cycle(self):
         try:
@@ -206,29 +215,34 @@ def monitor_env(shutdown=False, refresh=300):
     ]):
         event = FakeEvent()
         checker = FakeCheckService()
-        thread = monitor.MonitorThread('uuid', 'host_id', MONITOR_INTERVAL,
-                                       event, checker)
+        scheduler = schedule.Scheduler(clock=monotonic_time)
+        scheduler.start()
+        workers = executor.Executor("monitor", 2, 10, scheduler,
+                                    max_workers=4)
+        workers.start()
+        task = monitor.MonitorTask('uuid', 'host_id', MONITOR_INTERVAL,
+                                   event, checker, scheduler, workers)
         try:
-            yield MonitorEnv(thread, event, checker)
+            yield MonitorEnv(task, event, checker)
         finally:
-            thread.stop(shutdown=shutdown)
-            try:
-                thread.join()
-            except RuntimeError as e:
-                log.error("Error joining thread: %s", e)
+            task.stop(shutdown=shutdown)
+            task.join()
+            workers.stop()
+            scheduler.stop()
 
 
-class TestMonitorThreadIdle(VdsmTestCase):
+class TestMonitorTaskIdle(VdsmTestCase):
 
     def test_initial_status(self):
-        thread = monitor.MonitorThread('uuid', 'host_id', 0.2, None, None)
-        status = thread.getStatus()
+        task = monitor.MonitorTask('uuid', 'host_id', 0.2, None, None, None,
+                                   None)
+        status = task.getStatus()
         self.assertFalse(status.actual)
         self.assertTrue(status.valid)
 
 
 @expandPermutations
-class TestMonitorThreadSetup(VdsmTestCase):
+class TestMonitorTaskSetup(VdsmTestCase):
 
     # in this state we do:
     # 1. If refresh timeout has expired, remove the domain from the cache
@@ -247,18 +261,18 @@ class TestMonitorThreadSetup(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
             env.wait_for_cycle()
             _, interval = env.checker.checkers[domain.getMonitoringPath()]
             self.assertEqual(interval, MONITOR_INTERVAL)
 
     def test_produce_retry(self):
         with monitor_env() as env:
-            env.thread.start()
+            env.task.start()
 
             # First cycle will fail since domain does not exist
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertTrue(status.actual)
             self.assertFalse(status.valid)
             self.assertIsInstance(status.error, se.StorageDomainDoesNotExist)
@@ -267,7 +281,7 @@ class TestMonitorThreadSetup(VdsmTestCase):
 
             # Second cycle will fail but no event should be emitted
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertFalse(status.valid)
             self.assertIsInstance(status.error, se.StorageDomainDoesNotExist)
             self.assertEqual(env.event.received, [])
@@ -277,13 +291,13 @@ class TestMonitorThreadSetup(VdsmTestCase):
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertTrue(status.valid)
             self.assertEqual(env.event.received, [])
 
             # When path status is available, emit event
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertTrue(status.valid)
             self.assertEqual(env.event.received, [(('uuid', True), {})])
 
@@ -294,11 +308,11 @@ class TestMonitorThreadSetup(VdsmTestCase):
             domain = FakeDomain("uuid", iso_dir="/path")
             domain.errors["isISO"] = exception
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
 
             # First cycle will fail in domain.isISO
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertTrue(status.actual)
             self.assertIsNone(status.isoPrefix)
             self.assertFalse(status.valid)
@@ -308,7 +322,7 @@ class TestMonitorThreadSetup(VdsmTestCase):
 
             # Second cycle will fail but no event should be emitted
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertFalse(status.valid)
             self.assertIsInstance(status.error, exception)
             self.assertEqual(env.event.received, [])
@@ -317,14 +331,14 @@ class TestMonitorThreadSetup(VdsmTestCase):
             # we don't have path status yet.
             del domain.errors["isISO"]
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertEqual(status.isoPrefix, domain.iso_dir)
             self.assertTrue(status.valid)
             self.assertEqual(env.event.received, [])
 
             # When path status is available, emit event
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertTrue(status.valid)
             self.assertEqual(env.event.received, [(('uuid', True), {})])
 
@@ -334,7 +348,7 @@ class TestMonitorThreadSetup(VdsmTestCase):
             domain = FakeDomain("uuid", iso_dir="/path")
             domain.errors["isISO"] = OSError
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
 
             # Domain will be removed after the refresh timeout
             env.wait_for_cycle()
@@ -346,7 +360,7 @@ class TestMonitorThreadSetup(VdsmTestCase):
 
 
 @expandPermutations
-class TestMonitorThreadMonitoring(VdsmTestCase):
+class TestMonitorTaskMonitoring(VdsmTestCase):
 
     # In this state we do:
     # 1. If refresh timeout has expired, remove the domain from the cache
@@ -370,17 +384,17 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
 
             # First cycle suceeds, but path status is not avialale yet
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertFalse(status.actual)
             self.assertEqual(env.event.received, [])
 
             # When path succeeds, emit VALID event
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertTrue(status.actual)
             self.assertTrue(status.valid)
             self.assertEqual(env.event.received, [(('uuid', True), {})])
@@ -401,11 +415,11 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             domain = FakeDomain("uuid")
             domain.errors[method] = exception
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
 
             # First cycle fail, emit event without waiting for path status
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertTrue(status.actual)
             self.assertFalse(status.valid)
             self.assertIsInstance(status.error, exception)
@@ -416,18 +430,18 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
 
             # First cycle succeed, but path status is not available yet
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertFalse(status.actual)
             self.assertEqual(env.event.received, [])
 
             # When path fail, emit INVALID event
             env.checker.complete(domain.getMonitoringPath(),
                                  FakeCheckResult(exception))
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertTrue(status.actual)
             self.assertFalse(status.valid)
             self.assertIsInstance(status.error, exception)
@@ -449,7 +463,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             domain = FakeDomain("uuid")
             domain.errors[method] = exception
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
 
             # First cycle fail, and emit INVALID event
             env.wait_for_cycle()
@@ -459,7 +473,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             # is emitted.
             env.wait_for_cycle()
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertTrue(status.actual)
             self.assertFalse(status.valid)
             self.assertEqual(env.event.received, [])
@@ -467,7 +481,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             # When next cycle succeeds, emit VALID event
             del domain.errors[method]
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertTrue(status.valid)
             self.assertEqual(env.event.received, [(('uuid', True), {})])
 
@@ -476,7 +490,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
 
             # First cycle succeed, but path status fail, emit INVALID event
             env.wait_for_cycle()
@@ -487,7 +501,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             # Both domain status and pass status succeed, emit VALID event
             env.wait_for_cycle()
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertTrue(status.valid)
             self.assertEqual(env.event.received, [(('uuid', True), {})])
 
@@ -495,7 +509,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
 
             # Both domain status and path status succeed and emit VALID event
             env.wait_for_cycle()
@@ -506,7 +520,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             # not change (valid -> valid)
             env.wait_for_cycle()
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertTrue(status.valid)
             self.assertEqual(env.event.received, [])
 
@@ -525,7 +539,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
 
             # Both domain status and path status succeed and emit VALID event
             env.wait_for_cycle()
@@ -535,7 +549,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             # Domain status fail, emit INVALID event
             domain.errors[method] = exception
             env.wait_for_cycle()
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertFalse(status.valid)
             self.assertIsInstance(status.error, exception)
             self.assertEqual(env.event.received, [(('uuid', False), {})])
@@ -545,7 +559,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
 
             # Both domain status and path status succeed and emit VALID event
             env.wait_for_cycle()
@@ -555,7 +569,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             env.wait_for_cycle()
             env.checker.complete(domain.getMonitoringPath(),
                                  FakeCheckResult(exception))
-            status = env.thread.getStatus()
+            status = env.task.getStatus()
             self.assertFalse(status.valid)
             self.assertIsInstance(status.error, exception)
             self.assertEqual(env.event.received, [(('uuid', False), {})])
@@ -564,7 +578,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
 
             # Both domain status and path status succeed
             env.wait_for_cycle()
@@ -580,7 +594,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             domain = FakeDomain("uuid")
             domain.errors["selftest"] = OSError
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
 
             # Domain status fail, emit INVALID event
             env.wait_for_cycle()
@@ -599,7 +613,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
 
             # Both domain status and path status succeed
             env.wait_for_cycle()
@@ -619,7 +633,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid", iso_dir="/path")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
             env.wait_for_cycle()
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
             self.assertFalse(domain.acquired)
@@ -629,7 +643,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             domain = FakeDomain("uuid")
             domain.errors["selftest"] = OSError
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
             env.wait_for_cycle()
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
             self.assertFalse(domain.acquired)
@@ -640,7 +654,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             domain = FakeDomain("uuid")
             domain.errors['acquireHostId'] = exception
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
             env.wait_for_cycle()
             self.assertFalse(domain.acquired)
             del domain.errors["acquireHostId"]
@@ -655,7 +669,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
         with monitor_env(refresh=MONITOR_INTERVAL * 1.5) as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
 
             # Domain will be removed after the refresh timeout
             env.wait_for_cycle()
@@ -666,7 +680,7 @@ class TestMonitorThreadMonitoring(VdsmTestCase):
             self.assertNotIn(domain.sdUUID, monitor.sdCache.domains)
 
 
-class TestMonitorThreadStopping(VdsmTestCase):
+class TestMonitorTaskStopping(VdsmTestCase):
 
     # Here we release the host id if we acquired it, and the monitor was
     # stopped with shutdown=False.
@@ -675,7 +689,7 @@ class TestMonitorThreadStopping(VdsmTestCase):
         with monitor_env(shutdown=False) as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
             env.wait_for_cycle()
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
         self.assertFalse(domain.acquired)
@@ -684,7 +698,7 @@ class TestMonitorThreadStopping(VdsmTestCase):
         with monitor_env(shutdown=True) as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
             env.wait_for_cycle()
             env.checker.complete(domain.getMonitoringPath(), FakeCheckResult())
             # Acquire on next cycle
@@ -702,11 +716,11 @@ class TestMonitorThreadStopping(VdsmTestCase):
 
             domain.selftest = block
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
             if not blocked.wait(CYCLE_TIMEOUT):
                 raise RuntimeError("Timeout waiting for calling getReadDelay")
 
-        status = env.thread.getStatus()
+        status = env.task.getStatus()
         self.assertFalse(status.actual)
         self.assertFalse(domain.acquired)
 
@@ -714,12 +728,135 @@ class TestMonitorThreadStopping(VdsmTestCase):
         with monitor_env() as env:
             domain = FakeDomain("uuid")
             monitor.sdCache.domains["uuid"] = domain
-            env.thread.start()
+            env.task.start()
             env.wait_for_cycle()
         self.assertFalse(domain.acquired)
         self.assertNotIn(domain.getMonitoringPath(), env.checker.checkers)
 
 
+class TestMonitorTaskScheduling(VdsmTestCase):
+
+    # Here we check that many domains are monitored by few workers, and that a
+    # domain blocked on storage does not delay other domains.
+
+    def setUp(self):
+        self.scheduler = schedule.Scheduler(clock=monotonic_time)
+        self.scheduler.start()
+        self.executor = executor.Executor("monitor", 1, 10, self.scheduler,
+                                          max_workers=2)
+        self.executor.start()
+        self.checker = FakeCheckService()
+        self.tasks = []
+
+    def tearDown(self):
+        for task in self.tasks:
+            task.stop()
+        for task in self.tasks:
+            task.join()
+        self.executor.stop(wait=False)
+        self.scheduler.stop()
+
+    def add_domain(self, sdUUID):
+        domain = FakeDomain(sdUUID)
+        domain.getMonitoringPath = lambda: "/path/to/%s/metadata" % sdUUID
+        monitor.sdCache.domains[sdUUID] = domain
+        return domain
+
+    def start_monitor(self, sdUUID):
+        task = monitor.MonitorTask(sdUUID, 'host_id', MONITOR_INTERVAL,
+                                   FakeEvent(), self.checker, self.scheduler,
+                                   self.executor)
+        env = MonitorEnv(task, None, self.checker)
+        self.tasks.append(task)
+        task.start()
+        return env
+
+    @MonkeyPatch(monitor, "sdCache", FakeStorageDomainCache())
+    def test_many_domains(self):
+        envs = []
+        for i in range(5):
+            sdUUID = "uuid-%d" % i
+            self.add_domain(sdUUID)
+            envs.append(self.start_monitor(sdUUID))
+
+        for env in envs:
+            env.wait_for_cycle()
+            env.wait_for_cycle()
+            self.assertTrue(env.task.getStatus().valid)
+
+        self.assertEqual(len(self.checker.checkers), 5)
+
+    @MonkeyPatch(monitor, "sdCache", FakeStorageDomainCache())
+    def test_blocked_domain(self):
+        blocked = self.add_domain("blocked")
+        unblock = threading.Event()
+        calls = []
+
+        def selftest():
+            calls.append(None)
+            unblock.wait(CYCLE_TIMEOUT)
+
+        blocked.selftest = selftest
+        self.add_domain("ok")
+
+        try:
+            blocked_env = self.start_monitor("blocked")
+            ok_env = self.start_monitor("ok")
+
+            # The only worker is blocked; the executor must add a worker
+            # to monitor the other domain.
+            for i in range(3):
+                ok_env.wait_for_cycle()
+
+            # The blocked domain must not start another cycle.
+            self.assertEqual(len(calls), 1)
+        finally:
+            unblock.set()
+
+        blocked_env.wait_for_cycle()
+
+
+class TestDomainMonitor(VdsmTestCase):
+
+    def add_domain(self, sdUUID):
+        domain = FakeDomain(sdUUID)
+        domain.getMonitoringPath = lambda: "/path/to/%s/metadata" % sdUUID
+        monitor.sdCache.domains[sdUUID] = domain
+        return domain
+
+    @MonkeyPatch(monitor, "sdCache", FakeStorageDomainCache())
+    @MonkeyPatch(monitor.check, "CheckService", FakeCheckService)
+    @MonkeyPatch(monitor, "config", make_config([
+        ("irs", "monitor_workers", "1"),
+    ]))
+    def test_more_blocked_domains_than_workers(self):
+        unblock = threading.Event()
+
+        def selftest():
+            unblock.wait(CYCLE_TIMEOUT * 2)
+
+        domain_monitor = monitor.DomainMonitor(MONITOR_INTERVAL)
+        try:
+            for i in range(4):
+                blocked = self.add_domain("blocked-%d" % i)
+                blocked.selftest = selftest
+                domain_monitor.startMonitoring(blocked.sdUUID, 'host_id',
+                                               poolDomain=False)
+            self.add_domain("ok")
+            domain_monitor.startMonitoring("ok", 'host_id', poolDomain=False)
+            ok_env = MonitorEnv(domain_monitor._monitors["ok"], None, None)
+            # A worker per domain on top of the workers count.
+            self.assertEqual(domain_monitor._executor.max_workers, 6)
+
+            # All the blocked domains hold a worker; the domain monitor must
+            # allow a new worker to monitor the other domain.
+            for i in range(3):
+                ok_env.wait_for_cycle()
+        finally:
+            unblock.set()
+            domain_monitor.shutdown()
+
+
 @expandPermutations
 class TestStatus(VdsmTestCase):
 
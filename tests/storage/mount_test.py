@@ -280,6 +280,49 @@ class TestRemoteSdIsMounted(VdsmTestCase):
                              b"/rhev/data-center/mnt/server:_other_path"))
 
 
+class TestMountTable(VdsmTestCase):
+
+    def test_cached(self):
+        with fake_mounts([b"server:/path /mnt/server:_path nfs4 opts 0 0"]):
+            self.assertTrue(mount.isMounted("/mnt/server:_path"))
+            with open(mount._PROC_MOUNTS_PATH, "w") as f:
+                f.write("server:/other /mnt/server:_other nfs4 opts 0 0\n")
+            # Regular files do not report changes.
+            self.assertTrue(mount.isMounted("/mnt/server:_path"))
+            mount._mountTable.invalidate()
+            self.assertFalse(mount.isMounted("/mnt/server:_path"))
+            self.assertTrue(mount.isMounted("/mnt/server:_other"))
+
+    def test_path_changed(self):
+        with fake_mounts([b"server:/a /mnt/server:_a nfs4 opts 0 0"]):
+            self.assertTrue(mount.isMounted("/mnt/server:_a"))
+        with fake_mounts([b"server:/b /mnt/server:_b nfs4 opts 0 0"]):
+            self.assertFalse(mount.isMounted("/mnt/server:_a"))
+            self.assertTrue(mount.isMounted("/mnt/server:_b"))
+
+    def test_first_record(self):
+        with fake_mounts([b"server:/a /mnt/server:_a nfs4 opts 0 0",
+                          b"server:/b /mnt/server:_a nfs4 opts 0 0"]):
+            m = mount.getMountFromTarget("/mnt/server:_a")
+            self.assertEqual(m.fs_spec, "server:/a")
+            self.assertTrue(mount.Mount("server:/b",
+                                        "/mnt/server:_a").isMounted())
+
+    @pytest.mark.skipif(os.geteuid() != 0, reason="requires root")
+    def test_mount_changes(self):
+        with namedTemporaryDir() as mountpoint:
+            self.assertFalse(mount.isMounted(mountpoint))
+            rc, out, err = execCmd(["mount", "-t", "tmpfs", "tmpfs",
+                                    mountpoint])
+            if rc != 0:
+                raise SkipTest("cannot mount tmpfs: %s" % err)
+            try:
+                self.assertTrue(mount.isMounted(mountpoint))
+            finally:
+                execCmd(["umount", mountpoint])
+            self.assertFalse(mount.isMounted(mountpoint))
+
+
 @expandPermutations
 class TestIsMountedTiming(VdsmTestCase):
 
@@ -306,4 +349,9 @@ class TestIsMountedTiming(VdsmTestCase):
             start = time.time()
             self.assertTrue(mount.isMounted(mountpoint % i))
             elapsed = time.time() - start
-            print("%4d mounts: %f seconds" % (count, elapsed))
+            start = time.time()
+            for n in range(1000):
+                self.assertTrue(mount.isMounted(mountpoint % (n % count)))
+            cached = (time.time() - start) / 1000
+            print("%4d mounts: %f seconds, cached: %f seconds" %
+                  (count, elapsed, cached))
@@ -17,7 +17,9 @@
 # Refer to the README and COPYING files for full details of the license
 #
 
+from __future__ import print_function
 import os
+import time
 import uuid
 
 from vdsm.storage import blockSD
@@ -29,6 +31,7 @@ from monkeypatch import MonkeyPatchScope
 from testlib import VdsmTestCase, recorded
 from testlib import make_uuid
 from testlib import expandPermutations, permutations
+from testValidation import stresstest
 
 from storage.storagetestlib import (
     fake_block_env,
@@ -192,6 +195,194 @@ class TestBlockDomainMetadataSlot(VdsmTestCase):
                 acquired = env.sd_manifest._lvTagMetaSlotLock.acquire(False)
                 self.assertFalse(acquired)
 
+    def test_metaslot_allocate(self):
+        with fake_block_env() as env:
+            self.assertEqual(create_tagged_lv(env), 4)
+            self.assertEqual(create_tagged_lv(env), 5)
+
+    def test_metaslot_failed_allocation(self):
+        with fake_block_env() as env:
+            with self.assertRaises(RuntimeError):
+                with env.sd_manifest.acquireVolumeMetadataSlot("vol", 1):
+                    raise RuntimeError("tagging the volume failed")
+            self.assertEqual(create_tagged_lv(env), 4)
+
+    def test_metaslot_failed_after_tagging(self):
+        with fake_block_env() as env:
+            sduuid = env.sd_manifest.sdUUID
+            lv = make_uuid()
+            env.lvm.createLV(sduuid, lv, VOLSIZE / MB)
+            with self.assertRaises(RuntimeError):
+                with env.sd_manifest.acquireVolumeMetadataSlot(
+                        lv, 1) as mdSlot:
+                    env.lvm.addtag(sduuid, lv, sc.TAG_PREFIX_MD + str(mdSlot))
+                    raise RuntimeError("creating the volume failed")
+            self.assertEqual(create_tagged_lv(env), 5)
+
+    def test_metaslot_volume_not_tagged(self):
+        with fake_block_env() as env:
+            sduuid = env.sd_manifest.sdUUID
+            lv = make_uuid()
+            env.lvm.createLV(sduuid, lv, VOLSIZE / MB)
+            with env.sd_manifest.acquireVolumeMetadataSlot(lv, 1) as mdSlot:
+                self.assertEqual(mdSlot, 4)
+            self.assertEqual(create_tagged_lv(env), 4)
+
+    def test_metaslot_release(self):
+        with fake_block_env() as env:
+            vol = make_uuid()
+            self.assertEqual(create_tagged_lv(env, vol), 4)
+            self.assertEqual(create_tagged_lv(env), 5)
+            env.sd_manifest.releaseVolumeMetadataSlots([vol])
+            self.assertEqual(create_tagged_lv(env), 4)
+
+    def test_metaslot_reload(self):
+        with fake_block_env() as env:
+            self.assertEqual(create_tagged_lv(env), 4)
+            # Volume created by another host while we were not the SPM.
+            sduuid = env.sd_manifest.sdUUID
+            lv = make_uuid()
+            env.lvm.createLV(sduuid, lv, VOLSIZE / MB)
+            env.lvm.addtag(sduuid, lv, sc.TAG_PREFIX_MD + "5")
+            manifest = blockSD.BlockStorageDomainManifest(
+                sduuid, env.sd_manifest._metadata)
+            with manifest.acquireVolumeMetadataSlot(None, 1) as mdSlot:
+                self.assertEqual(mdSlot, 6)
+
+    def test_metaslot_invalidate_all(self):
+        with fake_block_env() as env:
+            self.assertEqual(create_tagged_lv(env), 4)
+            # Volume created by the previous SPM.
+            sduuid = env.sd_manifest.sdUUID
+            lv = make_uuid()
+            env.lvm.createLV(sduuid, lv, VOLSIZE / MB)
+            env.lvm.addtag(sduuid, lv, sc.TAG_PREFIX_MD + "5")
+            blockSD.invalidateMetadataSlots()
+            self.assertEqual(create_tagged_lv(env), 6)
+
+    def test_metaslot_load_without_lock(self):
+        with fake_block_env() as env:
+            manifest = env.sd_manifest
+            load = manifest._loadMetadataSlots
+            locked = []
+
+            def load_slots():
+                acquired = manifest._lvTagMetaSlotLock.acquire(False)
+                if acquired:
+                    manifest._lvTagMetaSlotLock.release()
+                locked.append(not acquired)
+                return load()
+
+            with MonkeyPatchScope([(manifest, "_loadMetadataSlots",
+                                    load_slots)]):
+                self.assertEqual(create_tagged_lv(env), 4)
+                self.assertEqual(create_tagged_lv(env), 5)
+            self.assertEqual(locked, [False])
+
+    def test_metaslot_invalidated_while_loading(self):
+        with fake_block_env() as env:
+            manifest = env.sd_manifest
+            sduuid = manifest.sdUUID
+            load = manifest._loadMetadataSlots
+            calls = []
+
+            def load_slots():
+                slots = load()
+                if not calls:
+                    # Volume created by another host while loading, seen
+                    # when the domain cache is refreshed.
+                    lv = make_uuid()
+                    env.lvm.createLV(sduuid, lv, VOLSIZE / MB)
+                    env.lvm.addtag(sduuid, lv, sc.TAG_PREFIX_MD + "4")
+                    blockSD.BlockStorageDomainManifest(
+                        sduuid, manifest._metadata)
+                calls.append(slots)
+                return slots
+
+            with MonkeyPatchScope([(manifest, "_loadMetadataSlots",
+                                    load_slots)]):
+                self.assertEqual(create_tagged_lv(env), 5)
+            self.assertEqual(len(calls), 2)
+
+
+def create_tagged_lv(env, lv=None):
+    sduuid = env.sd_manifest.sdUUID
+    lv = lv or make_uuid()
+    env.lvm.createLV(sduuid, lv, VOLSIZE / MB)
+    with env.sd_manifest.acquireVolumeMetadataSlot(lv, 1) as mdSlot:
+        env.lvm.addtag(sduuid, lv, sc.TAG_PREFIX_MD + str(mdSlot))
+    return mdSlot
+
+
+@expandPermutations
+class TestMetadataSlots(VdsmTestCase):
+
+    @permutations([
+        # used, size, free_slot
+        ([], 1, 4),
+        ([(4, 1), (5, 1)], 1, 6),
+        ([(4, 1), (6, 1)], 1, 5),
+        ([(4, 1), (6, 1)], 2, 7),
+        ([(4, 1), (7, 1)], 2, 5),
+        ([(4, 3)], 1, 7),
+        ([(10, 1)], 1, 4),
+    ])
+    def test_find(self, used, size, free_slot):
+        slots = blockSD.MetadataSlots(4)
+        for i, (offset, slot_size) in enumerate(used):
+            slots.occupy(i, offset, slot_size)
+        self.assertEqual(slots.find(size), free_slot)
+
+    def test_release(self):
+        slots = blockSD.MetadataSlots(4)
+        for i in range(4, 10):
+            slots.occupy(i, i, 1)
+        slots.release(6)
+        self.assertEqual(slots.find(1), 6)
+        slots.occupy(6, 6, 1)
+        self.assertEqual(slots.find(1), 10)
+
+    def test_move(self):
+        slots = blockSD.MetadataSlots(4)
+        slots.occupy("vol", 4, 1)
+        slots.occupy("vol", 8, 1)
+        self.assertEqual(slots.find(1), 4)
+        self.assertEqual(len(slots), 1)
+
+    def test_shared_slot(self):
+        # Corrupted tags may point two volumes to the same slot.
+        slots = blockSD.MetadataSlots(4)
+        slots.occupy("vol1", 4, 1)
+        slots.occupy("vol2", 4, 1)
+        slots.release("vol1")
+        self.assertEqual(slots.find(1), 5)
+
+    @stresstest
+    def test_benchmark(self):
+        count = 5000
+        with fake_block_env() as env:
+            sduuid = env.sd_manifest.sdUUID
+            for i in range(count):
+                lv = make_uuid()
+                env.lvm.createLV(sduuid, lv, VOLSIZE / MB)
+                env.lvm.addtag(sduuid, lv, sc.TAG_PREFIX_MD + str(i + 4))
+
+            # Loading the slots is the scan done before every allocation
+            # without the index.
+            start = time.time()
+            for i in range(10):
+                slots = env.sd_manifest._loadMetadataSlots()
+                slots.find(1)
+            scan = (time.time() - start) / 10
+
+            start = time.time()
+            for i in range(count):
+                slot = slots.find(1)
+                slots.occupy(i, slot, 1)
+            index = (time.time() - start) / count
+
+        print("\nvolumes=%d scan=%.6fs index=%.6fs" % (count, scan, index))
+
 
 class StorageDomainManifest(sd.StorageDomainManifest):
     def __init__(self):
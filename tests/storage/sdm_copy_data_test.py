@@ -40,6 +40,7 @@ from storage.storagetestlib import (
 )
 
 from testValidation import broken_on_ci
+from testlib import make_config
 from testlib import make_uuid
 from testlib import VdsmTestCase, expandPermutations, permutations
 from testlib import start_thread
@@ -330,6 +331,41 @@ class TestCopyDataDIV(VdsmTestCase):
             self.assertEqual(sc.LEGAL_VOL, dst_vol.getLegality())
             self.assertEqual(generation, dst_vol.getMetaParam(sc.GENERATION))
 
+    @permutations((
+        # env_type, copy_mode, options
+        ('file', None, {}),
+        ('file', 'default', {}),
+        ('file', 'parallel', {'coroutines': 8}),
+        ('block', 'default', {}),
+        ('block', 'parallel', {'coroutines': 8, 'unordered_writes': True}),
+    ))
+    def test_copy_mode(self, env_type, copy_mode, options):
+        fmt = sc.RAW_FORMAT
+        config = make_config([('irs', 'qemuimg_convert_coroutines', '8')])
+        with self.make_env(env_type, fmt, fmt) as env:
+            src_vol = env.src_chain[0]
+            dst_vol = env.dst_chain[0]
+            source = dict(endpoint_type='div', sd_id=src_vol.sdUUID,
+                          img_id=src_vol.imgUUID, vol_id=src_vol.volUUID)
+            dest = dict(endpoint_type='div', sd_id=dst_vol.sdUUID,
+                        img_id=dst_vol.imgUUID, vol_id=dst_vol.volUUID)
+            fake_convert = FakeQemuConvertChecker(src_vol, dst_vol)
+            with MonkeyPatchScope([(qemuimg, 'convert', fake_convert),
+                                   (qemuimg, 'config', config)]):
+                job = copy_data.Job(make_uuid(), 0, source, dest,
+                                    copy_mode=copy_mode)
+                job.run()
+
+            self.assertEqual(jobs.STATUS.DONE, job.status)
+            actual = {k: v for k, v in fake_convert.kwargs.items()
+                      if k in ('coroutines', 'unordered_writes',
+                               'preallocation')}
+            self.assertEqual(options, actual)
+
+    def test_invalid_copy_mode(self):
+        with self.assertRaises(ValueError):
+            copy_data.Job(make_uuid(), 0, {}, {}, copy_mode='invalid')
+
     # TODO: Missing tests:
     # Copy between 2 different domains
 
@@ -341,8 +377,10 @@ class FakeQemuConvertChecker(object):
         self.error = error
         self.wait_for_abort = wait_for_abort
         self.ready_event = threading.Event()
+        self.kwargs = None
 
     def __call__(self, *args, **kwargs):
+        self.kwargs = kwargs
         assert sc.LEGAL_VOL == self.src_vol.getLegality()
         assert sc.ILLEGAL_VOL == self.dst_vol.getLegality()
         return FakeQemuImgOperation(self.ready_event, self.wait_for_abort,
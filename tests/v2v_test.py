@@ -27,12 +27,14 @@ import zipfile
 import libvirt
 import os
 
+from testlib import make_config
 from testlib import namedTemporaryDir, permutations, expandPermutations
 from v2v_testlib import VM_SPECS, MockVirDomain
 from v2v_testlib import MockVirConnect, _mac_from_uuid, BLOCK_DEV_PATH
 from vdsm import v2v
 from vdsm import libvirtconnection
 from vdsm.commands import execCmd
+from vdsm.common import concurrent
 from vdsm.common import response
 from vdsm.common.cmdutils import CommandPath
 from vdsm.common.password import ProtectedPassword
@@ -171,6 +173,7 @@ class v2vTests(TestCaseBase):
 
     def tearDown(self):
         v2v._jobs.clear()
+        v2v._inventory.clear()
 
     def testGetExternalVMs(self):
         def _connect(uri, username, passwd):
@@ -523,6 +526,146 @@ class v2vTests(TestCaseBase):
         self.assertEqual('1.1', cmd._base_command[i + 1])
 
 
+class RecordingConnect(MockVirConnect):
+
+    def __init__(self, vms):
+        MockVirConnect.__init__(self, vms)
+        self.looked_up = []
+        self.closed = False
+
+    def lookupByName(self, name):
+        self.looked_up.append(name)
+        return MockVirConnect.lookupByName(self, name)
+
+    def close(self):
+        self.closed = True
+
+
+class InventoryTests(TestCaseBase):
+
+    def setUp(self):
+        self.vms = [MockVirDomain(*spec) for spec in VM_SPECS]
+        self.reads = []
+        self.connections = []
+        for vm in self.vms:
+            vm.XMLDesc = self.recorded_xmldesc(vm)
+
+    def tearDown(self):
+        v2v._inventory.clear()
+
+    def recorded_xmldesc(self, vm):
+        xmldesc = vm.XMLDesc
+
+        def XMLDesc(flags=0):
+            self.reads.append(vm.name())
+            return xmldesc(flags)
+        return XMLDesc
+
+    def get_external_vms(self, workers=8, timeout=300, names=None):
+        def _connect(uri, username, passwd):
+            conn = RecordingConnect(vms=self.vms)
+            self.connections.append(conn)
+            return conn
+
+        cfg = make_config([
+            ('vars', 'v2v_inventory_workers', str(workers)),
+            ('vars', 'v2v_inventory_cache_timeout', str(timeout)),
+        ])
+        with MonkeyPatchScope([
+            (libvirtconnection, 'open_connection', _connect),
+            (v2v, 'config', cfg),
+        ]):
+            return v2v.get_external_vms('esx://mydomain', 'user',
+                                        ProtectedPassword('password'),
+                                        names)['vmList']
+
+    def test_order(self):
+        vms = self.get_external_vms(workers=2)
+        self.assertEqual([vm['vmName'] for vm in vms],
+                         [spec.name for spec in VM_SPECS])
+
+    def test_concurrent(self):
+        # Reading VMs serially would time out waiting on the barrier, and
+        # the VMs would be skipped.
+        barrier = concurrent.Barrier(len(self.vms))
+
+        def XMLDesc(xmldesc):
+            def wait(flags=0):
+                barrier.wait(timeout=5)
+                return xmldesc(flags)
+            return wait
+
+        for vm in self.vms:
+            vm.XMLDesc = XMLDesc(vm.XMLDesc)
+
+        vms = self.get_external_vms(workers=len(self.vms))
+        self.assertEqual(len(vms), len(VM_SPECS))
+
+    def test_connection_per_worker(self):
+        barrier = concurrent.Barrier(len(self.vms))
+
+        def XMLDesc(xmldesc):
+            def wait(flags=0):
+                barrier.wait(timeout=5)
+                return xmldesc(flags)
+            return wait
+
+        for vm in self.vms:
+            vm.XMLDesc = XMLDesc(vm.XMLDesc)
+
+        self.get_external_vms(workers=len(self.vms))
+        # The first connection lists the VMs, and is used by one worker.
+        self.assertEqual(len(self.connections), len(self.vms))
+        looked_up = [name for conn in self.connections[1:]
+                     for name in conn.looked_up]
+        self.assertEqual(len(looked_up), len(self.vms) - 1)
+        self.assertTrue(all(conn.closed for conn in self.connections[1:]))
+
+    def test_bounded_connections(self):
+        self.get_external_vms(workers=2)
+        self.assertLessEqual(len(self.connections), 2)
+
+    def test_cached_snapshot(self):
+        self.get_external_vms()
+        self.vms[0].setCurrentSnapshot(True)
+        vms = self.get_external_vms()
+        self.assertNotIn(VM_SPECS[0].name, [vm['vmName'] for vm in vms])
+        self.assertEqual(len(vms), len(VM_SPECS) - 1)
+
+    def test_cached(self):
+        first = self.get_external_vms()
+        self.assertEqual(sorted(self.reads),
+                         sorted(spec.name for spec in VM_SPECS))
+        del self.reads[:]
+        self.assertEqual(self.get_external_vms(), first)
+        self.assertEqual(self.reads, [])
+
+    def test_cached_status(self):
+        self.get_external_vms()
+        self.vms[0].isActive = lambda: False
+        vms = self.get_external_vms()
+        self.assertEqual(vms[0]['status'], 'Down')
+
+    def test_cached_copy(self):
+        self.get_external_vms()[0]['vmName'] = 'modified'
+        self.assertEqual(self.get_external_vms()[0]['vmName'],
+                         VM_SPECS[0].name)
+
+    def test_cache_partial(self):
+        names = [VM_SPECS[0].name, VM_SPECS[1].name]
+        self.get_external_vms(names=names)
+        del self.reads[:]
+        self.get_external_vms()
+        self.assertEqual(sorted(self.reads),
+                         sorted(spec.name for spec in VM_SPECS[2:]))
+
+    def test_cache_disabled(self):
+        self.get_external_vms(timeout=0)
+        del self.reads[:]
+        self.get_external_vms(timeout=0)
+        self.assertEqual(len(self.reads), len(VM_SPECS))
+
+
 @expandPermutations
 class PipelineProcTests(TestCaseBase):
 
@@ -621,6 +764,9 @@ class MockVirConnectTests(TestCaseBase):
 
 
 class TestGetOVAInfo(TestCaseBase):
+    def tearDown(self):
+        v2v._tar_index_cache.clear()
+
     def test_directory(self):
         with self.temporary_ovf_dir() as (base, ovfpath, ovapath):
             vm = v2v.get_ova_info(base)
@@ -633,6 +779,56 @@ class TestGetOVAInfo(TestCaseBase):
             vm = v2v.get_ova_info(ovapath)
             self.check(vm['vmList'])
 
+    def test_compressed_tar(self):
+        with self.temporary_ovf_dir() as (base, ovfpath, ovapath):
+            with tarfile.open(ovapath, 'w:gz') as tar:
+                tar.add(ovfpath, arcname='testvm.ovf')
+            vm = v2v.get_ova_info(ovapath)
+            self.check(vm['vmList'])
+
+    def test_tar_index(self):
+        with self.temporary_ovf_dir() as (base, ovfpath, ovapath):
+            diskpath = os.path.join(base, 'First-disk1.vmdk')
+            with open(diskpath, 'wb') as f:
+                f.write(b'x' * 1000)
+            with tarfile.open(ovapath, 'w') as tar:
+                tar.add(ovfpath, arcname='testvm.ovf')
+                tar.add(diskpath, arcname='First-disk1.vmdk')
+
+            members = v2v._tar_index(ovapath)
+
+            self.assertEqual([m.name for m in members],
+                             ['testvm.ovf', 'First-disk1.vmdk'])
+            with open(ovapath, 'rb') as f:
+                f.seek(members[1].offset)
+                self.assertEqual(f.read(members[1].size), b'x' * 1000)
+
+    def test_tar_index_cached(self):
+        with self.temporary_ovf_dir() as (base, ovfpath, ovapath):
+            with tarfile.open(ovapath, 'w') as tar:
+                tar.add(ovfpath, arcname='testvm.ovf')
+            calls = []
+            read_tar_index = v2v._read_tar_index
+
+            def recorded_read_tar_index(path):
+                calls.append(path)
+                return read_tar_index(path)
+
+            with MonkeyPatchScope([
+                (v2v, '_read_tar_index', recorded_read_tar_index),
+            ]):
+                v2v.get_ova_info(ovapath)
+                v2v.get_ova_info(ovapath)
+                self.assertEqual(calls, [ovapath])
+
+                with tarfile.open(ovapath, 'w') as tar:
+                    tar.add(ovfpath, arcname='testvm.ovf')
+                    tar.add(ovfpath, arcname='backup.ovf')
+                vm = v2v.get_ova_info(ovapath)
+                self.assertEqual(calls, [ovapath, ovapath])
+
+            self.check(vm['vmList'])
+
     def test_zip(self):
         with self.temporary_ovf_dir() as (base, ovfpath, ovapath):
             with zipfile.ZipFile(ovapath, 'w') as zip:
@@ -20,6 +20,8 @@
 
 from __future__ import absolute_import
 
+import threading
+
 from vdsm.virt import metadata
 from vdsm.virt import vmxml
 from vdsm.virt import xmlconstants
@@ -29,6 +31,7 @@ import libvirt
 from vmfakecon import Error
 from testlib import permutations, expandPermutations
 from testlib import XMLTestCase
+from testlib import VdsmTestCase
 
 
 # NOTE:
@@ -550,6 +553,126 @@ class DescriptorTests(XMLTestCase):
             self.assertEqual(dev, {'foo': 'bar'})
 
 
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingDomain(object):
+
+    def __init__(self):
+        self.writes = []
+        self.written = threading.Event()
+        self.error = None
+
+    def UUIDString(self):
+        return BLANK_UUID
+
+    def setMetadata(self, xml_type, xml_string, prefix, uri, flags):
+        if self.error is not None:
+            raise self.error
+        self.writes.append(xml_string)
+        self.written.set()
+
+
+class WriterTests(VdsmTestCase):
+
+    def setUp(self):
+        self.desc = metadata.Descriptor()
+        self.dom = CountingDomain()
+        self.clock = FakeClock()
+
+    def update(self, writer, value):
+        with self.desc.values() as vm:
+            vm['value'] = value
+        writer.write(self.dom)
+
+    def test_no_interval(self):
+        writer = metadata.Writer(self.desc, 0, clock=self.clock)
+        for i in range(3):
+            self.update(writer, i)
+        self.assertEqual(len(self.dom.writes), 3)
+        self.assertFalse(writer.pending)
+
+    def test_first_write_immediate(self):
+        writer = metadata.Writer(self.desc, 10, clock=self.clock)
+        self.update(writer, 1)
+        self.assertEqual(len(self.dom.writes), 1)
+        self.assertFalse(writer.pending)
+
+    def test_coalesce(self):
+        writer = metadata.Writer(self.desc, 10, clock=self.clock)
+        self.update(writer, 1)
+        for i in range(2, 10):
+            self.update(writer, i)
+        self.assertEqual(len(self.dom.writes), 1)
+        self.assertTrue(writer.pending)
+        writer.flush()
+        self.assertEqual(len(self.dom.writes), 2)
+        self.assertIn(b'>9<', self.dom.writes[-1])
+        self.assertFalse(writer.pending)
+
+    def test_flush_clean(self):
+        writer = metadata.Writer(self.desc, 10, clock=self.clock)
+        writer.flush()
+        self.update(writer, 1)
+        writer.flush()
+        self.assertEqual(len(self.dom.writes), 1)
+
+    def test_write_after_interval(self):
+        writer = metadata.Writer(self.desc, 10, clock=self.clock)
+        self.update(writer, 1)
+        self.clock.now += 10
+        self.update(writer, 2)
+        self.assertEqual(len(self.dom.writes), 2)
+
+    def test_deferred_write(self):
+        writer = metadata.Writer(self.desc, 0.1)
+        self.update(writer, 1)
+        self.dom.written.clear()
+        self.update(writer, 2)
+        self.update(writer, 3)
+        self.assertTrue(self.dom.written.wait(2))
+        self.assertEqual(len(self.dom.writes), 2)
+        self.assertIn(b'>3<', self.dom.writes[-1])
+        self.assertFalse(writer.pending)
+
+    def test_flush_stops_writer_thread(self):
+        writer = metadata.Writer(self.desc, 10, name='md-writer/test')
+        self.update(writer, 1)
+        self.update(writer, 2)
+        threads = [t for t in threading.enumerate()
+                   if t.name == 'md-writer/test']
+        self.assertEqual(len(threads), 1)
+        writer.flush()
+        threads[0].join(2)
+        self.assertFalse(threads[0].is_alive())
+        self.assertEqual(len(self.dom.writes), 2)
+
+    def test_cancel(self):
+        writer = metadata.Writer(self.desc, 10, clock=self.clock)
+        self.update(writer, 1)
+        self.update(writer, 2)
+        writer.cancel()
+        writer.flush()
+        self.assertEqual(len(self.dom.writes), 1)
+
+    def test_flush_error_keeps_changes(self):
+        writer = metadata.Writer(self.desc, 10, clock=self.clock)
+        self.update(writer, 1)
+        self.update(writer, 2)
+        self.dom.error = Error(libvirt.VIR_ERR_INTERNAL_ERROR)
+        self.assertRaises(libvirt.libvirtError, writer.flush)
+        self.assertTrue(writer.pending)
+        self.dom.error = None
+        writer.flush()
+        self.assertEqual(len(self.dom.writes), 2)
+
+
 BLANK_UUID = '00000000-0000-0000-0000-000000000000'
 
 
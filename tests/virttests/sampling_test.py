@@ -19,6 +19,7 @@
 #
 
 import itertools
+import os
 import threading
 
 from vdsm import numa
@@ -28,6 +29,7 @@ from monkeypatch import MonkeyPatchScope
 
 from testlib import permutations, expandPermutations
 from testlib import VdsmTestCase as TestCaseBase
+from testlib import namedTemporaryDir
 
 
 @expandPermutations
@@ -221,6 +223,40 @@ class StatsCacheTests(TestCaseBase):
             self.cache.put(*sample)
 
 
+class CpuSampleTests(TestCaseBase):
+
+    CPU_LINES = [
+        'cpu  4350684 14521 1120299 20687999 677480 197238 48056 0 1383 0\n',
+        'cpu0 1082143 1040 335283 19253788 628168 104752 21570 0 351 0\n',
+        'cpu2 1296289 6812 283613 472725 18664 30549 9776 0 213 0\n',
+    ]
+
+    def testTotalCpuSample(self):
+        sample = sampling.TotalCpuSample(self.CPU_LINES)
+        self.assertEqual((4350684 + 14521, 1120299, 20687999),
+                         (sample.user, sample.sys, sample.idle))
+
+    def testCpuCoreSample(self):
+        sample = sampling.CpuCoreSample(self.CPU_LINES)
+        self.assertEqual([0, 2], list(sample.cpus))
+        self.assertEqual([1082143, 1296289], list(sample.user))
+        self.assertEqual([335283, 283613], list(sample.sys))
+        self.assertEqual({'user': 1296289, 'userNice': 6812,
+                          'sys': 283613, 'idle': 472725},
+                         sample.getCoreSample('2'))
+        self.assertIsNone(sample.getCoreSample(1))
+
+    def testReadCpuLines(self):
+        with namedTemporaryDir() as tmpdir:
+            path = os.path.join(tmpdir, 'stat')
+            with open(path, 'w') as f:
+                f.writelines(self.CPU_LINES)
+                f.write('intr 114930548 113199788 3 0 5 263 0 4 [...]\n')
+                f.write('ctxt 690239751\n')
+            with MonkeyPatchScope([(sampling, '_PROC_STAT_PATH', path)]):
+                self.assertEqual(self.CPU_LINES, sampling._read_cpu_lines())
+
+
 class NumaNodeMemorySampleTests(TestCaseBase):
 
     def _monkeyPatchedMemorySample(self, freeMemory, totalMemory):
@@ -323,6 +323,9 @@ class CpuCoreSample(object):
 
     def __init__(self, samples):
         self._samples = samples
+        self.cpus = sorted(samples)
+        self.user = [samples[cpu]['user'] for cpu in self.cpus]
+        self.sys = [samples[cpu]['sys'] for cpu in self.cpus]
 
     def getCoreSample(self, key):
         return self._samples.get(key)
@@ -24,6 +24,7 @@ from itertools import tee, product
 import logging
 import socket
 import threading
+import time
 import uuid
 
 import libvirt
@@ -31,8 +32,10 @@ import libvirt
 from six.moves import range
 from six.moves import zip
 
+from vdsm import schedule
 from vdsm.common import exception
 from vdsm.common import response
+from vdsm.common.time import monotonic_time
 from vdsm.config import config
 from vdsm.virt import migration
 from vdsm.virt import vmstatus
@@ -60,7 +63,7 @@ _PARAMS = tuple(product((_DOWNTIME_MIN, _DOWNTIME, _DOWNTIME_HUGE),
 
 
 @expandPermutations
-class DowntimeThreadTests(TestCaseBase):
+class DowntimeScheduleTests(TestCaseBase):
 
     # No special meaning, But steps just need to be >= 2
     DOWNTIME = 1000
@@ -369,6 +372,9 @@ class FakeVM(object):
     def prepare_migration(self):
         pass
 
+    def send_migration_status_event(self):
+        pass
+
     def isPersistent(self):
         return True
 
@@ -379,7 +385,7 @@ class FakeProgress(object):
         self.percentage = 0
 
 
-class FakeMonitorThread(object):
+class FakeMonitor(object):
 
     def __init__(self, prog):
         self.progress = prog
@@ -389,7 +395,7 @@ def make_env():
     dom = FakeMigratingDomain()
     src = migration.SourceThread(FakeVM(dom))
     src.remoteHost = '127.0.0.1'
-    src._monitorThread = FakeMonitorThread(FakeProgress())
+    src._monitor = FakeMonitor(FakeProgress())
     src._setupVdsConnection = lambda: None
     src._setupRemoteMachineParams = lambda: None
     return dom, src
@@ -413,7 +419,7 @@ class SourceThreadTests(TestCaseBase):
         vm = FakeVM()
         src = migration.SourceThread(vm)
         prog = FakeProgress()
-        src._monitorThread = FakeMonitorThread(prog)
+        src._monitor = FakeMonitor(prog)
 
         for step in steps:
             prog.percentage = step
@@ -427,7 +433,7 @@ class SourceThreadTests(TestCaseBase):
         vm = FakeVM()
         src = migration.SourceThread(vm)
         prog = FakeProgress()
-        src._monitorThread = FakeMonitorThread(prog)
+        src._monitor = FakeMonitor(prog)
 
         for step in steps:
             prog.percentage = step
@@ -495,15 +501,222 @@ def _update_downtime_repeatedly(downtime, steps):
             testvm._dom = dom
 
             cfg = make_config([('vars', 'migration_downtime_delay', '0')])
-            with MonkeyPatchScope([(migration, 'config', cfg)]):
-                dt = migration.DowntimeThread(testvm, downtime, steps)
+            with MonkeyPatchScope([(migration, 'config', cfg)]), \
+                    migration_monitoring():
+                dt = migration.DowntimeSchedule(testvm, downtime, steps)
                 dt.set_initial_downtime()
                 dt.start()
-                dt.join()
+                dt.join(timeout=5)
 
                 return dom.getDowntimes()
 
 
+@contextmanager
+def migration_monitoring(interval=0.05):
+    scheduler = schedule.Scheduler(name="test.Scheduler",
+                                   clock=monotonic_time)
+    scheduler.start()
+    monitoring = migration._Monitoring()
+    monitoring.start(scheduler, interval)
+    try:
+        with MonkeyPatchScope([(migration, '_monitoring', monitoring)]):
+            yield monitoring
+    finally:
+        monitoring.stop()
+        scheduler.stop()
+
+
+def wait_for(predicate, timeout=2):
+    deadline = monotonic_time() + timeout
+    while not predicate():
+        if monotonic_time() > deadline:
+            raise AssertionError("Timeout waiting for %s" % predicate)
+        time.sleep(0.01)
+
+
+def _job_stats(data_remaining):
+    stats = {
+        'type': libvirt.VIR_DOMAIN_JOB_UNBOUNDED,
+        libvirt.VIR_DOMAIN_JOB_TIME_ELAPSED: 42,
+        libvirt.VIR_DOMAIN_JOB_DATA_TOTAL: 8192,
+        libvirt.VIR_DOMAIN_JOB_DATA_PROCESSED: 8192 - data_remaining,
+        libvirt.VIR_DOMAIN_JOB_DATA_REMAINING: data_remaining,
+        libvirt.VIR_DOMAIN_JOB_MEMORY_TOTAL: 8192,
+        libvirt.VIR_DOMAIN_JOB_MEMORY_PROCESSED: 8192 - data_remaining,
+        libvirt.VIR_DOMAIN_JOB_MEMORY_REMAINING: data_remaining,
+    }
+    operation = getattr(libvirt, 'VIR_DOMAIN_JOB_OPERATION_MIGRATION_OUT',
+                        None)
+    if operation is not None:
+        stats['operation'] = operation
+    return stats
+
+
+class FakeMonitoredDomain(object):
+
+    def __init__(self, data_remaining=(4096,)):
+        self._data_remaining = list(data_remaining)
+        self.polls = 0
+        self.downtimes = []
+        self.aborted = False
+        self.blocked = None
+
+    def jobStats(self):
+        if self.blocked is not None:
+            self.blocked.wait()
+        self.polls += 1
+        if len(self._data_remaining) > 1:
+            return _job_stats(self._data_remaining.pop(0))
+        return _job_stats(self._data_remaining[0])
+
+    def migrateSetMaxDowntime(self, value, flags):
+        self.downtimes.append(value)
+
+    def abortJob(self):
+        self.aborted = True
+
+
+def _conv_schedule(init=(), stalling=()):
+    return {'init': list(init), 'stalling': list(stalling)}
+
+
+class FakePolledMonitor(object):
+
+    def poll(self):
+        pass
+
+
+class RecordingExecutor(object):
+
+    def __init__(self):
+        self.dispatched = []
+
+    def dispatch(self, func, timeout):
+        self.dispatched.append((func, timeout))
+
+
+class FakeScheduler(object):
+
+    def schedule(self, delay, func):
+        return None
+
+
+class MigrationMonitoringTests(TestCaseBase):
+
+    def test_monitor_many_migrations(self):
+        vms = [FakeVM(FakeMonitoredDomain()) for _ in range(10)]
+        monitors = [migration.MigrationMonitor(vm, time.time(),
+                                               _conv_schedule(), True)
+                    for vm in vms]
+        with migration_monitoring():
+            for monitor in monitors:
+                monitor.start()
+            wait_for(lambda: all(m.progress is not None for m in monitors))
+            for monitor in monitors:
+                monitor.stop()
+                monitor.join()
+        for monitor in monitors:
+            self.assertEqual(monitor.progress.percentage, 50)
+
+    def test_blocked_domain(self):
+        blocked = FakeMonitoredDomain()
+        blocked.blocked = threading.Event()
+        vms = [FakeVM(blocked), FakeVM(FakeMonitoredDomain())]
+        monitors = [migration.MigrationMonitor(vm, time.time(),
+                                               _conv_schedule(), True)
+                    for vm in vms]
+        try:
+            with migration_monitoring():
+                for monitor in monitors:
+                    monitor.start()
+                # The other migration is monitored while the first is blocked.
+                wait_for(lambda: vms[1]._dom.polls > 3)
+                self.assertIsNone(monitors[0].progress)
+                blocked.blocked.set()
+                wait_for(lambda: monitors[0].progress is not None)
+                for monitor in monitors:
+                    monitor.stop()
+        finally:
+            blocked.blocked.set()
+
+    def test_poll_in_separate_tasks(self):
+        monitors = [FakePolledMonitor(), FakePolledMonitor()]
+        executor = RecordingExecutor()
+        monitoring = migration._Monitoring()
+        monitoring._scheduler = FakeScheduler()
+        monitoring._executor = executor
+        monitoring._interval = 1
+        monitoring._monitors = monitors
+        monitoring._tick()
+        self.assertEqual(executor.dispatched,
+                         [(monitors[0].poll, 0.5), (monitors[1].poll, 0.5)])
+
+    def test_stop_unregisters(self):
+        vm = FakeVM(FakeMonitoredDomain())
+        monitor = migration.MigrationMonitor(vm, time.time(),
+                                             _conv_schedule(), True)
+        with migration_monitoring():
+            monitor.start()
+            wait_for(lambda: monitor.progress is not None)
+            monitor.stop()
+            monitor.join()
+            polls = vm._dom.polls
+            time.sleep(0.2)
+        self.assertLessEqual(vm._dom.polls, polls + 1)
+
+    def test_init_actions(self):
+        vm = FakeVM(FakeMonitoredDomain())
+        init = [{'name': migration.CONVERGENCE_SCHEDULE_SET_DOWNTIME,
+                 'params': ['100']}]
+        monitor = migration.MigrationMonitor(vm, time.time(),
+                                             _conv_schedule(init=init), True)
+        with migration_monitoring():
+            monitor.start()
+            wait_for(lambda: vm._dom.downtimes == [100])
+            monitor.stop()
+
+    def test_abort_action(self):
+        # Data remaining increasing means a new iteration.
+        vm = FakeVM(FakeMonitoredDomain(data_remaining=(100, 200, 300)))
+        stalling = [{
+            'limit': 0,
+            'action': {'name': migration.CONVERGENCE_SCHEDULE_SET_ABORT,
+                       'params': []}}]
+        monitor = migration.MigrationMonitor(
+            vm, time.time(), _conv_schedule(stalling=stalling), True)
+        with migration_monitoring():
+            monitor.start()
+            monitor.join()
+        self.assertTrue(vm._dom.aborted)
+
+    def test_downtime_schedule(self):
+        vm = FakeVM(FakeMonitoredDomain(data_remaining=(100, 200)))
+        monitor = migration.MigrationMonitor(vm, time.time(),
+                                             _conv_schedule(), False)
+        cfg = make_config([('vars', 'migration_downtime_delay', '0')])
+        with MonkeyPatchScope([(migration, 'config', cfg)]), \
+                migration_monitoring():
+            monitor.downtime_schedule = migration.DowntimeSchedule(vm, 500, 3)
+            monitor.start()
+            # Initial downtime, and two steps after the first iteration.
+            wait_for(lambda: len(vm._dom.downtimes) == 3)
+            monitor.stop()
+            monitor.join()
+        self.assertEqual(vm._dom.downtimes[-1], 500)
+
+    def test_disabled(self):
+        vm = FakeVM(FakeMonitoredDomain())
+        monitor = migration.MigrationMonitor(vm, time.time(),
+                                             _conv_schedule(), True)
+        with MonkeyPatchScope([
+            (migration.MigrationMonitor, '_MIGRATION_MONITOR_INTERVAL', 0),
+        ]), migration_monitoring():
+            monitor.start()
+            monitor.join()
+            time.sleep(0.1)
+        self.assertEqual(vm._dom.polls, 0)
+
+
 class CannonizeHostPortTest(TestCaseBase):
 
     def test_no_arguments(self):
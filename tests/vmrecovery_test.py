@@ -23,6 +23,7 @@ import contextlib
 import os
 import threading
 
+from vdsm.common import concurrent
 from vdsm.common import response
 from vdsm.common.compat import pickle
 from vdsm.virt import recovery
@@ -35,7 +36,7 @@ from vdsm import libvirtconnection
 
 from monkeypatch import MonkeyPatchScope
 from testlib import VdsmTestCase as TestCaseBase
-from testlib import namedTemporaryDir
+from testlib import namedTemporaryDir, make_config
 from testlib import permutations, expandPermutations
 from vmTestsData import CONF_TO_DOMXML_X86_64
 from vmTestsData import CONF_TO_DOMXML_PPC64
@@ -219,6 +220,97 @@ class RecoveryAllVmsTests(TestCaseBase):
                 self.assertEqual(fakecif.vmContainer, {})
 
 
+class FakeRecoveredDomain(object):
+
+    def __init__(self, vm_id):
+        self.vm_id = vm_id
+        self.destroyed = False
+
+    def UUIDString(self):
+        return self.vm_id
+
+    def destroy(self):
+        self.destroyed = True
+
+
+class FakeRecoveredVm(object):
+
+    def __init__(self, vm_id, barrier=None):
+        self.id = vm_id
+        self.prepared = False
+        self._barrier = barrier
+
+    def preparePaths(self):
+        if self._barrier is not None:
+            self._barrier.wait(timeout=2)
+        self.prepared = True
+
+
+class RecoveryConcurrencyTests(TestCaseBase):
+
+    def test_recover_concurrently(self):
+        workers = 4
+        doms = [FakeRecoveredDomain('vm-%d' % i) for i in range(workers)]
+        barrier = concurrent.Barrier(workers)
+        fakecif = fake.ClientIF()
+
+        def createVm(params, vmRecover=False):
+            # Fails unless all workers are running at the same time.
+            barrier.wait(timeout=2)
+            return response.success(vmList={})
+
+        fakecif.createVm = createVm
+        with self.patch_recovery(doms, workers):
+            recovery.all_domains(fakecif)
+
+        self.assertFalse(any(dom.destroyed for dom in doms))
+
+    def test_recover_loose_domains(self):
+        doms = [FakeRecoveredDomain('vm-%d' % i) for i in range(10)]
+        fakecif = fake.ClientIF()
+
+        def createVm(params, vmRecover=False):
+            if int(params['vmId'].split('-')[1]) % 2:
+                return response.error('noVM')
+            return response.success(vmList={})
+
+        fakecif.createVm = createVm
+        with self.patch_recovery(doms, 3):
+            recovery.all_domains(fakecif)
+
+        destroyed = [dom.vm_id for dom in doms if dom.destroyed]
+        self.assertEqual(destroyed, ['vm-%d' % i for i in range(1, 10, 2)])
+
+    def test_prepare_paths_concurrently(self):
+        workers = 4
+        barrier = concurrent.Barrier(workers)
+        vms = [FakeRecoveredVm('vm-%d' % i, barrier) for i in range(workers)]
+        fakecif = fake.ClientIF()
+        fakecif._enabled = True
+        cfg = make_config([('vars', 'recovery_workers', str(workers))])
+        with MonkeyPatchScope([(recovery, 'config', cfg)]):
+            recovery.prepare_paths(fakecif, vms)
+        self.assertTrue(all(vm.prepared for vm in vms))
+
+    def test_prepare_paths_disabled(self):
+        vms = [FakeRecoveredVm('vm-%d' % i) for i in range(4)]
+        fakecif = fake.ClientIF()
+        fakecif._enabled = False
+        recovery.prepare_paths(fakecif, vms)
+        self.assertFalse(any(vm.prepared for vm in vms))
+
+    def patch_recovery(self, doms, workers):
+        cfg = make_config([('vars', 'recovery_workers', str(workers))])
+        return MonkeyPatchScope([
+            (recovery, 'config', cfg),
+            (recovery, '_list_domains',
+             lambda: [(dom, '<domain/>', False) for dom in doms]),
+            (recovery, '_recovery_params',
+             lambda vm_id, dom_xml, external: {'vmId': vm_id}),
+            (containersconnection, 'recovery', lambda: []),
+        ])
+
+
 class VmRecoveryTests(TestCaseBase):
 
     def test_exception(self):